@@ -0,0 +1,789 @@
+"""Benchmarks de los motores de inferencia.
+
+Uso:
+    python -m app.bench bayes [n]
+    python -m app.bench fuzzy [n]
+    python -m app.bench surface [n]
+    python -m app.bench rules [n]
+    python -m app.bench startup
+    python -m app.bench prefork [workers]
+    python -m app.bench logs [n]
+    python -m app.bench api [n]
+    python -m app.bench sensitivity [pasos]
+    python -m app.bench ensemble [n]
+    python -m app.bench facts [n]
+    python -m app.bench rpc [n]
+    python -m app.bench replay [n] [--db] [--lote B] [--traza diferida|texto|no]
+                               [--salida F.json] [--comparar G.json]
+"""
+import json
+import subprocess
+import sys
+import time
+import random
+
+
+def _evidencias_aleatorias(n, seed=0):
+    from app.systems.probabilistic import EVIDENCIA
+    rng = random.Random(seed)
+    return [{nodo: rng.randint(0, 1) for nodo in EVIDENCIA} for _ in range(n)]
+
+
+def bench_bayes(n=2000):
+    """Latencia por consulta: VariableElimination de pgmpy vs tabla compilada."""
+    from app.systems.probabilistic import BayesianEngine, clave_evidencia
+
+    engine = BayesianEngine(compiled=True)
+    evidencias = _evidencias_aleatorias(n)
+
+    t0 = time.perf_counter()
+    engine._tabla_posterior()
+    compilacion = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for evidence in evidencias:
+        engine.inference.query(variables=['Dengue'], evidence=evidence, show_progress=False).values[1]
+    pgmpy_s = time.perf_counter() - t0
+
+    tabla = engine._tabla_posterior()
+    t0 = time.perf_counter()
+    for evidence in evidencias:
+        tabla[clave_evidencia(evidence)]
+    tabla_s = time.perf_counter() - t0
+
+    print(f"Consultas: {n}")
+    print(f"  Compilación de la tabla: {compilacion * 1e3:.1f} ms (una vez)")
+    print(f"  pgmpy (VariableElimination): {pgmpy_s / n * 1e6:.1f} us/consulta")
+    print(f"  Tabla compilada:             {tabla_s / n * 1e6:.2f} us/consulta")
+    print(f"  Aceleración: x{pgmpy_s / tabla_s:.0f}")
+
+
+def _entradas_difusas(n, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    return {
+        'fiebre': np.round(rng.uniform(35, 42, n), 1),
+        'dolor_cabeza': rng.integers(0, 11, n).astype(float),
+        'intensidad_tos': rng.integers(0, 11, n).astype(float),
+        'riesgo_epi': rng.choice([0.0, 5.0, 10.0], n),
+    }
+
+
+def bench_fuzzy(n=500):
+    """skfuzzy (una simulación por paciente) vs evaluador NumPy (uno y en lote)."""
+    import numpy as np
+    from skfuzzy import control as ctrl
+    from app.systems.fuzzy_logic import construir_sistema
+    from app.systems.fuzzy_numpy import MamdaniNumpy, TOLERANCIA
+
+    entradas = _entradas_difusas(n)
+    sim = ctrl.ControlSystemSimulation(construir_sistema())
+    evaluador = MamdaniNumpy(construir_sistema())
+
+    referencia = np.empty(n)
+    t0 = time.perf_counter()
+    for i in range(n):
+        for var, valores in entradas.items():
+            sim.input[var] = valores[i]
+        sim.compute()
+        referencia[i] = sim.output.get('posibilidad_dengue', np.nan)
+    skfuzzy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        evaluador.evaluar_uno({var: valores[i] for var, valores in entradas.items()})
+    uno_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lote = evaluador.evaluar(entradas)
+    lote_s = time.perf_counter() - t0
+
+    error = np.nanmax(np.abs(lote - referencia))
+    print(f"Pacientes: {n}")
+    print(f"  skfuzzy compute():        {skfuzzy_s / n * 1e6:.1f} us/paciente")
+    print(f"  NumPy (de a uno):         {uno_s / n * 1e6:.1f} us/paciente")
+    print(f"  NumPy (lote de {n}):     {lote_s / n * 1e6:.2f} us/paciente")
+    print(f"  Error máximo vs skfuzzy: {error:.2e} (tolerancia {TOLERANCIA:.0e})")
+
+
+def bench_surface(n=2000):
+    """Superficie difusa: tamaño de la grilla, memoria, latencia y error vs cálculo directo."""
+    import tempfile
+    import numpy as np
+    from app.systems.fuzzy_logic import construir_sistema
+    from app.systems.fuzzy_numpy import MamdaniNumpy
+    from app.systems.fuzzy_surface import SuperficieDifusa
+
+    evaluador = MamdaniNumpy(construir_sistema())
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t0 = time.perf_counter()
+        superficie = SuperficieDifusa(evaluador, cache_dir=cache_dir)
+        construccion = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        SuperficieDifusa(evaluador, cache_dir=cache_dir)
+        carga = time.perf_counter() - t0
+
+    # Consultas típicas (sobre los nodos de la grilla) y arbitrarias
+    nodos = _entradas_difusas(n)
+    error_nodos = np.nanmax(np.abs(superficie.evaluar(nodos) - evaluador.evaluar(nodos)))
+    error_libre = superficie.error_maximo(n)
+    # Entre nodos, pero con riesgo_epi en sus únicos valores posibles (0/5/10)
+    rng = np.random.default_rng(1)
+    intermedios = {'fiebre': rng.uniform(35, 42, n), 'dolor_cabeza': rng.uniform(0, 10, n),
+                   'intensidad_tos': rng.uniform(0, 10, n), 'riesgo_epi': nodos['riesgo_epi']}
+    error_real = np.nanmax(np.abs(superficie.evaluar(intermedios) - evaluador.evaluar(intermedios)))
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        superficie.evaluar_uno({var: valores[i] for var, valores in nodos.items()})
+    uno_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    superficie.evaluar(nodos)
+    lote_s = time.perf_counter() - t0
+
+    ejes = " x ".join(str(e.size) for e in superficie.ejes)
+    print(f"Grilla: {ejes} = {superficie.puntos} puntos ({', '.join(evaluador.variables)})")
+    print(f"  Memoria: {superficie.bytes / 1024:.0f} KiB")
+    print(f"  Construcción: {construccion:.2f} s, carga desde cache: {carga * 1e3:.1f} ms")
+    print(f"  Error máximo en nodos de la grilla: {error_nodos:.2e}")
+    print(f"  Error máximo entre nodos, riesgo_epi en 0/5/10: {error_real:.3f} puntos")
+    print(f"  Error máximo entre nodos, todo continuo: {error_libre:.3f} puntos")
+    print(f"  Consulta (de a uno): {uno_s / n * 1e6:.1f} us/paciente")
+    print(f"  Consulta (lote de {n}): {lote_s / n * 1e6:.2f} us/paciente")
+
+
+def _pacientes(n, seed=0):
+    """Diccionarios de hechos con el mismo esquema que arma /diagnose."""
+    rng = random.Random(seed)
+    pacientes = []
+    for _ in range(n):
+        pacientes.append({
+            'fiebre': round(rng.uniform(35.5, 41.0), 1),
+            'intensidad_dolor_cabeza': float(rng.randint(0, 10)),
+            'intensidad_tos': float(rng.randint(0, 10)),
+            'tos': rng.random() < 0.5,
+            'dolor_garganta': rng.random() < 0.5,
+            'dolor_cabeza': rng.random() < 0.5,
+            'viaje_brasil': rng.random() < 0.5,
+            'contacto_dengue': rng.random() < 0.5,
+            'vive_corrientes': rng.random() < 0.5,
+            'verano': rng.random() < 0.5,
+        })
+    return pacientes
+
+
+def bench_rules(n=300):
+    """Costo de construir DiagnosticoMedico vs run(), con pool y con tabla compilada."""
+    from app.systems.deterministic import DiagnosticoMedico, RuleBasedEngine
+    from app.systems.decision_table import verificar_equivalencia
+
+    pacientes = _pacientes(n)
+    motor = RuleBasedEngine(pool_size=1, mode="experta")
+
+    construccion = reset = ejecucion = 0.0
+    for facts in pacientes:
+        t0 = time.perf_counter()
+        engine = DiagnosticoMedico()
+        t1 = time.perf_counter()
+        engine.reset()
+        motor._cargar_hechos(engine, facts)
+        t2 = time.perf_counter()
+        engine.run()
+        t3 = time.perf_counter()
+        construccion += t1 - t0
+        reset += t2 - t1
+        ejecucion += t3 - t2
+    antes = construccion + reset + ejecucion
+
+    t0 = time.perf_counter()
+    for facts in pacientes:
+        motor.infer(facts)
+    despues = time.perf_counter() - t0
+
+    print(f"Pacientes: {n}")
+    print(f"  Motor nuevo por pedido (antes): {antes / n * 1e6:.0f} us/paciente")
+    print(f"    construcción (red Rete): {construccion / n * 1e6:.0f} us")
+    print(f"    reset + declare:         {reset / n * 1e6:.0f} us")
+    print(f"    run():                   {ejecucion / n * 1e6:.0f} us")
+    print(f"  Motor reutilizado del pool (después): {despues / n * 1e6:.0f} us/paciente")
+
+    t0 = time.perf_counter()
+    compilado = RuleBasedEngine(pool_size=1, mode="compiled")
+    compilacion = time.perf_counter() - t0
+    casos = verificar_equivalencia(compilado.tabla, compilado._infer_experta)
+    t0 = time.perf_counter()
+    for facts in pacientes:
+        compilado.infer(facts)
+    tabla_s = time.perf_counter() - t0
+    print(f"  Tabla de decisión: {tabla_s / n * 1e6:.1f} us/paciente "
+          f"(compilación {compilacion:.2f} s, {casos} casos equivalentes a experta)")
+
+
+_ARRANQUE = """
+import json, time
+t0 = time.perf_counter()
+from app.registry import EngineRegistry
+registro = EngineRegistry(habilitados={habilitados!r})
+registro.precalentar()
+stats = registro.stats()
+stats["total_s"] = time.perf_counter() - t0
+print(json.dumps(stats))
+"""
+
+
+def bench_startup():
+    """Arranque en frío (proceso nuevo) con cada motor solo y con los tres."""
+    from app.registry import MOTORES
+
+    casos = [[nombre] for nombre in MOTORES] + [list(MOTORES)]
+    for habilitados in casos:
+        codigo = _ARRANQUE.format(habilitados=habilitados)
+        salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True,
+                                text=True, check=True).stdout
+        stats = json.loads(salida.strip().splitlines()[-1])
+        print(f"{'+'.join(habilitados)}: {stats['total_s']:.2f} s, RSS {stats['rss_mb']:.0f} MiB "
+              f"(base {stats['rss_inicial_mb']:.0f} MiB)")
+        for nombre, carga in stats["motores"].items():
+            print(f"  {nombre}: import {carga['import_s']:.2f} s, construcción "
+                  f"{carga['construccion_s']:.2f} s, +{carga['rss_mb']:.0f} MiB")
+
+
+def _medir_workers(n, preparar_hijo):
+    """Hace fork de n hijos que preparan motores, atienden pacientes y
+    reportan su memoria mientras todos siguen vivos (el PSS depende de eso)."""
+    import os
+    from app.prefork import memoria
+
+    r_datos, w_datos = os.pipe()
+    r_fin, w_fin = os.pipe()
+    pids = []
+    for _ in range(n):
+        pid = os.fork()
+        if pid == 0:
+            os.close(r_datos)
+            os.close(w_fin)
+            engines = preparar_hijo()
+            for nombre in engines:
+                engines[nombre].infer_batch(_pacientes(200))
+                for facts in _pacientes(200, seed=1):
+                    engines[nombre].infer(facts)
+            os.write(w_datos, (json.dumps({"pid": os.getpid()}) + "\n").encode())
+            os.read(r_fin, 1)  # espera a que el padre mida a todos
+            os._exit(0)
+        pids.append(pid)
+    os.close(w_datos)
+    os.close(r_fin)
+
+    with os.fdopen(r_datos) as f:
+        listos = [json.loads(f.readline()) for _ in range(n)]
+    medidas = [memoria(d["pid"]) for d in listos]
+    os.close(w_fin)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return medidas
+
+
+def bench_prefork(workers=4):
+    """Memoria por worker: cada uno construye sus motores vs motores construidos antes del fork."""
+    import os
+    from app.registry import EngineRegistry
+
+    # Antes: cada worker importa y construye todo por su cuenta (como uvicorn --workers)
+    antes = _medir_workers(workers, EngineRegistry)
+
+    # Después: el maestro construye y congela, los workers heredan por fork
+    from app.prefork import memoria, preparar
+    maestro = EngineRegistry()
+    preparar(maestro)
+    rss_maestro = memoria(os.getpid())["rss_mb"]
+    despues = _medir_workers(workers, lambda: maestro)
+
+    def _resumen(titulo, medidas):
+        rss = sum(m["rss_mb"] for m in medidas) / len(medidas)
+        pss = sum(m["pss_mb"] for m in medidas) / len(medidas)
+        uss = sum(m["uss_mb"] for m in medidas) / len(medidas)
+        print(f"  {titulo}: RSS {rss:.0f} MiB, PSS {pss:.0f} MiB, privada (USS) {uss:.0f} MiB por worker")
+        return uss
+
+    print(f"Workers: {workers} (cada uno atiende 400 pacientes por motor)")
+    uss_antes = _resumen("Motores por worker (antes)  ", antes)
+    uss_despues = _resumen("Prefork copy-on-write       ", despues)
+    print(f"  Maestro prefork: {rss_maestro:.0f} MiB RSS (compartidos con los workers)")
+    print(f"  Memoria privada total: {uss_antes * workers:.0f} MiB -> {uss_despues * workers:.0f} MiB")
+
+
+def _registros_feedback(pacientes, inicio):
+    from datetime import datetime, timedelta
+    from app.database import columnas_hechos
+
+    rng = random.Random(inicio)
+    base = datetime(2025, 1, 1)
+    registros = []
+    for i, facts in enumerate(pacientes):
+        inputs = json.dumps(facts)
+        registros.append({
+            "timestamp": (base + timedelta(minutes=inicio + i)).isoformat(),
+            "system_used": rng.choice(["deterministico", "probabilistico", "difuso"]),
+            "inputs": inputs,
+            "diagnosis": rng.choice(["ALTA PROBABILIDAD DENGUE", "Posible COVID-19"]),
+            "user_feedback": None,
+            "corrected": rng.random() < 0.7,
+            **columnas_hechos(inputs),
+        })
+    return registros
+
+
+def bench_logs(n=200000):
+    """Latencia de inserción por lotes a medida que crece learning_logs, y consultas analíticas."""
+    import os
+    import tempfile
+    from app.database import get_db
+    from app.export import exportar
+
+    lote = 100
+    pacientes = _pacientes(1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        anterior = os.getcwd()
+        os.chdir(tmp)
+        try:
+            db = get_db()
+            tabla = db.t.learning_logs
+            print(f"Filas: {n} (lotes de {lote}, como el escritor de feedback)")
+            tramo = max(n // 5, lote)
+            t_tramo = 0.0
+            for inicio in range(0, n, lote):
+                registros = _registros_feedback(pacientes[inicio % 1000:][:lote], inicio)
+                t0 = time.perf_counter()
+                with db.conn:
+                    tabla.insert_all(registros)
+                t_tramo += time.perf_counter() - t0
+                if (inicio + lote) % tramo == 0:
+                    print(f"  hasta {inicio + lote:>8} filas: {t_tramo / tramo * 1e6:.1f} us/fila")
+                    t_tramo = 0.0
+
+            semana = "strftime('%Y-%W', timestamp)"
+            t0 = time.perf_counter()
+            db.execute(f"SELECT system_used, {semana}, AVG(corrected) FROM learning_logs "
+                       f"WHERE timestamp >= '2025-03-01' GROUP BY 1, 2").fetchall()
+            indexada = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            db.execute("SELECT AVG(tos) FROM learning_logs WHERE system_used = 'difuso' "
+                       "AND json_extract(inputs, '$.fiebre') > 38").fetchall()
+            json_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            db.execute("SELECT AVG(tos) FROM learning_logs WHERE system_used = 'difuso' "
+                       "AND fiebre > 38").fetchall()
+            tipada = time.perf_counter() - t0
+            print(f"  Aciertos por motor y semana (desde marzo, índice): {indexada * 1e3:.1f} ms")
+            print(f"  Filtro por fiebre: JSON {json_s * 1e3:.1f} ms, columna tipada {tipada * 1e3:.1f} ms")
+
+            t0 = time.perf_counter()
+            exportar(os.path.join(tmp, "export"), db=db)
+            print(f"  Exportación columnar (.npy): {time.perf_counter() - t0:.2f} s")
+        finally:
+            os.chdir(anterior)
+
+
+def _formulario(facts, engine):
+    """Los mismos hechos como los manda el formulario HTML de /diagnose."""
+    form = {'engine': engine, 'fiebre': str(facts['fiebre']),
+            'intensidad_dolor_cabeza': str(facts['intensidad_dolor_cabeza']),
+            'intensidad_tos': str(facts['intensidad_tos'])}
+    for clave in ('tos', 'dolor_garganta', 'viaje_brasil', 'contacto_dengue', 'vive_corrientes', 'verano'):
+        if facts[clave]:
+            form[clave] = 'on'
+    if facts['dolor_cabeza']:
+        form['dolor_cabeza_check'] = 'on'
+    return form
+
+
+def bench_api(n=300):
+    """/diagnose (HTML) vs /api/diagnose (JSON completo y compacto): latencia y bytes."""
+    import os
+    import tempfile
+
+    # Sin cache (cada pedido infiere) ni aprendizaje en segundo plano; la
+    # base y la clave de sesión de la app quedan en un directorio temporal
+    os.environ["CACHE_CAPACITY"] = "0"
+    os.environ["BAYES_LEARN_INTERVAL"] = "0"
+    os.chdir(tempfile.mkdtemp(prefix="bench_api_"))
+    from starlette.testclient import TestClient
+    from app.main import app, engines
+
+    pacientes = _pacientes(n, seed=1)
+    rutas = {
+        "html": lambda c, e, p: c.post("/diagnose", data=_formulario(p, e), headers={"HX-Request": "true"}),
+        "json": lambda c, e, p: c.post(f"/api/diagnose/{e}", json=p),
+        "compacto": lambda c, e, p: c.post(f"/api/diagnose/{e}?compact=true", json=p),
+    }
+    with TestClient(app) as cliente:
+        print(f"{n} pacientes por motor y ruta (TestClient, sin cache)")
+        for engine in engines:
+            for nombre, pedir in rutas.items():
+                for p in pacientes[:20]:
+                    pedir(cliente, engine, p)
+                tiempos, tamaños = [], 0
+                for p in pacientes:
+                    t0 = time.perf_counter()
+                    r = pedir(cliente, engine, p)
+                    tiempos.append(time.perf_counter() - t0)
+                    assert r.status_code == 200, r.text
+                    tamaños += len(r.content)
+                pc = _percentiles(tiempos)
+                print(f"  {engine:<15} {nombre:<9} p50 {pc['p50_us']:>8.0f} us  p95 {pc['p95_us']:>8.0f} us  "
+                      f"{tamaños / n:>8.0f} B/respuesta")
+
+
+def bench_sensitivity(pasos=10):
+    """Superficie de sensibilidad vectorizada vs modelo + VariableElimination por punto."""
+    import numpy as np
+    from app.sensitivity import superficie, superficie_ingenua
+    from app.systems.probabilistic import BayesianEngine
+
+    model = BayesianEngine().model
+    grilla = {"Dengue|Nexo=0": np.linspace(0.01, 0.30, pasos),
+              "Dengue|Nexo=1": np.linspace(0.30, 0.90, pasos)}
+    puntos = pasos * pasos
+
+    t0 = time.perf_counter()
+    ingenua = superficie_ingenua(model, grilla)
+    t_ingenua = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vectorizada = superficie(model, grilla)
+    t_vectorizada = time.perf_counter() - t0
+    error = float(np.abs(vectorizada - ingenua).max())
+
+    print(f"Grilla {pasos}x{pasos} = {puntos} puntos x 32 evidencias")
+    print(f"  VariableElimination por punto: {t_ingenua * 1000:>10.1f} ms ({t_ingenua / puntos * 1000:.2f} ms/punto)")
+    print(f"  Tensor NumPy:                  {t_vectorizada * 1000:>10.3f} ms ({t_ingenua / t_vectorizada:.0f}x)")
+    print(f"  Diferencia máxima: {error:.2e}")
+
+    grande = {nombre: np.linspace(0.01, 0.99, 100) for nombre in grilla}
+    t0 = time.perf_counter()
+    superficie(model, grande)
+    print(f"  Tensor NumPy 100x100: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+def bench_ensemble(n=300):
+    """Latencia del ensemble vs cada motor solo y la suma de los tres (executor real)."""
+    import asyncio
+    from app.ensemble import Ensemble
+    from app.executor import InferenceExecutor
+    from app.registry import EngineRegistry
+
+    engines = EngineRegistry()
+    engines.precalentar(list(engines))
+    executor = InferenceExecutor(engines)
+    ensemble = Ensemble(engines)
+    pacientes = _pacientes(n, seed=2)
+
+    async def medir(pedir):
+        for facts in pacientes[:20]:
+            await pedir(facts)
+        t0 = time.perf_counter()
+        for facts in pacientes:
+            await pedir(facts)
+        return (time.perf_counter() - t0) / n * 1e6
+
+    async def correr():
+        solos = {}
+        for nombre in ensemble.motores():
+            solos[nombre] = await medir(lambda facts, nombre=nombre: executor.infer(nombre, facts))
+        junto = await medir(lambda facts: ensemble.diagnosticar(lambda nombre: executor.infer(nombre, facts)))
+        return solos, junto
+
+    solos, junto = asyncio.run(correr())
+    executor.shutdown()
+    for nombre, us in solos.items():
+        print(f"  {nombre:<15} {us:>9.1f} us/paciente")
+    print(f"  {'suma':<15} {sum(solos.values()):>9.1f} us/paciente")
+    print(f"  {'ensemble':<15} {junto:>9.1f} us/paciente  (más lento solo: {max(solos.values()):.1f})")
+
+
+def bench_facts(n=2000):
+    """PatientFacts: costo de armarlo y de cada motor con hechos ya armados vs diccionarios."""
+    from app.cache import clave_hechos
+    from app.registry import EngineRegistry
+    from app.systems.facts import PatientFacts
+
+    pacientes = _pacientes(n, seed=4)
+    armados = [PatientFacts.desde_dict(facts) for facts in pacientes]
+
+    def medir(llamar, datos):
+        t0 = time.perf_counter()
+        for facts in datos:
+            llamar(facts)
+        return (time.perf_counter() - t0) / n * 1e6
+
+    print(f"  desde_dict: {medir(PatientFacts.desde_dict, pacientes):.2f} us/paciente")
+    print(f"  clave del cache: dict {medir(clave_hechos, pacientes):.2f} us, "
+          f"PatientFacts {medir(clave_hechos, armados):.2f} us")
+    engines = EngineRegistry()
+    engines.precalentar(list(engines))
+    for nombre in engines:
+        engine = engines.get(nombre)
+        for trace in (True, False):
+            infer = lambda facts: engine.infer(facts, trace)
+            medir(infer, armados[:50])
+            dicts, hechos = medir(infer, pacientes), medir(infer, armados)
+            t0 = time.perf_counter()
+            engine.infer_batch(armados, trace)
+            lote = (time.perf_counter() - t0) / n * 1e6
+            print(f"  {nombre:<15} traza={'sí' if trace else 'no'}  dict {dicts:>8.2f} us  "
+                  f"PatientFacts {hechos:>8.2f} us  lote {lote:>8.2f} us/paciente")
+
+
+def bench_rpc(n=300):
+    """Motores en workers por socket vs pool de hilos: latencia, tubería, bytes y memoria del proceso web."""
+    import asyncio
+    import json as _json
+    from app import rpc
+    from app.executor import InferenceExecutor
+    from app.registry import EngineRegistry, rss_mb
+
+    pacientes = _pacientes(n, seed=3)
+    compacto = len(rpc.codificar_pedido(pacientes, True)) / n
+    texto = len(_json.dumps(pacientes).encode()) / n
+    print(f"  pedido por paciente: {compacto:.0f} bytes binario vs {texto:.0f} bytes JSON")
+
+    async def medir(executor, nombre, trace):
+        for facts in pacientes[:20]:
+            await executor.infer(nombre, facts, trace)
+        t0 = time.perf_counter()
+        for facts in pacientes:
+            await executor.infer(nombre, facts, trace)
+        uno = (time.perf_counter() - t0) / n * 1e6
+        # Todos a la vez: en el socket van en tubería por las conexiones abiertas
+        t0 = time.perf_counter()
+        await asyncio.gather(*(executor.infer(nombre, facts, trace) for facts in pacientes))
+        tuberia = n / (time.perf_counter() - t0)
+        return uno, tuberia
+
+    async def correr(kind):
+        engines = EngineRegistry()
+        executor = InferenceExecutor(engines, kind=kind, concurrencia=64, cola_max=n, timeout=300)
+        engines.precalentar(list(engines))
+        rss = rss_mb()
+        filas = {}
+        for nombre in engines:
+            filas[nombre] = (await medir(executor, nombre, True), await medir(executor, nombre, False))
+        executor.shutdown()
+        return rss, filas
+
+    # Primero el socket: el proceso todavía no importó ningún motor
+    for kind in ("socket", "thread"):
+        rss, filas = asyncio.run(correr(kind))
+        print(f"  executor {kind}: RSS del proceso web {rss:.0f} MiB")
+        for nombre, ((uno, tuberia), (uno_st, tuberia_st)) in filas.items():
+            print(f"    {nombre:<15} {uno:>8.1f} us/paciente, {tuberia:>7.0f} pacientes/s en tubería"
+                  f"  | sin traza {uno_st:>8.1f} us, {tuberia_st:>7.0f} /s")
+
+
+def _percentiles(muestras):
+    import numpy as np
+    p50, p95, p99 = np.percentile(np.asarray(muestras) * 1e6, [50, 95, 99])
+    return {"p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99)}
+
+
+def _corpus_db(n):
+    """Los últimos n pacientes de learning_logs, normalizados como /diagnose/batch."""
+    from app.database import get_db
+    from app.main import facts_from_json
+
+    pacientes = []
+    for (inputs,) in get_db().execute(
+            "SELECT inputs FROM learning_logs ORDER BY id DESC LIMIT ?", (n,)):
+        try:
+            pacientes.append(facts_from_json(json.loads(inputs)))
+        except (TypeError, ValueError, AttributeError):
+            continue
+    return pacientes[::-1]
+
+
+def _llamadas(engine, traza):
+    """infer / infer_batch según el modo de traza.
+
+    "diferida": lo que devuelve el motor, sin leer la traza; "texto": además
+    se formatea la traza (lo que cuesta mostrarla); "no": trace=False.
+    """
+    if traza == "no":
+        return (lambda facts: engine.infer(facts, trace=False),
+                lambda facts_list: engine.infer_batch(facts_list, trace=False))
+    if traza == "texto":
+        return (lambda facts: list(engine.infer(facts).reasoning),
+                lambda facts_list: [list(d.reasoning) for d in engine.infer_batch(facts_list)])
+    return engine.infer, engine.infer_batch
+
+
+def _medir_motor(engine, pacientes, lote, traza="diferida"):
+    """Métricas de un motor: de a uno y por lotes, tiempo y memoria por separado."""
+    import tracemalloc
+
+    n = len(pacientes)
+    lotes = [pacientes[i:i + lote] for i in range(0, n, lote)]
+    infer, infer_batch = _llamadas(engine, traza)
+    # Calentamiento: caches, tablas diferidas, primeras asignaciones
+    for facts in pacientes[:50]:
+        infer(facts)
+    infer_batch(lotes[0])
+
+    resultado = {}
+    for modo in ("uno", "lote"):
+        unidades = pacientes if modo == "uno" else lotes
+        llamar = infer if modo == "uno" else infer_batch
+
+        # 1) Tiempo, sin tracemalloc (lo frena varias veces)
+        tiempos = []
+        t_total = time.perf_counter()
+        for unidad in unidades:
+            t0 = time.perf_counter()
+            llamar(unidad)
+            tiempos.append(time.perf_counter() - t0)
+        t_total = time.perf_counter() - t_total
+
+        # 2) Memoria: pico total y memoria transitoria por llamada
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        transitoria = 0
+        for unidad in unidades:
+            actual = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            llamar(unidad)
+            transitoria += tracemalloc.get_traced_memory()[1] - actual
+        pico = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+
+        resultado[modo] = {
+            "llamadas": len(unidades),
+            "pacientes_por_s": n / t_total,
+            **_percentiles(tiempos),
+            "us_por_paciente": t_total / n * 1e6,
+            "memoria_pico_kib": pico / 1024,
+            "memoria_transitoria_por_paciente_b": transitoria / n,
+        }
+    resultado["lote"]["tamaño"] = lote
+    return resultado
+
+
+def _version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Métricas comparadas con --comparar: (clave, True si más es mejor)
+_METRICAS_COMPARADAS = (("pacientes_por_s", True), ("p95_us", False), ("p99_us", False),
+                        ("memoria_transitoria_por_paciente_b", False))
+
+
+def _comparar(actual, previo, tolerancia):
+    """Imprime las diferencias y devuelve las regresiones mayores a la tolerancia."""
+    regresiones = []
+    print(f"\nComparación con {previo.get('version') or 'corrida previa'} ({previo.get('fecha')}):")
+    for motor, modos in actual["motores"].items():
+        for modo, m in modos.items():
+            anterior = previo.get("motores", {}).get(motor, {}).get(modo)
+            if not anterior:
+                continue
+            for clave, mas_es_mejor in _METRICAS_COMPARADAS:
+                if not anterior.get(clave):
+                    continue
+                cambio = m[clave] / anterior[clave] - 1
+                peor = -cambio if mas_es_mejor else cambio
+                marca = "  <-- REGRESIÓN" if peor > tolerancia else ""
+                print(f"  {motor:<15} {modo:<5} {clave:<36} {anterior[clave]:>12.1f} -> "
+                      f"{m[clave]:>12.1f} ({cambio:+.1%}){marca}")
+                if marca:
+                    regresiones.append((motor, modo, clave))
+    return regresiones
+
+
+def bench_replay(argv=()):
+    """Corpus de pacientes por los tres motores: throughput, latencias, memoria; guarda JSON."""
+    import argparse
+    import platform
+    from datetime import datetime
+    from app.registry import EngineRegistry
+
+    parser = argparse.ArgumentParser(prog="python -m app.bench replay")
+    parser.add_argument("n", nargs="?", type=int, default=2000, help="pacientes del corpus")
+    parser.add_argument("--db", action="store_true", help="repetir los inputs de learning_logs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lote", type=int, default=64, help="tamaño de lote para infer_batch")
+    parser.add_argument("--traza", choices=("diferida", "texto", "no"), default="diferida",
+                        help="leer la traza (texto) o pedir trace=False (no)")
+    parser.add_argument("--motores", default=None, help="lista separada por coma (por defecto todos)")
+    parser.add_argument("--salida", default=None, help="archivo JSON con los resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida previa")
+    parser.add_argument("--tolerancia", type=float, default=0.10,
+                        help="empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args(list(argv))
+
+    if args.db:
+        pacientes = _corpus_db(args.n)
+    else:
+        # Armados una vez, como los arma /diagnose antes de llamar a los motores
+        from app.systems.facts import PatientFacts
+        pacientes = [PatientFacts.desde_dict(facts) for facts in _pacientes(args.n, args.seed)]
+    if not pacientes:
+        sys.exit("El corpus está vacío")
+    habilitados = args.motores.split(",") if args.motores else None
+    engines = EngineRegistry(habilitados=habilitados)
+
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version(),
+        "python": platform.python_version(),
+        "traza": args.traza,
+        "corpus": {"fuente": "learning_logs" if args.db else "sintetico",
+                   "pacientes": len(pacientes), "seed": None if args.db else args.seed},
+        "motores": {},
+    }
+    print(f"Corpus: {len(pacientes)} pacientes ({resultados['corpus']['fuente']}), lotes de {args.lote}")
+    for nombre in engines:
+        m = _medir_motor(engines[nombre], pacientes, args.lote, args.traza)
+        resultados["motores"][nombre] = m
+        for modo in ("uno", "lote"):
+            r = m[modo]
+            print(f"  {nombre:<15} {modo:<5} {r['pacientes_por_s']:>10.0f} pac/s  "
+                  f"p50 {r['p50_us']:>9.1f} us  p95 {r['p95_us']:>9.1f} us  p99 {r['p99_us']:>9.1f} us  "
+                  f"pico {r['memoria_pico_kib']:>8.0f} KiB  {r['memoria_transitoria_por_paciente_b']:>8.0f} B/pac")
+    resultados["carga_motores"] = engines.stats()["motores"]
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar) as f:
+            previo = json.load(f)
+        if _comparar(resultados, previo, args.tolerancia):
+            sys.exit(1)
+
+
+BENCHMARKS = {
+    "bayes": bench_bayes,
+    "fuzzy": bench_fuzzy,
+    "surface": bench_surface,
+    "rules": bench_rules,
+    "startup": bench_startup,
+    "prefork": bench_prefork,
+    "logs": bench_logs,
+    "api": bench_api,
+    "sensitivity": bench_sensitivity,
+    "ensemble": bench_ensemble,
+    "facts": bench_facts,
+    "rpc": bench_rpc,
+    "replay": bench_replay,
+}
+
+if __name__ == "__main__":
+    nombre = sys.argv[1] if len(sys.argv) > 1 else "bayes"
+    if nombre == "replay":
+        # Tiene opciones propias (argparse)
+        bench_replay(sys.argv[2:])
+    else:
+        args = [int(a) for a in sys.argv[2:]]
+        BENCHMARKS[nombre](*args)
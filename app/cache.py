@@ -0,0 +1,134 @@
+"""Cache LRU de diagnósticos, por motor.
+
+Las entradas del formulario son discretas (booleanos, sliders enteros,
+temperatura en pasos de 0.1 °C), así que muchos pedidos a /diagnose repiten
+exactamente los mismos hechos. La clave es ``PatientFacts.clave()``: la
+máscara de booleanos y los tres numéricos, ya canónicos (un diccionario con
+los mismos valores da la misma clave).
+
+Cada motor tiene su propio espacio de nombres. Si el ``model_version`` del
+motor cambia (p. ej. ``BayesianEngine.update_cpds``), su espacio se vacía
+entero en la siguiente consulta.
+
+Configuración por variables de entorno:
+    CACHE_CAPACITY   entradas por motor; 0 desactiva el cache (1024)
+    CACHE_TTL        segundos de vida de cada entrada; 0 = sin vencimiento (300)
+"""
+import dataclasses
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.systems.base import Diagnosis, InferenceEngine, Traza
+from app.systems.facts import Hechos, como_hechos
+
+
+def _copia(diag: Diagnosis) -> Diagnosis:
+    # Quien recibe el diagnóstico puede modificar una traza en lista; una
+    # Traza es de solo lectura y se comparte sin formatearla
+    reasoning = diag.reasoning if isinstance(diag.reasoning, (Traza, tuple)) else list(diag.reasoning)
+    return dataclasses.replace(diag, reasoning=reasoning)
+
+
+def clave_hechos(facts: Hechos) -> Tuple:
+    """Codificación canónica e inmutable de los hechos."""
+    return como_hechos(facts).clave()
+
+
+class _Espacio:
+    def __init__(self, version: int):
+        self.version = version
+        self.entradas: "OrderedDict[Tuple, Tuple[float, Diagnosis]]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.vencidos = 0
+        self.invalidaciones = 0
+
+
+class ResultCache:
+    def __init__(self, capacidad: int = None, ttl: float = None):
+        self.capacidad = capacidad if capacidad is not None else int(os.environ.get("CACHE_CAPACITY", 1024))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("CACHE_TTL", 300))
+        self._espacios: Dict[str, _Espacio] = {}
+        # Las rutas síncronas (p. ej. /cache/stats) corren en otro hilo
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self) -> bool:
+        return self.capacidad > 0
+
+    def _espacio(self, nombre: str, engine: InferenceEngine) -> _Espacio:
+        version = engine.model_version
+        espacio = self._espacios.get(nombre)
+        if espacio is None:
+            espacio = self._espacios[nombre] = _Espacio(version)
+        elif espacio.version != version:
+            # El modelo cambió: nada de lo guardado sigue siendo válido
+            espacio.entradas.clear()
+            espacio.version = version
+            espacio.invalidaciones += 1
+        return espacio
+
+    def get(self, nombre: str, engine: InferenceEngine, facts: Hechos) -> Optional[Diagnosis]:
+        if not self.activo:
+            return None
+        clave = clave_hechos(facts)
+        with self._lock:
+            espacio = self._espacio(nombre, engine)
+            item = espacio.entradas.get(clave)
+            if item is not None and self.ttl and time.monotonic() - item[0] > self.ttl:
+                del espacio.entradas[clave]
+                espacio.vencidos += 1
+                item = None
+            if item is None:
+                espacio.fallos += 1
+                return None
+            espacio.entradas.move_to_end(clave)
+            espacio.aciertos += 1
+        return _copia(item[1])
+
+    def put(self, nombre: str, engine: InferenceEngine, facts: Hechos, diag: Diagnosis,
+            version: int = None):
+        """Guarda un diagnóstico.
+
+        ``version`` es el ``model_version`` leído antes de inferir: si el
+        modelo cambió mientras tanto, el resultado no se guarda.
+        """
+        if not self.activo:
+            return
+        clave = clave_hechos(facts)
+        guardado = _copia(diag)
+        with self._lock:
+            espacio = self._espacio(nombre, engine)
+            if version is not None and version != espacio.version:
+                return
+            espacio.entradas[clave] = (time.monotonic(), guardado)
+            espacio.entradas.move_to_end(clave)
+            while len(espacio.entradas) > self.capacidad:
+                espacio.entradas.popitem(last=False)
+                espacio.desalojos += 1
+
+    def clear(self):
+        with self._lock:
+            for espacio in self._espacios.values():
+                espacio.entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            motores = {}
+            for nombre, e in self._espacios.items():
+                consultas = e.aciertos + e.fallos
+                motores[nombre] = {
+                    "entradas": len(e.entradas),
+                    "version_modelo": e.version,
+                    "aciertos": e.aciertos,
+                    "fallos": e.fallos,
+                    "tasa_aciertos": e.aciertos / consultas if consultas else 0.0,
+                    "desalojos": e.desalojos,
+                    "vencidos": e.vencidos,
+                    "invalidaciones": e.invalidaciones,
+                }
+        return {"capacidad": self.capacidad, "ttl_s": self.ttl, "motores": motores}
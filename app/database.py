@@ -1,8 +1,30 @@
 from fastlite import Database
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+import json
+
+# Hechos del paciente que además del JSON de 'inputs' se guardan como
+# columnas tipadas (mismas claves que arma facts_from_form)
+COLUMNAS_HECHOS = {
+    'fiebre': float,
+    'intensidad_dolor_cabeza': float,
+    'intensidad_tos': float,
+    'tos': bool,
+    'dolor_garganta': bool,
+    'dolor_cabeza': bool,
+    'viaje_brasil': bool,
+    'contacto_dengue': bool,
+    'vive_corrientes': bool,
+    'verano': bool,
+}
+
+# Consultas típicas: por motor y período, por período, por resultado del feedback
+INDICES = (('system_used', 'timestamp'), ('timestamp',), ('corrected',))
+
+# PRAGMA user_version cuando las filas viejas ya tienen sus columnas tipadas
+VERSION_ESQUEMA = 1
 
 # 1. Definimos el esquema usando un Dataclass
-# FastLite convertirá automáticamente el nombre 'LearningLogs' 
+# FastLite convertirá automáticamente el nombre 'LearningLogs'
 # a la tabla 'learning_logs' en la base de datos.
 @dataclass
 class LearningLogs:
@@ -13,13 +35,88 @@ class LearningLogs:
     diagnosis: str
     user_feedback: str
     corrected: bool
+    # Confianza del diagnóstico que se evaluó (para la calibración)
+    confidence: float = None
+    # Copia tipada de 'inputs' (ver COLUMNAS_HECHOS)
+    fiebre: float = None
+    intensidad_dolor_cabeza: float = None
+    intensidad_tos: float = None
+    tos: bool = None
+    dolor_garganta: bool = None
+    dolor_cabeza: bool = None
+    viaje_brasil: bool = None
+    contacto_dengue: bool = None
+    vive_corrientes: bool = None
+    verano: bool = None
+
+def columnas_hechos(inputs: str) -> dict:
+    """Columnas tipadas a partir del JSON de 'inputs' (None si falta o no se entiende)."""
+    try:
+        facts = json.loads(inputs) if inputs else {}
+    except (TypeError, ValueError):
+        facts = {}
+    if not isinstance(facts, dict):
+        facts = {}
+    columnas = {}
+    for columna, tipo in COLUMNAS_HECHOS.items():
+        valor = facts.get(columna)
+        try:
+            columnas[columna] = tipo(valor) if valor is not None else None
+        except (TypeError, ValueError):
+            columnas[columna] = None
+    return columnas
+
+def migrar(db):
+    """Agrega las columnas e índices que falten. Idempotente y sin tocar filas:
+    ADD COLUMN en SQLite solo cambia el esquema."""
+    tabla = db.t.learning_logs
+    existentes = set(tabla.columns_dict)
+    for campo in fields(LearningLogs):
+        if campo.name not in existentes:
+            tabla.add_column(campo.name, campo.type)
+    for columnas in INDICES:
+        tabla.create_index(columnas, if_not_exists=True)
+
+def completar_columnas(db=None, bloque: int = 1000) -> int:
+    """Copia 'inputs' a las columnas tipadas en las filas anteriores a la migración.
+
+    Avanza por rangos de id con una transacción corta por bloque, así las
+    escrituras de /learn se intercalan sin esperar a que termine. Si se
+    interrumpe, la próxima vez sigue donde quedó. Devuelve las filas completadas.
+    """
+    db = db or get_db()
+    if db.execute("PRAGMA user_version").fetchone()[0] >= VERSION_ESQUEMA:
+        return 0
+    asignaciones = ", ".join(f"{c} = json_extract(inputs, '$.{c}')" for c in COLUMNAS_HECHOS)
+    pendientes = "fiebre IS NULL AND json_valid(inputs)"
+    desde, total = 0, 0
+    while True:
+        ids = db.execute(f"SELECT id FROM learning_logs WHERE id > ? AND {pendientes} "
+                         "ORDER BY id LIMIT ?", (desde, bloque)).fetchall()
+        if not ids:
+            break
+        hasta = ids[-1][0]
+        with db.conn:
+            db.execute(f"UPDATE learning_logs SET {asignaciones} "
+                       f"WHERE id BETWEEN ? AND ? AND {pendientes}", (ids[0][0], hasta))
+        total += len(ids)
+        desde = hasta
+    db.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    return total
 
 def get_db():
     # Crea o conecta a la base de datos
     db = Database('expert_data.db')
-    
+    # Con varias conexiones escribiendo, esperar el lock en vez de fallar enseguida
+    db.execute("PRAGMA busy_timeout = 5000")
+    # WAL: los lectores no bloquean al escritor del feedback (y viceversa)
+    db.enable_wal()
+
     # 2. Creamos la tabla pasando la CLASE, no un string
     if "learning_logs" not in db.t:
-        db.create(LearningLogs, pk="id")
-    
-    return db
\ No newline at end of file
+        # if_not_exists: varios hilos/procesos pueden llegar acá a la vez
+        db.create(LearningLogs, pk="id", if_not_exists=True)
+        db.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    migrar(db)
+
+    return db
@@ -0,0 +1,123 @@
+"""Modo ensemble: los motores evalúan al mismo paciente a la vez.
+
+Cada motor corre en el executor como un pedido propio, todos en paralelo,
+así la latencia total es la del más lento y no la suma (con varios núcleos
+o con el executor de procesos; en un solo núcleo los motores, que son de
+CPU, se turnan). Hay un plazo por motor, ENSEMBLE_TIMEOUT: el que no
+responde a tiempo se cancela y queda afuera de la combinación en vez de
+demorar la respuesta.
+
+La combinación es el promedio ponderado de P(dengue) según cada motor
+(``InferenceEngine.probabilidad_dengue``); los motores que fallan, no
+responden o no concluyen nada sobre dengue no participan.
+
+Configuración por variables de entorno:
+    ENSEMBLE_WEIGHTS   pesos por motor, p. ej. "deterministico=1,probabilistico=2" (1 c/u)
+    ENSEMBLE_TIMEOUT   segundos por motor (2)
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional
+
+from app.executor import Saturado
+from app.systems.base import Diagnosis, InferenceEngine
+
+NOMBRE = "ensemble"
+
+
+def _pesos(texto: str) -> Dict[str, float]:
+    pesos = {}
+    for parte in texto.split(","):
+        if "=" in parte:
+            nombre, peso = parte.split("=", 1)
+            pesos[nombre.strip()] = float(peso)
+    return pesos
+
+
+def etiqueta(probabilidad: float) -> str:
+    # Mismos cortes y etiquetas que el motor difuso
+    if probabilidad > 0.65:
+        return "ALTA Probabilidad Dengue"
+    if probabilidad > 0.35:
+        return "MEDIA Probabilidad Dengue"
+    return "BAJA Probabilidad Dengue"
+
+
+@dataclass
+class Parcial:
+    """Resultado de un motor dentro del ensemble."""
+    motor: str
+    peso: float
+    segundos: float
+    diagnosis: Optional[Diagnosis] = None
+    error: Optional[str] = None
+    # P(dengue) según el motor; None si no participa de la combinación
+    probabilidad: Optional[float] = None
+
+
+@dataclass
+class ResultadoEnsemble:
+    diagnosis: Diagnosis
+    parciales: List[Parcial] = field(default_factory=list)
+
+
+class Ensemble:
+    def __init__(self, engines: Mapping[str, InferenceEngine], pesos: Dict[str, float] = None,
+                 timeout: float = None):
+        self.engines = engines
+        self.pesos = pesos if pesos is not None else _pesos(os.environ.get("ENSEMBLE_WEIGHTS", ""))
+        self.timeout = timeout or float(os.environ.get("ENSEMBLE_TIMEOUT", 2))
+
+    def motores(self) -> List[str]:
+        """Motores habilitados con peso positivo."""
+        return [nombre for nombre in self.engines if self.pesos.get(nombre, 1.0) > 0]
+
+    async def _parcial(self, parcial: Parcial, inferir: Callable[[str], Awaitable[Diagnosis]]) -> Parcial:
+        t0 = time.perf_counter()
+        try:
+            parcial.diagnosis = await inferir(parcial.motor)
+        except (asyncio.TimeoutError, TimeoutError):
+            parcial.error = "Tiempo límite del executor excedido"
+        except Saturado:
+            parcial.error = "Motor saturado"
+        except Exception as e:
+            parcial.error = f"Error: {e}"
+        parcial.segundos = time.perf_counter() - t0
+        if parcial.diagnosis is not None:
+            engine = self.engines[parcial.motor]
+            parcial.probabilidad = engine.probabilidad_dengue(parcial.diagnosis)
+        return parcial
+
+    async def diagnosticar(self, inferir: Callable[[str], Awaitable[Diagnosis]]) -> ResultadoEnsemble:
+        """``inferir(nombre)`` diagnostica al paciente con un motor (cache + executor)."""
+        parciales = [Parcial(nombre, self.pesos.get(nombre, 1.0), self.timeout) for nombre in self.motores()]
+        # Un solo temporizador para todos: el que no terminó a tiempo se cancela
+        tareas = [asyncio.create_task(self._parcial(p, inferir)) for p in parciales]
+        _, pendientes = await asyncio.wait(tareas, timeout=self.timeout)
+        for tarea in pendientes:
+            tarea.cancel()
+        for p in parciales:
+            if p.diagnosis is None and p.error is None:
+                p.error = f"Sin respuesta en {self.timeout:g} s"
+
+        trace = ["ENSEMBLE: promedio ponderado de P(dengue) por motor"]
+        suma = peso_total = 0.0
+        for p in parciales:
+            if p.probabilidad is None:
+                motivo = p.error or (p.diagnosis.label if p.diagnosis else "sin resultado")
+                trace.append(f"  - {p.motor}: no participa ({motivo})")
+                continue
+            suma += p.peso * p.probabilidad
+            peso_total += p.peso
+            trace.append(f"  - {p.motor}: {p.diagnosis.label} -> P(dengue) = {p.probabilidad:.1%} "
+                         f"x peso {p.peso:g}")
+
+        if not peso_total:
+            trace.append("Ningún motor dio un resultado combinable")
+            return ResultadoEnsemble(Diagnosis("Sin Diagnóstico Concluyente", 0.0, trace), parciales)
+        probabilidad = suma / peso_total
+        trace.append("---")
+        trace.append(f"  P(dengue) combinada = {probabilidad:.1%}")
+        return ResultadoEnsemble(Diagnosis(etiqueta(probabilidad), probabilidad, trace), parciales)
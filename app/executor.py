@@ -0,0 +1,260 @@
+"""Ejecución de la inferencia fuera del event loop de asyncio.
+
+Cada llamada a ``infer`` se despacha a un pool de hilos (o de procesos, para
+los motores que más CPU consumen, o a los workers propios de cada motor por
+un socket Unix, ver app/rpc.py) con un límite de concurrencia por motor.
+Si la cola de un motor está llena el pedido se rechaza enseguida
+(``Saturado`` -> HTTP 503) en lugar de acumularse sin fin, y cada pedido
+tiene un timeout (``TimeoutError`` -> HTTP 504).
+
+Configuración por variables de entorno:
+    INFERENCE_EXECUTOR     "thread" (por defecto), "process" o "socket"
+    INFERENCE_WORKERS      hilos/procesos del pool (por defecto CPUs)
+    INFERENCE_CONCURRENCY  pedidos simultáneos por motor (por defecto = workers)
+    INFERENCE_QUEUE        pedidos en espera por motor antes de rechazar (32)
+    INFERENCE_TIMEOUT      segundos por pedido, incluida la espera (10)
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping
+
+from app.systems import knowledge
+from app.systems.base import Diagnosis, InferenceEngine
+
+log = logging.getLogger(__name__)
+
+# Cada cuánto un worker de procesos revisa su archivo de conocimiento (ver app/reload.py)
+RECARGA = float(os.environ.get("KNOWLEDGE_POLL", 5))
+
+
+class Saturado(Exception):
+    """La cola del motor está llena: el pedido se rechaza (backpressure)."""
+
+
+# --- Procesos: cada worker construye sus propios motores, al primer uso ---
+_fabricas_proceso: Dict[str, Callable[[], InferenceEngine]] = {}
+_motores_proceso: Dict[str, InferenceEngine] = {}
+
+
+def _inicializar_proceso(fabricas):
+    _fabricas_proceso.update(fabricas)
+
+
+_revisiones_proceso: Dict[str, float] = {}
+_archivos_proceso: Dict[str, Any] = {}
+
+
+def _motor_proceso(nombre) -> InferenceEngine:
+    motor = _motores_proceso.get(nombre)
+    if motor is None:
+        motor = _motores_proceso[nombre] = _fabricas_proceso[nombre]()
+        _archivos_proceso[nombre] = knowledge.estado(nombre)
+        _revisiones_proceso[nombre] = time.monotonic() + RECARGA
+    elif RECARGA > 0 and time.monotonic() >= _revisiones_proceso[nombre]:
+        _revisiones_proceso[nombre] = time.monotonic() + RECARGA
+        motor = _recargar_proceso(nombre, motor)
+    return motor
+
+
+def _recargar_proceso(nombre, motor: InferenceEngine) -> InferenceEngine:
+    """Reconstruye el motor del worker si cambió su archivo de conocimiento.
+
+    El proceso principal valida y publica su propia copia (app/reload.py);
+    acá solo se reconstruye, y si falla se sigue con la que había.
+    """
+    actual = knowledge.estado(nombre)
+    if actual is None or actual == _archivos_proceso.get(nombre):
+        return motor
+    _archivos_proceso[nombre] = actual
+    try:
+        datos = knowledge.leer(nombre)
+        if knowledge.huella(datos) == motor.knowledge_hash:
+            return motor
+        nuevo = _fabricas_proceso[nombre](conocimiento=datos)
+    except Exception as e:
+        log.error("Worker %d: no se recargó el conocimiento de %s: %s", os.getpid(), nombre, e)
+        return motor
+    nuevo.model_version = motor.model_version + 1
+    _motores_proceso[nombre] = nuevo
+    return nuevo
+
+
+def _infer_en_proceso(nombre, facts, trace):
+    return _motor_proceso(nombre).infer(facts, trace)
+
+
+def _infer_batch_en_proceso(nombre, facts_list, trace):
+    return _motor_proceso(nombre).infer_batch(facts_list, trace)
+
+
+class _EstadoMotor:
+    def __init__(self, limite: int):
+        self.semaforo = asyncio.Semaphore(limite)
+        self.limite = limite
+        self.en_cola = 0
+        self.en_curso = 0
+        self.adquiridos = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.timeouts = 0
+        self.errores = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.ejecucion_total = 0.0
+
+
+class InferenceExecutor:
+    def __init__(self, engines: Mapping[str, InferenceEngine], kind: str = None,
+                 max_workers: int = None, concurrencia: int = None,
+                 cola_max: int = None, timeout: float = None):
+        self.engines = engines
+        self.kind = kind or os.environ.get("INFERENCE_EXECUTOR", "thread")
+        self.max_workers = max_workers or int(os.environ.get("INFERENCE_WORKERS", os.cpu_count() or 2))
+        self.concurrencia = concurrencia or int(os.environ.get("INFERENCE_CONCURRENCY", self.max_workers))
+        self.cola_max = cola_max if cola_max is not None else int(os.environ.get("INFERENCE_QUEUE", 32))
+        self.timeout = timeout or float(os.environ.get("INFERENCE_TIMEOUT", 10))
+
+        if self.kind == "thread":
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="inferencia")
+        elif self.kind == "process":
+            if hasattr(engines, "fabricas"):
+                # EngineRegistry: no hace falta construir los motores en el proceso principal
+                fabricas = engines.fabricas()
+            else:
+                fabricas = {nombre: type(engine) for nombre, engine in engines.items()}
+            self._pool = ProcessPoolExecutor(self.max_workers,
+                                             mp_context=multiprocessing.get_context("fork"),
+                                             initializer=_inicializar_proceso,
+                                             initargs=(fabricas,))
+        elif self.kind == "socket":
+            from app.rpc import ClienteMotores
+            self._pool = ClienteMotores(list(engines), timeout=self.timeout)
+            if hasattr(engines, "fabrica"):
+                # El registro guarda representantes: los motores no se importan acá
+                engines.fabrica = self._pool.representante
+        else:
+            raise ValueError(f"Tipo de executor desconocido: {self.kind}")
+
+        # Los semáforos de asyncio se crean por motor al primer uso, ya dentro del loop
+        self._estados: Dict[str, _EstadoMotor] = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, nombre: str) -> _EstadoMotor:
+        estado = self._estados.get(nombre)
+        if estado is None:
+            with self._lock:
+                estado = self._estados.setdefault(nombre, _EstadoMotor(self.concurrencia))
+        return estado
+
+    def _enviar(self, nombre: str, facts, lote: bool, trace: bool):
+        if self.kind == "socket":
+            return self._pool.enviar(nombre, facts, lote, trace)
+        if self.kind == "process":
+            funcion = _infer_batch_en_proceso if lote else _infer_en_proceso
+            return self._pool.submit(funcion, nombre, facts, trace)
+        engine = self.engines[nombre]
+        funcion = engine.infer_batch if lote else engine.infer
+        return self._pool.submit(funcion, facts, trace)
+
+    async def _despachar(self, nombre: str, facts, lote: bool, trace: bool = True):
+        if nombre not in self.engines:
+            raise KeyError(nombre)
+        estado = self._estado(nombre)
+        limite = time.monotonic() + self.timeout
+        t0 = time.perf_counter()
+        if not estado.semaforo.locked():
+            # Hay cupo libre: se toma sin esperar
+            await estado.semaforo.acquire()
+        else:
+            if estado.en_cola >= self.cola_max:
+                estado.rechazados += 1
+                raise Saturado(nombre)
+            estado.en_cola += 1
+            try:
+                await asyncio.wait_for(estado.semaforo.acquire(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                estado.timeouts += 1
+                raise TimeoutError(nombre)
+            finally:
+                estado.en_cola -= 1
+
+        espera = time.perf_counter() - t0
+        estado.adquiridos += 1
+        estado.espera_total += espera
+        estado.espera_max = max(estado.espera_max, espera)
+        estado.en_curso += 1
+
+        try:
+            futuro = self._enviar(nombre, facts, lote, trace)
+        except Exception:
+            estado.en_curso -= 1
+            estado.errores += 1
+            estado.semaforo.release()
+            raise
+        inicio = time.perf_counter()
+
+        def _liberar(_):
+            # El cupo se libera cuando el trabajo termina de verdad, aunque el
+            # pedido ya haya respondido por timeout: así el límite se respeta.
+            estado.en_curso -= 1
+            estado.ejecucion_total += time.perf_counter() - inicio
+            estado.semaforo.release()
+
+        loop = asyncio.get_running_loop()
+        futuro.add_done_callback(lambda f: loop.call_soon_threadsafe(_liberar, f))
+        try:
+            resultado = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)),
+                                               timeout=max(limite - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            estado.timeouts += 1
+            raise TimeoutError(nombre)
+        except Exception:
+            estado.errores += 1
+            raise
+        estado.completados += 1
+        return resultado
+
+    async def infer(self, nombre: str, facts: Dict[str, Any], trace: bool = True) -> Diagnosis:
+        return await self._despachar(nombre, facts, lote=False, trace=trace)
+
+    async def infer_batch(self, nombre: str, facts_list: List[Dict[str, Any]],
+                          trace: bool = True) -> List[Diagnosis]:
+        return await self._despachar(nombre, facts_list, lote=True, trace=trace)
+
+    def stats(self) -> Dict[str, Any]:
+        motores = {}
+        for nombre, e in list(self._estados.items()):
+            motores[nombre] = {
+                "limite": e.limite,
+                "en_cola": e.en_cola,
+                "en_curso": e.en_curso,
+                "completados": e.completados,
+                "rechazados": e.rechazados,
+                "timeouts": e.timeouts,
+                "errores": e.errores,
+                "espera_total_s": e.espera_total,
+                "espera_max_s": e.espera_max,
+                "espera_media_s": e.espera_total / e.adquiridos if e.adquiridos else 0.0,
+                "ejecucion_total_s": e.ejecucion_total,
+            }
+        stats = {
+            "tipo": self.kind,
+            "workers": self.max_workers,
+            "cola_max": self.cola_max,
+            "timeout_s": self.timeout,
+            "motores": motores,
+        }
+        if self.kind == "socket":
+            stats["procesos"] = self._pool.stats()
+        return stats
+
+    def shutdown(self):
+        if self.kind == "socket":
+            self._pool.cerrar()
+        else:
+            self._pool.shutdown(wait=False, cancel_futures=True)
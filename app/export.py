@@ -0,0 +1,105 @@
+"""Exportación columnar de learning_logs para análisis masivo.
+
+Escribe un directorio con un ``.npy`` por columna más ``esquema.json``. Los
+arrays se crean como memmap del tamaño final y se llenan por bloques de
+filas, así la memoria usada no depende del tamaño de la tabla. Se cargan
+con ``np.load(ruta, mmap_mode='r')``.
+
+Codificación:
+    id                 int64
+    timestamp          datetime64[us]
+    system_used,       int16 con el índice en ``categorias`` del esquema
+    diagnosis          (-1 = sin dato)
+    corrected          int8: 1 / 0 / -1 = sin dato
+    hechos booleanos   int8: 1 / 0 / -1 = sin dato
+    hechos numéricos   float64 (NaN = sin dato)
+
+Uso:
+    python -m app.export <directorio> [bloque]
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from app.database import COLUMNAS_HECHOS, get_db
+
+CATEGORICAS = ('system_used', 'diagnosis')
+BLOQUE = 50000
+
+
+def _tipo(columna: str):
+    if columna == 'id':
+        return np.int64
+    if columna == 'timestamp':
+        return 'datetime64[us]'
+    if columna in CATEGORICAS:
+        return np.int16
+    if columna == 'corrected' or COLUMNAS_HECHOS.get(columna) is bool:
+        return np.int8
+    return np.float64
+
+
+def _convertir(columna, valores, categorias):
+    if columna == 'timestamp':
+        return np.array([v or 'NaT' for v in valores], dtype='datetime64[us]')
+    if columna in CATEGORICAS:
+        codigos = categorias[columna]
+        return np.array([codigos.setdefault(v, len(codigos)) if v is not None else -1
+                         for v in valores], dtype=np.int16)
+    tipo = _tipo(columna)
+    if tipo is np.int8:
+        return np.array([-1 if v is None else int(bool(v)) for v in valores], dtype=np.int8)
+    if tipo is np.float64:
+        return np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+    return np.array(valores, dtype=tipo)
+
+
+def exportar(directorio: str, db=None, bloque: int = BLOQUE) -> int:
+    """Exporta las filas existentes al empezar; devuelve cuántas se escribieron."""
+    db = db or get_db()
+    columnas = ['id', 'timestamp', 'system_used', 'diagnosis', 'corrected', *COLUMNAS_HECHOS]
+    os.makedirs(directorio, exist_ok=True)
+    categorias = {c: {} for c in CATEGORICAS}
+    consulta = (f"SELECT {', '.join(columnas)} FROM learning_logs "
+                "WHERE id > ? ORDER BY id LIMIT ?")
+
+    # Una sola transacción de lectura: el conteo y los bloques ven la misma
+    # foto de la tabla (WAL), aunque el feedback siga escribiendo o se
+    # borren filas mientras tanto. Lo que llegue después queda fuera.
+    with db.conn:
+        (n,) = db.execute("SELECT COUNT(*) FROM learning_logs").fetchone()
+        arrays = {c: np.lib.format.open_memmap(os.path.join(directorio, f"{c}.npy"), mode='w+',
+                                               dtype=_tipo(c), shape=(n,))
+                  for c in columnas}
+        escritas, desde = 0, 0
+        while escritas < n:
+            filas = db.execute(consulta, (desde, min(bloque, n - escritas))).fetchall()
+            if not filas:
+                break
+            fin = escritas + len(filas)
+            for i, columna in enumerate(columnas):
+                arrays[columna][escritas:fin] = _convertir(columna, [f[i] for f in filas], categorias)
+            escritas = fin
+            desde = filas[-1][0]
+
+    for array in arrays.values():
+        array.flush()
+    esquema = {
+        "filas": escritas,
+        "columnas": {c: str(np.dtype(_tipo(c))) for c in columnas},
+        # Código -> etiqueta, en orden
+        "categorias": {c: list(codigos) for c, codigos in categorias.items()},
+    }
+    with open(os.path.join(directorio, "esquema.json"), "w") as f:
+        json.dump(esquema, f, ensure_ascii=False, indent=2)
+    return escritas
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    bloque = int(sys.argv[2]) if len(sys.argv) > 2 else BLOQUE
+    filas = exportar(sys.argv[1], bloque=bloque)
+    print(f"{filas} filas exportadas a {sys.argv[1]}")
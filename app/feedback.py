@@ -0,0 +1,202 @@
+"""Escritura asíncrona y por lotes del feedback de /learn.
+
+Los registros se encolan en memoria y una tarea de fondo los escribe en
+``learning_logs`` en una sola transacción por lote, cuando se juntan
+``max_lote`` registros o pasan ``intervalo`` segundos desde el primero.
+La cola es acotada: si se llena, ``submit`` espera (backpressure) en lugar
+de descartar datos, y tras ``espera_max`` segundos lanza ``ColaLlena``
+(/learn responde 503). ``stop`` vacía la cola antes de cerrar.
+
+Un lote que no se pudo escribir no se descarta: queda como el próximo a
+escribir y se reintenta con espera creciente, así la cola se llena y el
+backpressure llega a los clientes. Si al cerrar la base sigue sin
+responder, lo pendiente se guarda en ``archivo_pendiente`` (JSON Lines) y
+se escribe al arrancar la próxima vez.
+
+Todas las escrituras van por un único hilo con su propia conexión, así
+SQLite no ve escritores concurrentes desde este proceso.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from app.database import get_db
+
+log = logging.getLogger(__name__)
+
+# Marca de fin que stop() encola detrás de los registros pendientes
+_FIN = object()
+
+# Intentos por lote durante stop() antes de pasarlo a archivo_pendiente
+REINTENTOS = 5
+# Tope de la espera entre reintentos (segundos)
+ESPERA_REINTENTO = 30.0
+
+
+class ColaLlena(Exception):
+    """La cola siguió llena durante ``espera_max``: el registro no se encoló."""
+
+
+class FeedbackWriter:
+    def __init__(self, db_factory: Callable = get_db, max_lote: int = None,
+                 intervalo: float = None, capacidad: int = None,
+                 espera_max: float = None, archivo_pendiente: str = None):
+        self.db_factory = db_factory
+        self.max_lote = max_lote or int(os.environ.get("FEEDBACK_BATCH", 100))
+        self.intervalo = intervalo or float(os.environ.get("FEEDBACK_INTERVAL", 1.0))
+        self.capacidad = capacidad or int(os.environ.get("FEEDBACK_CAPACITY", 10000))
+        self.espera_max = espera_max or float(os.environ.get("FEEDBACK_SUBMIT_TIMEOUT", 10.0))
+        self.archivo_pendiente = archivo_pendiente or os.environ.get("FEEDBACK_SPILL",
+                                                                     "feedback_pendiente.jsonl")
+
+        self._cola: asyncio.Queue = None
+        self._tarea: asyncio.Task = None
+        self._deteniendo: asyncio.Event = None
+        self._hilo = ThreadPoolExecutor(1, thread_name_prefix="feedback")
+        self._db = None
+        # Lo que no se pudo escribir durante stop(); termina en archivo_pendiente
+        self._sin_escribir: List[Dict[str, Any]] = []
+
+        self.escritos = 0
+        self.lotes = 0
+        self.errores = 0
+        self.reintentando = 0   # registros del lote que espera reintento
+        self.recuperados = 0    # leídos de archivo_pendiente al arrancar
+        self.guardados = 0      # pasados a archivo_pendiente al cerrar
+        self.esperas = 0        # submit() que encontraron la cola llena
+        self.rechazados = 0     # submit() que agotaron espera_max
+
+    def start(self):
+        """Arranca la tarea de fondo (dentro del event loop)."""
+        self._cola = asyncio.Queue(maxsize=self.capacidad)
+        self._deteniendo = asyncio.Event()
+        self._sin_escribir = []
+        self._tarea = asyncio.create_task(self._bucle(self._recuperar()))
+
+    async def submit(self, registro: Dict[str, Any]):
+        """Encola el registro; espera si la cola está llena y lanza ColaLlena tras espera_max."""
+        if self._cola.full():
+            self.esperas += 1
+            try:
+                await asyncio.wait_for(self._cola.put(registro), timeout=self.espera_max)
+            except asyncio.TimeoutError:
+                self.rechazados += 1
+                raise ColaLlena(f"Cola de feedback llena ({self.capacidad} registros)") from None
+        else:
+            self._cola.put_nowait(registro)
+
+    def _recuperar(self) -> List[Dict[str, Any]]:
+        """Registros que quedaron sin escribir al cerrar la vez anterior."""
+        try:
+            with open(self.archivo_pendiente, encoding="utf-8") as f:
+                registros = [json.loads(linea) for linea in f if linea.strip()]
+        except FileNotFoundError:
+            return []
+        self.recuperados = len(registros)
+        log.warning("Se recuperan %d registros de feedback de %s", len(registros), self.archivo_pendiente)
+        return registros
+
+    async def _bucle(self, recuperados: List[Dict[str, Any]]):
+        for i in range(0, len(recuperados), self.max_lote):
+            await self._flush(recuperados[i:i + self.max_lote])
+        if recuperados and not self._sin_escribir:
+            # Si el proceso muere antes de este punto se reescriben al volver
+            # (duplicados antes que perdidos)
+            os.remove(self.archivo_pendiente)
+        fin = False
+        while not fin:
+            registro = await self._cola.get()
+            if registro is _FIN:
+                break
+            lote = [registro]
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    registro = await asyncio.wait_for(self._cola.get(), timeout=restante)
+                except asyncio.TimeoutError:
+                    break
+                if registro is _FIN:
+                    fin = True
+                    break
+                lote.append(registro)
+            await self._flush(lote)
+
+    async def _flush(self, lote: List[Dict[str, Any]]):
+        """Escribe el lote; reintenta hasta lograrlo mientras no se esté cerrando."""
+        if self._sin_escribir:
+            # Ya se agotaron los reintentos en stop(): no se insiste con cada lote
+            self._sin_escribir.extend(lote)
+            return
+        loop = asyncio.get_running_loop()
+        intento = 0
+        while True:
+            try:
+                await loop.run_in_executor(self._hilo, self._escribir, lote)
+                self.escritos += len(lote)
+                self.lotes += 1
+                self.reintentando = 0
+                return
+            except Exception:
+                # Base bloqueada, disco lleno...: el lote sigue siendo el próximo
+                # y la cola se llena mientras tanto (backpressure)
+                self.errores += 1
+                self.reintentando = len(lote)
+                intento += 1
+                log.exception("Error escribiendo feedback (intento %d)", intento)
+            if self._deteniendo.is_set() and intento >= REINTENTOS:
+                self._sin_escribir.extend(lote)
+                self.reintentando = 0
+                return
+            espera = min(ESPERA_REINTENTO, min(self.intervalo, 1.0) * 2 ** (intento - 1))
+            try:
+                # stop() corta la espera para no demorar el cierre
+                await asyncio.wait_for(self._deteniendo.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+    def _guardar_pendientes(self):
+        with open(self.archivo_pendiente, "w", encoding="utf-8") as f:
+            for registro in self._sin_escribir:
+                f.write(json.dumps(registro) + "\n")
+        self.guardados += len(self._sin_escribir)
+        log.error("La base no respondió al cerrar: %d registros de feedback quedan en %s",
+                  len(self._sin_escribir), self.archivo_pendiente)
+
+    def _escribir(self, lote: List[Dict[str, Any]]):
+        if self._db is None:
+            self._db = self.db_factory()
+        with self._db.conn:  # una transacción por lote
+            self._db.t.learning_logs.insert_all(lote)
+
+    async def stop(self):
+        """Escribe todo lo encolado y detiene la tarea de fondo."""
+        if self._tarea is None:
+            return
+        self._deteniendo.set()
+        await self._cola.put(_FIN)
+        await self._tarea
+        if self._sin_escribir:
+            self._guardar_pendientes()
+        self._hilo.shutdown(wait=True)
+        self._tarea = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "en_cola": self._cola.qsize() if self._cola else 0,
+            "capacidad": self.capacidad,
+            "escritos": self.escritos,
+            "lotes": self.lotes,
+            "errores": self.errores,
+            "reintentando": self.reintentando,
+            "recuperados": self.recuperados,
+            "guardados": self.guardados,
+            "esperas": self.esperas,
+            "rechazados": self.rechazados,
+        }
@@ -0,0 +1,261 @@
+"""Aprendizaje incremental de las CPDs bayesianas a partir de learning_logs.
+
+Cada fila de feedback con una etiqueta interpretable (un motor cuyo
+diagnóstico afirma o descarta dengue, y el usuario dijo si era correcto) es
+una observación completa de Nexo, Dengue y los síntomas observados. Solo
+cuentan las filas de los motores de ``ETIQUETAS_DENGUE`` con una de sus
+etiquetas; el resto (ensemble, etiquetas intermedias, errores, nombres de
+motor desconocidos) se ignora. De ellas solo se guardan
+estadísticas suficientes: conteos por configuración de padres de cada CPD.
+
+Las CPDs nuevas son la media posterior de una Dirichlet cuyo prior es la
+CPD original del experto con peso ``prior_ess`` (tamaño muestral
+equivalente) por configuración de padres:
+
+    P(x | padres) = (ess * P0(x | padres) + n(x, padres)) / (ess + n(padres))
+
+Sin datos, el modelo es exactamente el original. DolorCuerpo nunca se
+observa y conserva su CPD.
+
+La tabla se recorre por bloques desde el último id procesado; los conteos y
+ese id se guardan en un checkpoint JSON (escritura atómica), así al
+reiniciar no se vuelve a leer lo ya contado. El modelo nuevo se publica con
+``BayesianEngine.update_cpds``, que lo arma aparte y lo intercambia sin
+frenar los pedidos en curso.
+
+Riesgo: es un lazo de realimentación. La etiqueta es el diagnóstico de un
+motor confirmado o negado por quien usa la aplicación, y /learn no tiene
+autenticación: unas decenas de envíos (con ``prior_ess`` 20 por
+configuración de padres) alcanzan para cambiar los diagnósticos en
+producción, y el modelo aprende en parte de sus propias salidas. Por eso
+está desactivado por defecto; activarlo solo donde el feedback venga de
+usuarios confiables.
+
+Configuración por variables de entorno:
+    BAYES_LEARN_INTERVAL     segundos entre actualizaciones; 0 la desactiva (0)
+    BAYES_LEARN_CHECKPOINT   archivo de conteos (.cache/bayes_counts.json)
+    BAYES_PRIOR_ESS          peso del prior del experto por configuración (20)
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.database import get_db
+
+if TYPE_CHECKING:
+    # pgmpy es caro de importar: solo se carga junto con el motor
+    from app.systems.probabilistic import BayesianEngine
+
+log = logging.getLogger(__name__)
+
+INTERVALO = float(os.environ.get("BAYES_LEARN_INTERVAL", 0))
+
+# Por motor (system_used), diagnósticos que afirman (True) o descartan
+# (False) dengue. Los intermedios ("SOSPECHOSO", "MEDIA", "Sin Diagnóstico"),
+# los errores y el ensemble no se usan.
+ETIQUETAS_DENGUE = {
+    "deterministico": {
+        "DENGUE (Alta Probabilidad)": True,
+        "Sospecha de Dengue (Importado)": True,
+        "Posible COVID-19": False,
+    },
+    "probabilistico": {
+        "ALTA PROBABILIDAD DENGUE": True,
+        "Baja Probabilidad Dengue": False,
+    },
+    "difuso": {
+        "ALTA Probabilidad Dengue": True,
+        "BAJA Probabilidad Dengue": False,
+    },
+}
+
+# Nodo -> padre en la red (None para la raíz). Son las CPDs que se aprenden.
+PADRES = {
+    'Nexo': None,
+    'Dengue': 'Nexo',
+    'Fiebre': 'Dengue',
+    'DolorCabeza': 'Dengue',
+    'Tos': 'Dengue',
+    'DolorGarganta': 'Dengue',
+}
+
+BLOQUE = 1000
+
+
+def dengue_observado(system_used: str, diagnosis: str, correcto: bool) -> Optional[int]:
+    """1/0 si la fila dice si el paciente tenía dengue; None si no se puede saber."""
+    afirma = ETIQUETAS_DENGUE.get(system_used, {}).get(diagnosis)
+    if afirma is None:
+        return None
+    return int(afirma == bool(correcto))
+
+
+class AprendizajeBayesiano:
+    def __init__(self, engine: "BayesianEngine", db_factory: Callable = get_db,
+                 checkpoint: str = None, prior_ess: float = None, intervalo: float = None):
+        self.engine = engine
+        self.db_factory = db_factory
+        self.checkpoint = checkpoint or os.environ.get("BAYES_LEARN_CHECKPOINT", ".cache/bayes_counts.json")
+        self.prior_ess = prior_ess if prior_ess is not None else float(os.environ.get("BAYES_PRIOR_ESS", 20))
+        self.intervalo = INTERVALO if intervalo is None else intervalo
+
+        # CPDs del experto: el prior de la Dirichlet (no cambian con los datos)
+        self.prior = {nodo: engine.model.get_cpds(nodo).get_values().copy() for nodo in PADRES}
+        self.conteos = {nodo: np.zeros_like(p) for nodo, p in self.prior.items()}
+        self.ultimo_id = 0
+        self.filas = 0          # filas leídas (útiles o no)
+        self.observaciones = 0  # filas que sumaron conteos
+        self.actualizaciones = 0
+
+        self._lock = threading.Lock()
+        self._tarea: asyncio.Task = None
+        self._db = None
+        self._cargar_checkpoint()
+
+    # --- Checkpoint ---
+    def _cargar_checkpoint(self):
+        try:
+            with open(self.checkpoint) as f:
+                datos = json.load(f)
+            conteos = {nodo: np.asarray(datos["conteos"][nodo], dtype=np.float64) for nodo in PADRES}
+        except (OSError, ValueError, KeyError):
+            return
+        if any(conteos[n].shape != self.conteos[n].shape for n in PADRES):
+            return
+        self.conteos = conteos
+        self.ultimo_id = int(datos["ultimo_id"])
+        self.filas = int(datos.get("filas", 0))
+        self.observaciones = int(datos.get("observaciones", 0))
+
+    def _guardar_checkpoint(self):
+        datos = {
+            "ultimo_id": self.ultimo_id,
+            "filas": self.filas,
+            "observaciones": self.observaciones,
+            "conteos": {nodo: c.tolist() for nodo, c in self.conteos.items()},
+        }
+        directorio = os.path.dirname(self.checkpoint) or "."
+        os.makedirs(directorio, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(datos, f)
+            os.replace(tmp, self.checkpoint)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # --- Conteos ---
+    def _contar(self, system_used: str, inputs: str, diagnosis: str, correcto) -> bool:
+        dengue = dengue_observado(system_used, diagnosis, correcto)
+        if dengue is None:
+            return False
+        try:
+            facts = json.loads(inputs)
+            evidence, _ = self.engine._evidencia(facts)
+        except (TypeError, ValueError, KeyError):
+            return False
+        valores = dict(evidence, Dengue=dengue)
+        for nodo, padre in PADRES.items():
+            # get_values(): forma (estado, config. de padres); la raíz, (estado, 1)
+            self.conteos[nodo][valores[nodo], valores[padre] if padre else 0] += 1
+        return True
+
+    def _leer_nuevas(self) -> int:
+        if self._db is None:
+            self._db = self.db_factory()
+        nuevas = 0
+        while True:
+            filas = self._db.execute(
+                "SELECT id, system_used, inputs, diagnosis, corrected FROM learning_logs "
+                "WHERE id > ? ORDER BY id LIMIT ?", (self.ultimo_id, BLOQUE)).fetchall()
+            if not filas:
+                return nuevas
+            for id_, system_used, inputs, diagnosis, corrected in filas:
+                if self._contar(system_used, inputs, diagnosis, corrected):
+                    self.observaciones += 1
+                self.ultimo_id = id_
+            self.filas += len(filas)
+            nuevas += len(filas)
+
+    def cpds(self):
+        """CPDs posteriores (media de la Dirichlet) a partir de los conteos actuales."""
+        from pgmpy.factors.discrete import TabularCPD
+
+        cpds = []
+        for nodo, padre in PADRES.items():
+            prior = self.prior[nodo]
+            n = self.conteos[nodo]
+            valores = (self.prior_ess * prior + n) / (self.prior_ess + n.sum(axis=0))
+            if padre is None:
+                cpds.append(TabularCPD(nodo, 2, valores))
+            else:
+                cpds.append(TabularCPD(nodo, 2, valores, evidence=[padre], evidence_card=[2]))
+        return cpds
+
+    def actualizar(self) -> int:
+        """Cuenta las filas nuevas, publica el modelo y guarda el checkpoint.
+
+        Devuelve la cantidad de filas nuevas leídas. La primera vez (sin
+        checkpoint) recorre la tabla entera por bloques.
+        """
+        with self._lock:
+            antes = self.observaciones
+            nuevas = self._leer_nuevas()
+            if self.observaciones != antes or (self.actualizaciones == 0 and self.observaciones):
+                self.engine.update_cpds(*self.cpds())
+                self.actualizaciones += 1
+            if nuevas:
+                self._guardar_checkpoint()
+            return nuevas
+
+    def adoptar(self, engine: "BayesianEngine"):
+        """Pasa a aprender sobre ``engine`` (un modelo recargado, aún sin publicar).
+
+        Sus CPDs son el nuevo prior; si ya hay observaciones se le aplican
+        antes de que atienda pedidos, así nunca se publica sin lo aprendido.
+        """
+        with self._lock:
+            self.prior = {nodo: engine.model.get_cpds(nodo).get_values().copy() for nodo in PADRES}
+            self.engine = engine
+            if self.observaciones:
+                engine.update_cpds(*self.cpds())
+
+    # --- Tarea periódica ---
+    def start(self):
+        if self.intervalo > 0:
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def _bucle(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.actualizar)
+            except Exception:
+                log.exception("Error actualizando las CPDs bayesianas")
+            await asyncio.sleep(self.intervalo)
+
+    async def stop(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ultimo_id": self.ultimo_id,
+            "filas": self.filas,
+            "observaciones": self.observaciones,
+            "actualizaciones": self.actualizaciones,
+            "version_modelo": self.engine.model_version,
+            "prior_ess": self.prior_ess,
+        }
@@ -1,22 +1,79 @@
 from fasthtml.common import *
+import asyncio
 import json
+import os
 from datetime import datetime
+import numpy as np
+from pydantic import ValidationError
 
 # Imports internos
-from app.database import get_db
-from app.systems.deterministic import RuleBasedEngine
-from app.systems.probabilistic import BayesianEngine
-from app.systems.fuzzy_logic import FuzzyEngine
+from app.database import columnas_hechos, completar_columnas, get_db
+from app.registry import EngineRegistry
+from app.report import ReporteAciertos
+from app.executor import InferenceExecutor, Saturado
+from app.feedback import ColaLlena, FeedbackWriter
+from app.cache import ResultCache
+from app import ensemble as ens
+from app.metrics import Metricas
+from app.reload import Recargador
+from app.systems.facts import HechosInvalidos, PatientFacts
+from app.systems.schemas import DiagnosisResult, PatientData
+from app import learning, sensitivity
 
-app, rt = fast_app(hdrs=(picolink,))
-db = get_db()
-Logs = db.t.learning_logs
+# Aprendizaje de las CPDs bayesianas desde learning_logs (si el motor está habilitado)
+aprendizaje = None
 
-engines = {
-    "deterministico": RuleBasedEngine(),
-    "probabilistico": BayesianEngine(),
-    "difuso": FuzzyEngine()
-}
+async def _al_iniciar():
+    global aprendizaje
+    feedback.start()
+    # Esquema listo antes de que otros hilos abran la base; las filas
+    # anteriores a las columnas tipadas se completan en segundo plano
+    asyncio.get_running_loop().run_in_executor(None, completar_columnas, get_db())
+    engines.precalentar()
+    if executor.kind == "socket":
+        # Los motores corren en sus workers, que recargan su conocimiento solos;
+        # el aprendizaje necesita el modelo bayesiano en este proceso
+        return
+    if "probabilistico" in engines and learning.INTERVALO > 0:
+        aprendizaje = learning.AprendizajeBayesiano(await engines.obtener("probabilistico"))
+        aprendizaje.start()
+        # Un modelo recargado se publica ya con las CPDs aprendidas
+        recargador.preparar["probabilistico"] = aprendizaje.adoptar
+    recargador.start()
+
+async def _al_cerrar():
+    await recargador.stop()
+    if aprendizaje is not None:
+        await aprendizaje.stop()
+    # Primero se vuelca el feedback pendiente, después se corta la inferencia
+    await feedback.stop()
+    executor.shutdown()
+
+app, rt = fast_app(hdrs=(picolink,), on_startup=[_al_iniciar], on_shutdown=[_al_cerrar])
+
+# El feedback de /learn se escribe por lotes en segundo plano
+feedback = FeedbackWriter()
+
+# Los motores se importan y construyen al primer uso (o en el precalentamiento)
+engines = EngineRegistry()
+
+# La inferencia corre en un pool aparte para no bloquear el event loop
+executor = InferenceExecutor(engines)
+
+# Aciertos por motor según el feedback (incremental, desde el último id)
+reporte = ReporteAciertos()
+
+# Diagnósticos repetidos (mismos hechos, mismo motor) se responden del cache
+cache = ResultCache()
+
+# Los motores en paralelo sobre el mismo paciente (opción "ensemble")
+ensemble = ens.Ensemble(engines)
+
+# Tiempos por etapa, contadores de pedidos/errores y perfiles de pedidos lentos
+metricas = Metricas()
+
+# Cambios en los archivos de conocimiento -> modelo nuevo, validado y publicado en caliente
+recargador = Recargador(engines)
 
 # --- NUEVOS COMPONENTES VISUALES ---
 
@@ -32,8 +89,14 @@ def ReasoningStep(text, step_num):
         style="padding: 10px 12px; border-left: 3px solid #444; margin-bottom: 6px; background-color: #2d2d2d; border-radius: 4px; display: flex; align-items: flex-start;"
     )
 
-def DiagnosisCard(diag, system_name, inputs):
-    inputs_json = json.dumps(inputs)
+def ReasoningSteps(diag):
+    """Traza del razonamiento como lista de componentes."""
+    return [ReasoningStep(step, i+1) for i, step in enumerate(diag.reasoning)]
+
+def DiagnosisCard(diag, system_name, inputs, steps=None):
+    inputs_json = json.dumps(inputs.a_dict())
+    if steps is None:
+        steps = ReasoningSteps(diag)
     
     # Colores semánticos
     is_danger = "DENGUE" in diag.label.upper() or diag.confidence > 0.7
@@ -42,7 +105,8 @@ def DiagnosisCard(diag, system_name, inputs):
     return Article(
         Header(
             Div(
-                Small(f"Motor utilizado: {system_name.replace('_', ' ').title()}"),
+                Small(f"Motor utilizado: {system_name.replace('_', ' ').title()}"
+                      + (f" (modelo {diag.model_version})" if diag.model_version else "")),
                 H2(diag.label, style=f"color: {header_color}; margin-top:0;"),
                 style="display: flex; flex-direction: column;"
             )
@@ -56,27 +120,66 @@ def DiagnosisCard(diag, system_name, inputs):
         Details(
             Summary("Ver proceso de decision (Paso a paso)", style="color: #e0e0e0; cursor: pointer;"),
             Div(
-                *[ReasoningStep(step, i+1) for i, step in enumerate(diag.reasoning)],
+                *steps,
                 style="margin-top: 10px; padding: 15px; background-color: #1e1e1e; border-radius: 8px;"
             ),
             open=True,
             style="background-color: #252525; padding: 15px; border-radius: 10px; border: 1px solid #333;"
         ),
         
-        Footer(
-            Form(
-                Input(type="hidden", name="system_used", value=system_name),
-                Input(type="hidden", name="diagnosis", value=diag.label),
-                Input(type="hidden", name="inputs", value=inputs_json),
-                Grid(
-                    Button("Correcto (Aprender)", name="correct", value="true", cls="outline"),
-                    Button("Incorrecto", name="correct", value="false", cls="outline secondary")
-                ),
-                hx_post="/learn",
-                hx_target="#learning-msg"
+        FeedbackForm(system_name, diag, inputs_json)
+    )
+
+def FeedbackForm(system_name, diag, inputs_json):
+    return Footer(
+        Form(
+            Input(type="hidden", name="system_used", value=system_name),
+            Input(type="hidden", name="diagnosis", value=diag.label),
+            Input(type="hidden", name="confidence", value=str(diag.confidence)),
+            Input(type="hidden", name="inputs", value=inputs_json),
+            Grid(
+                Button("Correcto (Aprender)", name="correct", value="true", cls="outline"),
+                Button("Incorrecto", name="correct", value="false", cls="outline secondary")
             ),
-            Div(id="learning-msg", style="margin-top:10px; font-weight:bold;")
-        )
+            hx_post="/learn",
+            hx_target="#learning-msg"
+        ),
+        Div(id="learning-msg", style="margin-top:10px; font-weight:bold;")
+    )
+
+def SubResult(parcial):
+    """Resultado de un motor dentro de la tarjeta del ensemble."""
+    nombre = parcial.motor.replace('_', ' ').title()
+    tiempo = Small(f"{parcial.segundos * 1000:.0f} ms", style="color: #888;")
+    if parcial.diagnosis is None:
+        return Div(Strong(nombre), " ", tiempo, P(parcial.error, style="color: #d93526; margin: 0;"),
+                   style="padding: 10px 0; border-bottom: 1px solid #333;")
+    diag = parcial.diagnosis
+    return Div(
+        Strong(nombre), " ", tiempo,
+        P(f"{diag.label} ({diag.confidence:.1%})", style="margin: 0;"),
+        Progress(value=str(int(diag.confidence*100)), max="100"),
+        Details(
+            Summary("Razonamiento", style="color: #e0e0e0; cursor: pointer;"),
+            Div(*ReasoningSteps(diag), style="margin-top: 10px;"),
+        ),
+        style="padding: 10px 0; border-bottom: 1px solid #333;"
+    )
+
+def EnsembleCard(resultado, inputs):
+    diag = resultado.diagnosis
+    header_color = "#d93526" if diag.confidence > 0.65 else "#3e8ed0"
+    return Article(
+        Header(
+            Small(f"Ensemble: {', '.join(p.motor for p in resultado.parciales)}"),
+            H2(diag.label, style=f"color: {header_color}; margin-top:0;"),
+        ),
+        Label(f"P(dengue) combinada: {diag.confidence:.1%}"),
+        Progress(value=str(int(diag.confidence*100)), max="100"),
+        Div(*[ReasoningStep(step, i+1) for i, step in enumerate(diag.reasoning)],
+            style="margin: 10px 0; padding: 15px; background-color: #1e1e1e; border-radius: 8px;"),
+        *[SubResult(p) for p in resultado.parciales],
+        FeedbackForm(ens.NOMBRE, diag, json.dumps(inputs.a_dict())),
     )
 
 # --- RUTAS ---
@@ -109,9 +212,13 @@ def get():
                 Grid(
                     Label("Temperatura (°C)", Input(type="number", name="fiebre", step="0.1", value="38.5")),
                     Label("Motor de Inferencia", Select(
-                        Option("Experta (Reglas)", value="deterministico"),
-                        Option("Pgmpy (Bayesiano)", value="probabilistico"),
-                        Option("Scikit-Fuzzy (Difuso)", value="difuso"),
+                        *[Option(texto, value=nombre) for nombre, texto in (
+                            ("deterministico", "Experta (Reglas)"),
+                            ("probabilistico", "Pgmpy (Bayesiano)"),
+                            ("difuso", "Scikit-Fuzzy (Difuso)"),
+                        ) if nombre in engines],
+                        *([Option("Ensemble (los tres en paralelo)", value=ens.NOMBRE)]
+                          if len(ensemble.motores()) > 1 else []),
                         name="engine"
                     ))
                 ),
@@ -148,46 +255,353 @@ def get():
         )
     )
 
+def facts_from_form(form):
+    """Hechos del paciente desde el formulario HTML (HechosInvalidos si algún valor no sirve)."""
+    return PatientFacts.desde_formulario(form)
+
+def facts_from_json(data):
+    """Mismos hechos que facts_from_form, desde un objeto JSON."""
+    return PatientFacts.desde_dict(data)
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+async def _inferir(engine_name, facts, pedido, trace=True):
+    """Diagnóstico desde el cache o el executor; propaga Saturado y TimeoutError."""
+    with pedido.etapa("carga_motor"):
+        engine = await engines.obtener(engine_name)
+    with pedido.etapa("cache"):
+        prediction = cache.get(engine_name, engine, facts)
+    if prediction is None:
+        version = engine.model_version
+        # Inferencia (fuera del event loop; incluye la espera en la cola)
+        with pedido.etapa("inferencia"):
+            prediction = await executor.infer(engine_name, facts, trace)
+        metricas.diagnosticos(engine_name, [prediction])
+        # Sin traza no se guarda: el cache también responde a /diagnose. Un
+        # worker de procesos puede tardar en tomar un conocimiento recargado:
+        # lo que responda con el anterior tampoco se guarda.
+        if trace and prediction.model_version.startswith(f"{engine.knowledge_version}/"):
+            cache.put(engine_name, engine, facts, prediction, version)
+    return prediction
+
 @rt("/diagnose")
 async def post(req):
-    form = await req.form()
-    # Mapeo de inputs
-    facts = {
-        'fiebre': float(form.get('fiebre', 36)),
-        # Variables difusas (sliders 0-10)
-        'intensidad_dolor_cabeza': float(form.get('intensidad_dolor_cabeza', 5)),
-        'intensidad_tos': float(form.get('intensidad_tos', 5)),
-        # Variables binarias
-        'tos': form.get('tos') == "on",
-        'dolor_garganta': form.get('dolor_garganta') == "on",
-        'dolor_cabeza': form.get('dolor_cabeza_check') == "on",
-        'viaje_brasil': form.get('viaje_brasil') == "on",
-        'contacto_dengue': form.get('contacto_dengue') == "on",
-        'vive_corrientes': form.get('vive_corrientes') == "on",
-        'verano': form.get('verano') == "on"
-    }
+    pedido = metricas.pedido("/diagnose")
+    try:
+        return await _diagnosticar(req, pedido)
+    finally:
+        pedido.terminar()
+
+async def _diagnosticar(req, pedido):
+    with pedido.etapa("formulario"):
+        form = await req.form()
+        try:
+            facts = facts_from_form(form)
+        except HechosInvalidos as e:
+            pedido.resultado = "formulario_invalido"
+            return HTMLResponse(to_xml(P(f"Datos inválidos: {e}")), status_code=400)
     
     engine_name = form.get('engine')
+    if engine_name == ens.NOMBRE:
+        pedido.motor = engine_name
+        return await _diagnosticar_ensemble(facts, pedido)
     if engine_name in engines:
-        # Inferencia
-        prediction = engines[engine_name].infer(facts)
-        # Renderizado visual mejorado
-        return DiagnosisCard(prediction, engine_name, facts)
+        pedido.motor = engine_name
+        try:
+            prediction = await _inferir(engine_name, facts, pedido)
+        except Saturado:
+            pedido.resultado = "saturado"
+            return HTMLResponse(to_xml(P("Servidor saturado, intente nuevamente.")), status_code=503)
+        except TimeoutError:
+            pedido.resultado = "timeout"
+            return HTMLResponse(to_xml(P("La inferencia excedió el tiempo límite.")), status_code=504)
+        # Renderizado visual mejorado (acá, para medirlo aparte)
+        with pedido.etapa("traza"):
+            steps = ReasoningSteps(prediction)
+        with pedido.etapa("render"):
+            html = to_xml(DiagnosisCard(prediction, engine_name, facts, steps))
+        pedido.resultado = "ok"
+        return HTMLResponse(html)
     
+    pedido.resultado = "motor_no_encontrado"
     return P("Error: Motor no encontrado")
 
+@rt("/diagnose/batch")
+async def post(req):
+    """Diagnóstico por lotes: {"engine": "...", "patients": [{...}, ...]} -> JSON.
+
+    Con "trace": false los resultados no incluyen el razonamiento (más rápido).
+    """
+    pedido = metricas.pedido("/diagnose/batch")
+    try:
+        return await _diagnosticar_lote(req, pedido)
+    finally:
+        pedido.terminar()
+
+# Pacientes por pedido a /diagnose/batch: un lote ocupa un cupo del executor
+# hasta terminar, así que su tamaño acota cuánto bloquea a los demás
+LOTE_MAX = int(os.environ.get("BATCH_MAX", 1000))
+
+async def _diagnosticar_lote(req, pedido):
+    try:
+        with pedido.etapa("formulario"):
+            body = await req.json()
+            patients = body.get('patients', [])
+            if not isinstance(patients, list):
+                raise TypeError("patients: se espera una lista")
+            if len(patients) > LOTE_MAX:
+                pedido.resultado = "lote_grande"
+                return JSONResponse({"error": f"Demasiados pacientes: {len(patients)} (máximo {LOTE_MAX})"},
+                                    status_code=413)
+            facts_list = [facts_from_json(p) for p in patients]
+            trace = body.get('trace', True)
+            # Solo un booleano JSON: bool("false") sería True
+            if not isinstance(trace, bool):
+                raise ValueError(f"trace: se espera true/false, no {trace!r}")
+    except (ValueError, TypeError, AttributeError) as e:
+        pedido.resultado = "json_invalido"
+        return JSONResponse({"error": f"JSON inválido: {e}"}, status_code=400)
+
+    engine_name = body.get('engine')
+    if engine_name not in engines:
+        pedido.resultado = "motor_no_encontrado"
+        return JSONResponse({"error": "Motor no encontrado"}, status_code=404)
+    pedido.motor = engine_name
+
+    try:
+        with pedido.etapa("inferencia"):
+            predictions = await executor.infer_batch(engine_name, facts_list, trace)
+    except Saturado:
+        pedido.resultado = "saturado"
+        return JSONResponse({"error": "Servidor saturado"}, status_code=503)
+    except TimeoutError:
+        pedido.resultado = "timeout"
+        return JSONResponse({"error": "Tiempo límite excedido"}, status_code=504)
+    metricas.diagnosticos(engine_name, predictions)
+    with pedido.etapa("render"):
+        if trace:
+            results = [{"label": d.label, "confidence": d.confidence, "model_version": d.model_version,
+                        "reasoning": list(d.reasoning)} for d in predictions]
+        else:
+            results = [{"label": d.label, "confidence": d.confidence, "model_version": d.model_version}
+                       for d in predictions]
+        respuesta = JSONResponse({"engine": engine_name, "results": results})
+    pedido.resultado = "ok"
+    return respuesta
+
+@rt("/api/diagnose/{engine_name}")
+async def post(req, engine_name: str, compact: bool = False):
+    """Diagnóstico JSON de un paciente (PatientData) -> DiagnosisResult.
+
+    Con ?compact=true el motor no arma la traza y la respuesta no trae
+    "explicacion". No pasa por el renderizado HTML.
+    """
+    pedido = metricas.pedido("/api/diagnose")
+    try:
+        return await _diagnosticar_api(req, engine_name, compact, pedido)
+    finally:
+        pedido.terminar()
+
+async def _diagnosticar_api(req, engine_name, compact, pedido):
+    if engine_name not in engines:
+        pedido.resultado = "motor_no_encontrado"
+        return JSONResponse({"error": "Motor no encontrado"}, status_code=404)
+    pedido.motor = engine_name
+    try:
+        with pedido.etapa("formulario"):
+            paciente = PatientData.model_validate_json(await req.body())
+        facts = paciente.hechos()
+    except ValidationError as e:
+        pedido.resultado = "json_invalido"
+        return JSONResponse({"error": "Datos del paciente inválidos",
+                             "detalle": json.loads(e.json(include_url=False))}, status_code=422)
+    except HechosInvalidos as e:
+        # PatientData ya rechaza lo mismo; por si el esquema y PatientFacts divergen
+        pedido.resultado = "json_invalido"
+        return JSONResponse({"error": "Datos del paciente inválidos", "detalle": str(e)}, status_code=422)
+    try:
+        prediction = await _inferir(engine_name, facts, pedido, trace=not compact)
+    except Saturado:
+        pedido.resultado = "saturado"
+        return JSONResponse({"error": "Servidor saturado"}, status_code=503)
+    except TimeoutError:
+        pedido.resultado = "timeout"
+        return JSONResponse({"error": "Tiempo límite excedido"}, status_code=504)
+    with pedido.etapa("render"):
+        # model_construct: los campos vienen del motor, no hace falta validarlos
+        resultado = DiagnosisResult.model_construct(
+            sistema=engine_name, diagnostico=prediction.label, confianza=prediction.confidence,
+            version_modelo=prediction.model_version,
+            explicacion=None if compact else list(prediction.reasoning))
+        respuesta = JSONResponse(resultado.model_dump(exclude_none=True))
+    pedido.resultado = "ok"
+    return respuesta
+
+async def _diagnosticar_ensemble(facts, pedido):
+    async def inferir(nombre):
+        # Cada motor se mide como un pedido propio (ruta /diagnose/ensemble)
+        parcial = metricas.pedido("/diagnose/ensemble")
+        parcial.motor = nombre
+        try:
+            diag = await _inferir(nombre, facts, parcial)
+            parcial.resultado = "ok"
+            return diag
+        except asyncio.CancelledError:
+            parcial.resultado = "timeout"
+            raise
+        finally:
+            parcial.terminar()
+
+    with pedido.etapa("inferencia"):
+        resultado = await ensemble.diagnosticar(inferir)
+    with pedido.etapa("render"):
+        html = to_xml(EnsembleCard(resultado, facts))
+    pedido.resultado = "ok"
+    return HTMLResponse(html)
+
+@rt("/bayes/sensitivity")
+async def post(req):
+    """Superficie exacta de P(Dengue | evidencia) sobre una grilla de CPDs.
+
+    Cuerpo: {"parametros": {"Dengue|Nexo=1": [0.4, 0.6] o {"desde", "hasta", "pasos"}, ...}}.
+    "superficie" tiene forma (n_1, ..., n_k, 32), la última dimensión en el
+    orden de "evidencias"; null donde la evidencia es imposible.
+    """
+    if "probabilistico" not in engines:
+        return JSONResponse({"error": "Motor bayesiano deshabilitado"}, status_code=404)
+    try:
+        parametros = (await req.json()).get('parametros') or {}
+        parametros.items()
+    except (ValueError, TypeError, AttributeError) as e:
+        return JSONResponse({"error": f"JSON inválido: {e}"}, status_code=400)
+    try:
+        grilla = {nombre: sensitivity.valores_grilla(valores) for nombre, valores in parametros.items()}
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    engine = await engines.obtener("probabilistico")
+    if not hasattr(engine, "model"):
+        return JSONResponse({"error": "El motor bayesiano corre en otro proceso"}, status_code=404)
+    estado = engine.estado()  # update_cpds puede publicar otro modelo
+    model, version = estado.model, engine.version(estado)
+
+    def calcular():
+        from app.systems.probabilistic import EVIDENCIA
+        superficie = sensitivity.superficie(model, grilla)
+        base = sensitivity.superficie(model, {})
+        return JSONResponse({
+            "version_modelo": version,
+            "parametros": [{"nombre": n, "valores": v.tolist()} for n, v in grilla.items()],
+            "evidencias": [{nodo: (clave >> (len(EVIDENCIA) - 1 - i)) & 1 for i, nodo in enumerate(EVIDENCIA)}
+                           for clave in range(32)],
+            "base": base.tolist(),
+            "superficie": np.where(np.isnan(superficie), None, superficie).tolist(),
+        })
+
+    try:
+        # Con grillas grandes la serialización pesa: fuera del event loop
+        return await asyncio.to_thread(calcular)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+def _metricas_adicionales():
+    """Estado del executor, el cache y el feedback como métricas de Prometheus."""
+    motores = executor.stats()["motores"]
+    espacios = cache.stats()["motores"]
+    escritor = feedback.stats()
+    yield ("inferencia_en_cola", "gauge", "Pedidos esperando cupo por motor",
+           [({"motor": m}, e["en_cola"]) for m, e in motores.items()])
+    yield ("inferencia_en_curso", "gauge", "Inferencias en ejecución por motor",
+           [({"motor": m}, e["en_curso"]) for m, e in motores.items()])
+    yield ("inferencia_rechazos_total", "counter", "Pedidos rechazados por cola llena",
+           [({"motor": m}, e["rechazados"]) for m, e in motores.items()])
+    yield ("inferencia_timeouts_total", "counter", "Pedidos que superaron el tiempo límite",
+           [({"motor": m}, e["timeouts"]) for m, e in motores.items()])
+    yield ("inferencia_espera_segundos_total", "counter", "Tiempo total de espera en la cola",
+           [({"motor": m}, e["espera_total_s"]) for m, e in motores.items()])
+    yield ("cache_aciertos_total", "counter", "Diagnósticos respondidos desde el cache",
+           [({"motor": m}, e["aciertos"]) for m, e in espacios.items()])
+    yield ("cache_fallos_total", "counter", "Consultas al cache sin resultado",
+           [({"motor": m}, e["fallos"]) for m, e in espacios.items()])
+    yield ("feedback_en_cola", "gauge", "Registros de feedback sin escribir",
+           [({}, escritor["en_cola"])])
+    yield ("feedback_reintentando", "gauge", "Registros de feedback en un lote que espera reintento",
+           [({}, escritor["reintentando"])])
+    yield ("feedback_rechazados_total", "counter", "Envíos de feedback rechazados con la cola llena",
+           [({}, escritor["rechazados"])])
+
+@rt("/metrics")
+def get():
+    """Métricas en formato de texto de Prometheus."""
+    return Response(metricas.exportar(_metricas_adicionales()),
+                    media_type="text/plain; version=0.0.4")
+
+@rt("/metrics/slow")
+def get():
+    """Perfiles (pilas muestreadas) de los últimos pedidos lentos; requiere PROFILE_SLOW_MS."""
+    if metricas.perfilador is None:
+        return JSONResponse({"error": "Perfilador desactivado (PROFILE_SLOW_MS)"}, status_code=404)
+    return JSONResponse({"umbral_ms": metricas.perfilador.umbral * 1000, "pedidos": metricas.lentos()})
+
+@rt("/executor/stats")
+def get():
+    """Profundidad de cola, pedidos en curso y tiempos de espera por motor."""
+    return JSONResponse(executor.stats())
+
+@rt("/engines/stats")
+def get():
+    """Motores cargados, tiempo de import/construcción y memoria de cada uno."""
+    return JSONResponse(engines.stats())
+
+@rt("/knowledge/stats")
+def get():
+    """Versión del conocimiento de cada motor cargado, recargas y último error."""
+    return JSONResponse(recargador.stats())
+
+@rt("/report/accuracy")
+async def get():
+    """Precisión, conteos por etiqueta y calibración de cada motor según el feedback."""
+    await asyncio.to_thread(reporte.actualizar)
+    return JSONResponse(reporte.resumen())
+
+@rt("/learning/stats")
+def get():
+    """Filas de feedback procesadas y versión del modelo bayesiano aprendido."""
+    if aprendizaje is None:
+        return JSONResponse({"error": "Aprendizaje desactivado"}, status_code=404)
+    return JSONResponse(aprendizaje.stats())
+
+@rt("/cache/stats")
+def get():
+    """Aciertos, fallos, desalojos e invalidaciones del cache por motor."""
+    return JSONResponse(cache.stats())
+
+@rt("/feedback/stats")
+def get():
+    """Registros en cola, escritos y lotes del escritor de feedback."""
+    return JSONResponse(feedback.stats())
+
 @rt("/learn")
 async def post(req):
-    # (Misma lógica de persistencia que antes)
     form = await req.form()
-    Logs.insert({
-        "timestamp": datetime.now().isoformat(),
-        "system_used": form.get("system_used"),
-        "inputs": form.get("inputs"),
-        "diagnosis": form.get("diagnosis"),
-        "user_feedback": form.get("feedback"),
-        "corrected": form.get("correct") == "true"
-    })
+    # Se encola; si el buffer está lleno espera (backpressure) en vez de perder el registro
+    try:
+        await feedback.submit({
+            "timestamp": datetime.now().isoformat(),
+            "system_used": form.get("system_used"),
+            "inputs": form.get("inputs"),
+            "diagnosis": form.get("diagnosis"),
+            "user_feedback": form.get("feedback"),
+            "corrected": form.get("correct") == "true",
+            "confidence": _numero(form.get("confidence")),
+            **columnas_hechos(form.get("inputs"))
+        })
+    except ColaLlena:
+        return HTMLResponse(to_xml(P("No se pudo registrar, intente nuevamente.", style="color: red;")),
+                            status_code=503)
     return P("Conocimiento registrado.", style="color: green;")
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+"""Métricas de los pedidos de diagnóstico en formato de texto de Prometheus.
+
+Cada pedido a ``/diagnose`` o ``/diagnose/batch`` mide por separado sus
+etapas (lectura del formulario, cache, inferencia, armado de la traza,
+renderizado) y el total. Por ruta, motor y etapa se lleva un histograma de
+latencias con cubetas fijas; además, contadores de pedidos por resultado
+(ok, saturado, timeout, ...) y de diagnósticos de error que devuelven los
+motores ("Error Difuso", "Error en Inferencia"). ``GET /metrics`` los expone.
+
+Perfilador de pedidos lentos (opcional): un hilo toma muestras de las pilas
+de todos los hilos ocupados (event loop y pool de inferencia) mientras hay
+pedidos en curso. Si un pedido supera el umbral, sus muestras se guardan
+agregadas por pila (formato "collapsed", el de los flame graphs) entre los
+últimos LENTOS_MAX. Con pedidos concurrentes las muestras de uno incluyen
+las de los otros. Sin umbral el hilo no se crea; con umbral arranca con el
+primer pedido, en el proceso que lo atiende (con app/prefork.py, en cada
+worker y no en el maestro: un hilo no sobrevive al fork).
+
+Configuración por variables de entorno:
+    PROFILE_SLOW_MS       umbral en ms para guardar el perfil; 0 lo desactiva (0)
+    PROFILE_INTERVAL_MS   período de muestreo en ms (5)
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Tuple
+
+log = logging.getLogger(__name__)
+
+# Límites superiores de las cubetas (segundos), de 0.5 ms a 10 s
+CUBETAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etiquetas con las que los motores informan que la inferencia falló
+ETIQUETAS_ERROR = frozenset({"Error Difuso", "Error en Inferencia"})
+
+LENTOS_MAX = 20
+# Pilas distintas por pedido perfilado; el resto se suma en "(otras)"
+PILAS_MAX = 200
+PROFUNDIDAD_MAX = 40
+
+# Hilos sin trabajo: su pila termina en una espera de la biblioteca estándar
+_ARCHIVOS_OCIOSOS = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+
+class Histograma:
+    __slots__ = ("cubetas", "suma", "cuenta")
+
+    def __init__(self):
+        # Una cubeta por límite más +Inf; se acumulan recién al exportar
+        self.cubetas = [0] * (len(CUBETAS) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, segundos: float):
+        self.cubetas[bisect_left(CUBETAS, segundos)] += 1
+        self.suma += segundos
+        self.cuenta += 1
+
+
+def _etiquetas(**valores) -> str:
+    partes = []
+    for clave, valor in valores.items():
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{clave}="{texto}"')
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _pila(frame) -> str:
+    nombres = []
+    while frame is not None and len(nombres) < PROFUNDIDAD_MAX:
+        codigo = frame.f_code
+        nombres.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(nombres))
+
+
+class Perfilador:
+    """Muestreo de pilas mientras hay pedidos en curso."""
+
+    def __init__(self, umbral: float, intervalo: float):
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self.lentos: deque = deque(maxlen=LENTOS_MAX)
+        self._reiniciar()
+        # El hijo de un fork hereda el estado pero no el hilo (y quizás un
+        # lock tomado): arranca de cero y crea el suyo con su primer pedido
+        os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self):
+        self._activos: Dict[int, Counter] = {}
+        self._hay_activos = threading.Event()
+        self._lock = threading.Lock()
+        self._hilo: threading.Thread = None
+
+    def _arrancar(self):
+        # Con self._lock tomado
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="perfilador", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        propio = threading.get_ident()
+        while True:
+            self._hay_activos.wait()
+            pilas = [_pila(frame) for ident, frame in sys._current_frames().items()
+                     if ident != propio
+                     and not frame.f_code.co_filename.endswith(_ARCHIVOS_OCIOSOS)]
+            with self._lock:
+                for muestras in self._activos.values():
+                    for pila in pilas:
+                        if pila in muestras or len(muestras) < PILAS_MAX:
+                            muestras[pila] += 1
+                        else:
+                            muestras["(otras)"] += 1
+            time.sleep(self.intervalo)
+
+    def empezar(self, clave: int):
+        with self._lock:
+            self._arrancar()
+            self._activos[clave] = Counter()
+            self._hay_activos.set()
+
+    def terminar(self, clave: int, duracion: float, datos: Dict[str, Any]):
+        with self._lock:
+            muestras = self._activos.pop(clave, None)
+            if not self._activos:
+                self._hay_activos.clear()
+        if muestras is None or duracion < self.umbral:
+            return
+        perfil = dict(datos, duracion_ms=duracion * 1000, muestras=sum(muestras.values()),
+                      pilas=dict(muestras.most_common()))
+        self.lentos.append(perfil)
+        log.warning("Pedido lento %s (%s): %.0f ms, %d muestras", datos.get("ruta"),
+                    datos.get("motor"), duracion * 1000, perfil["muestras"])
+
+
+class Pedido:
+    """Tiempos de las etapas de un pedido; se registra al llamar a ``terminar``."""
+
+    def __init__(self, metricas: "Metricas", ruta: str):
+        self.metricas = metricas
+        self.ruta = ruta
+        self.motor = ""
+        # Si el pedido termina por una excepción queda como "error"
+        self.resultado = "error"
+        self.etapas: Dict[str, float] = {}
+        self.inicio = time.perf_counter()
+        if metricas.perfilador is not None:
+            metricas.perfilador.empezar(id(self))
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] = self.etapas.get(nombre, 0.0) + time.perf_counter() - t0
+
+    def terminar(self):
+        duracion = time.perf_counter() - self.inicio
+        self.metricas._registrar(self, duracion)
+        if self.metricas.perfilador is not None:
+            self.metricas.perfilador.terminar(id(self), duracion, {
+                "ruta": self.ruta, "motor": self.motor, "resultado": self.resultado,
+                "etapas_ms": {e: s * 1000 for e, s in self.etapas.items()},
+            })
+
+
+class Metricas:
+    def __init__(self, umbral_lento_ms: float = None, intervalo_ms: float = None):
+        umbral = (umbral_lento_ms if umbral_lento_ms is not None
+                  else float(os.environ.get("PROFILE_SLOW_MS", 0)))
+        intervalo = (intervalo_ms if intervalo_ms is not None
+                     else float(os.environ.get("PROFILE_INTERVAL_MS", 5)))
+        self.perfilador = Perfilador(umbral / 1000, intervalo / 1000) if umbral > 0 else None
+
+        # (ruta, motor, etapa) -> Histograma; la etapa "total" es el pedido entero
+        self.duraciones: Dict[Tuple[str, str, str], Histograma] = {}
+        self.pedidos: Counter = Counter()   # (ruta, motor, resultado)
+        self.errores: Counter = Counter()   # (motor, etiqueta)
+        self._lock = threading.Lock()
+
+    def pedido(self, ruta: str) -> Pedido:
+        return Pedido(self, ruta)
+
+    def diagnosticos(self, motor: str, diagnosticos: Iterable):
+        """Cuenta los diagnósticos de error que devolvió un motor."""
+        errores = Counter(d.label for d in diagnosticos if d.label in ETIQUETAS_ERROR)
+        if errores:
+            with self._lock:
+                for etiqueta, n in errores.items():
+                    self.errores[motor, etiqueta] += n
+
+    def _registrar(self, pedido: Pedido, duracion: float):
+        with self._lock:
+            self.pedidos[pedido.ruta, pedido.motor, pedido.resultado] += 1
+            for etapa, segundos in (*pedido.etapas.items(), ("total", duracion)):
+                clave = (pedido.ruta, pedido.motor, etapa)
+                histograma = self.duraciones.get(clave)
+                if histograma is None:
+                    histograma = self.duraciones[clave] = Histograma()
+                histograma.observar(segundos)
+
+    def lentos(self) -> List[Dict[str, Any]]:
+        return list(self.perfilador.lentos) if self.perfilador is not None else []
+
+    def exportar(self, adicionales: Iterable[Tuple[str, str, str, Iterable[Tuple[dict, float]]]] = ()) -> str:
+        """Texto para Prometheus. ``adicionales``: (nombre, tipo, ayuda, [(etiquetas, valor)])."""
+        with self._lock:
+            duraciones = [(clave, list(h.cubetas), h.suma, h.cuenta)
+                          for clave, h in sorted(self.duraciones.items())]
+            pedidos = sorted(self.pedidos.items())
+            errores = sorted(self.errores.items())
+
+        lineas = [
+            "# HELP diagnostico_etapa_segundos Duración de cada etapa de los pedidos de diagnóstico",
+            "# TYPE diagnostico_etapa_segundos histogram",
+        ]
+        for (ruta, motor, etapa), cubetas, suma, cuenta in duraciones:
+            acumulado = 0
+            for limite, n in zip((*CUBETAS, "+Inf"), cubetas):
+                acumulado += n
+                lineas.append("diagnostico_etapa_segundos_bucket"
+                              f"{_etiquetas(ruta=ruta, motor=motor, etapa=etapa, le=limite)} {acumulado}")
+            base = _etiquetas(ruta=ruta, motor=motor, etapa=etapa)
+            lineas.append(f"diagnostico_etapa_segundos_sum{base} {suma}")
+            lineas.append(f"diagnostico_etapa_segundos_count{base} {cuenta}")
+
+        lineas += ["# HELP diagnostico_pedidos_total Pedidos de diagnóstico por resultado",
+                   "# TYPE diagnostico_pedidos_total counter"]
+        lineas += [f"diagnostico_pedidos_total{_etiquetas(ruta=r, motor=m, resultado=res)} {n}"
+                   for (r, m, res), n in pedidos]
+        lineas += ["# HELP diagnostico_errores_total Diagnósticos de error devueltos por los motores",
+                   "# TYPE diagnostico_errores_total counter"]
+        lineas += [f"diagnostico_errores_total{_etiquetas(motor=m, etiqueta=e)} {n}"
+                   for (m, e), n in errores]
+
+        for nombre, tipo, ayuda, muestras in adicionales:
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+            lineas += [f"{nombre}{_etiquetas(**etiquetas)} {float(valor)}" for etiquetas, valor in muestras]
+        return "\n".join(lineas) + "\n"
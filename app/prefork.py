@@ -0,0 +1,156 @@
+"""Servidor prefork: los motores se construyen una vez y se comparten por fork.
+
+Con ``uvicorn --workers N`` cada worker importa la app y reconstruye los
+tres motores por su cuenta. Acá el proceso maestro importa la app, construye
+y congela todos los motores (tablas precompiladas, arrays de solo lectura),
+ejecuta ``gc.freeze()`` para que el recolector no vuelva a escribir en esos
+objetos y recién entonces abre el socket y hace fork de los workers. Las
+páginas de los modelos quedan compartidas copy-on-write entre todos.
+
+Uso:
+    python -m app.prefork [--workers N] [--host 0.0.0.0] [--port 5001]
+
+Cada worker es un uvicorn normal sobre el socket heredado; el maestro solo
+reenvía SIGTERM/SIGINT y vuelve a levantar los workers que mueran. Si un
+worker muere antes de PREFORK_MIN_LIFE segundos (p. ej. falla al arrancar),
+el reemplazo espera cada vez más, hasta PREFORK_RESPAWN_MAX segundos, en
+lugar de hacer fork en bucle.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Un worker que vive menos que esto cuenta como falla al arrancar
+VIDA_MINIMA = float(os.environ.get("PREFORK_MIN_LIFE", 10))
+ESPERA_MIN = 0.5
+ESPERA_MAX = float(os.environ.get("PREFORK_RESPAWN_MAX", 30))
+
+
+def memoria(pid: int = None) -> dict:
+    """RSS, PSS y memoria privada (USS) de un proceso, en MiB (Linux).
+
+    RSS cuenta también las páginas compartidas; PSS las reparte entre los
+    procesos que las comparten y USS es lo que liberaría matar el proceso.
+    """
+    ruta = f"/proc/{pid or 'self'}/smaps_rollup"
+    valores = {}
+    with open(ruta) as f:
+        for linea in f:
+            partes = linea.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                valores[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return {
+        "rss_mb": valores.get("Rss", 0.0),
+        "pss_mb": valores.get("Pss", 0.0),
+        "uss_mb": valores.get("Private_Clean", 0.0) + valores.get("Private_Dirty", 0.0),
+    }
+
+
+def preparar(engines):
+    """Construye y congela los motores en el maestro, antes del fork."""
+    engines.precalentar(list(engines))
+    engines.congelar()
+    # Lo que existe ahora pasa a la generación permanente: el GC de los
+    # workers no lo recorre ni toca sus cabeceras
+    gc.collect()
+    gc.freeze()
+
+
+def _abrir_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(app, sock):
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    servidor = uvicorn.Server(uvicorn.Config(app, lifespan="on", log_level="info"))
+    servidor.run(sockets=[sock])
+
+
+def espera_reemplazo(vida: float, anterior: float) -> float:
+    """Segundos antes de reemplazar un worker que vivió ``vida`` segundos;
+    ``anterior`` es la espera del último reemplazo."""
+    if vida >= VIDA_MINIMA:
+        return 0.0
+    return min(max(anterior * 2, ESPERA_MIN), ESPERA_MAX)
+
+
+def _lanzar(app, sock) -> int:
+    pid = os.fork()
+    if pid == 0:
+        codigo = 0
+        try:
+            _worker(app, sock)
+        except BaseException:
+            codigo = 1
+        finally:
+            os._exit(codigo)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("PREFORK_WORKERS", os.cpu_count() or 2)))
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5001)))
+    args = parser.parse_args(argv)
+
+    from app.main import app, engines
+    preparar(engines)
+    print(f"[prefork] motores listos en el maestro: {', '.join(engines.cargados())} "
+          f"({memoria()['rss_mb']:.0f} MiB RSS)", file=sys.stderr)
+
+    sock = _abrir_socket(args.host, args.port)
+    # pid -> instante de arranque
+    workers = {_lanzar(app, sock): time.monotonic() for _ in range(args.workers)}
+    print(f"[prefork] {len(workers)} workers en http://{args.host}:{args.port}", file=sys.stderr)
+
+    cerrando = False
+
+    def _terminar(signum, _frame):
+        nonlocal cerrando
+        cerrando = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _terminar)
+    signal.signal(signal.SIGINT, _terminar)
+
+    espera = 0.0
+    while workers:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        inicio = workers.pop(pid, None)
+        if cerrando or inicio is None:
+            continue
+        espera = espera_reemplazo(time.monotonic() - inicio, espera)
+        print(f"[prefork] worker {pid} terminó ({estado}), se reemplaza"
+              + (f" en {espera:.1f} s" if espera else ""), file=sys.stderr)
+        limite = time.monotonic() + espera
+        # De a poco: una señal durante la espera corta el reemplazo
+        while not cerrando and time.monotonic() < limite:
+            time.sleep(min(0.1, max(limite - time.monotonic(), 0.0)))
+        if not cerrando:
+            workers[_lanzar(app, sock)] = time.monotonic()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
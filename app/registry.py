@@ -0,0 +1,191 @@
+"""Registro de motores con carga diferida.
+
+Importar pgmpy (que arrastra torch y pandas), experta o skfuzzy es lo más
+caro del arranque, y no todos los workers usan los tres motores. El registro
+guarda solo la ruta ``modulo:Clase`` de cada motor y lo importa y construye
+la primera vez que se pide; opcionalmente se precalientan algunos al
+arrancar. De cada carga se anota el tiempo de import, el de construcción y
+cuánto creció la memoria residente (RSS) del proceso.
+
+Configuración por variables de entorno:
+    ENGINES          motores habilitados, separados por coma (por defecto todos)
+    ENGINES_WARMUP   motores a construir al arrancar: lista, "all" (por defecto)
+                     o "none" para que todo se cargue con el primer pedido
+"""
+import asyncio
+import functools
+import importlib
+import os
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List
+
+from app.systems.base import InferenceEngine
+
+# Nombre público -> "modulo:Clase"
+MOTORES = {
+    "deterministico": "app.systems.deterministic:RuleBasedEngine",
+    "probabilistico": "app.systems.probabilistic:BayesianEngine",
+    "difuso": "app.systems.fuzzy_logic:FuzzyEngine",
+}
+
+
+def rss_mb() -> float:
+    """Memoria residente actual del proceso, en MiB."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # Fuera de Linux: el pico (ru_maxrss está en KiB en Linux, bytes en macOS)
+        import resource
+        import sys
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 2 ** 20 if sys.platform == "darwin" else maximo / 1024
+
+
+def cargar_clase(ruta: str):
+    modulo, clase = ruta.split(":")
+    return getattr(importlib.import_module(modulo), clase)
+
+
+def construir(ruta: str, **kwargs) -> InferenceEngine:
+    """Fábrica serializable (para los workers de procesos)."""
+    return cargar_clase(ruta)(**kwargs)
+
+
+def _lista(valor: str) -> List[str]:
+    return [v.strip() for v in valor.split(",") if v.strip()]
+
+
+class EngineRegistry(Mapping):
+    """Diccionario de solo lectura nombre -> motor que construye al primer acceso."""
+
+    def __init__(self, rutas: Dict[str, str] = None, habilitados: Iterable[str] = None):
+        rutas = dict(MOTORES if rutas is None else rutas)
+        if habilitados is None:
+            habilitados = _lista(os.environ.get("ENGINES", "")) or list(rutas)
+        desconocidos = [n for n in habilitados if n not in rutas]
+        if desconocidos:
+            raise ValueError(f"Motores desconocidos: {', '.join(desconocidos)}")
+        self.rutas = {n: rutas[n] for n in habilitados}
+
+        # Si se asigna, construye los motores en lugar de importarlos (p. ej.
+        # representantes de motores en otro proceso, ver app/rpc.py)
+        self.fabrica: Callable[[str], InferenceEngine] = None
+
+        self._motores: Dict[str, InferenceEngine] = {}
+        self._cargas: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._rss_inicial = rss_mb()
+
+    # --- Mapping: "in" y len() no construyen nada ---
+    def __getitem__(self, nombre: str) -> InferenceEngine:
+        motor = self._motores.get(nombre)
+        if motor is None:
+            if nombre not in self.rutas:
+                raise KeyError(nombre)
+            motor = self._cargar(nombre)
+        return motor
+
+    def __contains__(self, nombre) -> bool:
+        return nombre in self.rutas
+
+    def __iter__(self):
+        return iter(self.rutas)
+
+    def __len__(self) -> int:
+        return len(self.rutas)
+
+    def _cargar(self, nombre: str) -> InferenceEngine:
+        with self._lock:
+            # Otro hilo pudo haberlo construido mientras esperábamos
+            motor = self._motores.get(nombre)
+            if motor is not None:
+                return motor
+            rss0 = rss_mb()
+            t0 = time.perf_counter()
+            if self.fabrica is not None:
+                t1 = t0
+                motor = self.fabrica(nombre)
+            else:
+                clase = cargar_clase(self.rutas[nombre])
+                t1 = time.perf_counter()
+                motor = clase()
+            t2 = time.perf_counter()
+            self._cargas[nombre] = {
+                "import_s": t1 - t0,
+                "construccion_s": t2 - t1,
+                "rss_mb": rss_mb() - rss0,
+            }
+            self._motores[nombre] = motor
+            return motor
+
+    def construir(self, nombre: str, **kwargs) -> InferenceEngine:
+        """Motor nuevo, sin publicarlo (p. ej. con otro conocimiento, ver app/reload.py)."""
+        return cargar_clase(self.rutas[nombre])(**kwargs)
+
+    def reemplazar(self, nombre: str, motor: InferenceEngine) -> InferenceEngine:
+        """Publica ``motor`` en lugar del actual y devuelve el anterior.
+
+        Es un solo cambio de referencia: los pedidos en curso terminan con el
+        motor que ya tenían. El ``model_version`` del nuevo queda por encima
+        del anterior, así los caches de diagnósticos se invalidan.
+        """
+        with self._lock:
+            anterior = self._motores.get(nombre)
+            if anterior is not None and motor.model_version <= anterior.model_version:
+                motor.model_version = anterior.model_version + 1
+            self._motores[nombre] = motor
+            carga = self._cargas.setdefault(nombre, {})
+            carga["recargas"] = carga.get("recargas", 0) + 1
+            return anterior
+
+    async def obtener(self, nombre: str) -> InferenceEngine:
+        """Como ``registry[nombre]``, pero la primera carga corre fuera del event loop."""
+        motor = self._motores.get(nombre)
+        if motor is None:
+            motor = await asyncio.to_thread(self.__getitem__, nombre)
+        return motor
+
+    def cargados(self) -> List[str]:
+        return list(self._motores)
+
+    def precalentar(self, nombres: Iterable[str] = None) -> List[str]:
+        """Construye los motores indicados (por defecto, ENGINES_WARMUP)."""
+        if nombres is None:
+            valor = os.environ.get("ENGINES_WARMUP", "all").strip().lower()
+            if valor == "all":
+                nombres = list(self.rutas)
+            elif valor in ("", "none"):
+                nombres = []
+            else:
+                # Los motores no habilitados en este worker se ignoran
+                nombres = [n for n in _lista(valor) if n in self.rutas]
+        for nombre in nombres:
+            self[nombre]
+        return list(nombres)
+
+    def congelar(self):
+        """Congela los motores ya cargados (ver InferenceEngine.congelar)."""
+        for motor in self._motores.values():
+            motor.congelar()
+
+    def fabricas(self) -> Dict[str, Callable[[], InferenceEngine]]:
+        """Fábricas serializables por motor, para construirlos en otro proceso."""
+        return {nombre: functools.partial(construir, ruta) for nombre, ruta in self.rutas.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        motores = {}
+        for nombre in self.rutas:
+            carga = self._cargas.get(nombre)
+            motores[nombre] = {"cargado": carga is not None, **(carga or {})}
+            motor = self._motores.get(nombre)
+            if motor is not None:
+                motores[nombre]["version"] = motor.version()
+        return {
+            "rss_mb": rss_mb(),
+            "rss_inicial_mb": self._rss_inicial,
+            "motores": motores,
+        }
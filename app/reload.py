@@ -0,0 +1,150 @@
+"""Recarga en caliente del conocimiento de los motores.
+
+Una tarea periódica mira la fecha y el tamaño de los archivos de
+conocimiento (ver app/systems/knowledge.py) de los motores ya cargados. Si
+uno cambió y su contenido no es el que usa el motor, en un hilo aparte:
+
+1. se construye un motor nuevo con ese conocimiento; al construirse cada
+   motor valida su parte (check_model de la red, tabla de decisión
+   compilada, reglas y membresías difusas);
+2. ``validar()`` del motor y unos pacientes de prueba, que no pueden
+   terminar en un diagnóstico de error;
+3. los preparativos del motor, si hay (el aprendizaje bayesiano le aplica
+   sus CPDs aprendidas), y ``congelar()``, que precalcula las tablas
+   diferidas para que el primer pedido no las pague;
+4. ``EngineRegistry.reemplazar``: un solo cambio de referencia.
+
+Los pedidos en curso terminan con el motor que ya tenían; los siguientes
+usan el nuevo. Si algo falla queda el modelo anterior y se registra el
+error; el archivo no se reintenta hasta que vuelva a cambiar.
+
+Con el executor de procesos cada worker reconstruye además su propia copia
+(ver app/executor.py).
+
+Configuración por variables de entorno:
+    KNOWLEDGE_POLL   segundos entre revisiones; 0 desactiva la recarga (5)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from app.registry import EngineRegistry
+from app.systems import knowledge
+from app.systems.base import InferenceEngine
+
+log = logging.getLogger(__name__)
+
+INTERVALO = float(os.environ.get("KNOWLEDGE_POLL", 5))
+
+# Casos extremos que cualquier conocimiento válido tiene que poder diagnosticar
+PACIENTES_PRUEBA = (
+    dict(fiebre=39.5, tos=True, dolor_garganta=True, viaje_brasil=True, contacto_dengue=True,
+         vive_corrientes=True, verano=True, dolor_cabeza=True,
+         intensidad_dolor_cabeza=10, intensidad_tos=10),
+    dict(fiebre=36.5, tos=False, dolor_garganta=False, viaje_brasil=False, contacto_dengue=False,
+         vive_corrientes=False, verano=False, dolor_cabeza=False,
+         intensidad_dolor_cabeza=0, intensidad_tos=0),
+)
+
+
+class Recargador:
+    def __init__(self, engines: EngineRegistry, intervalo: float = None, directorio: str = None):
+        self.engines = engines
+        self.intervalo = INTERVALO if intervalo is None else intervalo
+        self.directorio = directorio
+        # Motor -> función que prepara el modelo nuevo antes de publicarlo
+        self.preparar: Dict[str, Callable[[InferenceEngine], None]] = {}
+
+        self._vistos: Dict[str, Any] = {}   # motor -> (ruta, mtime, tamaño) ya revisado
+        self._historial: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._tarea: asyncio.Task = None
+
+    def revisar(self) -> List[str]:
+        """Recarga los motores cargados cuyo archivo cambió; devuelve cuáles."""
+        recargados = []
+        with self._lock:
+            for nombre in self.engines.cargados():
+                actual = knowledge.estado(nombre, self.directorio)
+                if actual is None or actual == self._vistos.get(nombre):
+                    continue
+                self._vistos[nombre] = actual
+                if self._recargar(nombre):
+                    recargados.append(nombre)
+        return recargados
+
+    def _recargar(self, nombre: str) -> bool:
+        historial = self._historial.setdefault(nombre, {"recargas": 0, "errores": 0})
+        anterior = self.engines[nombre]
+        t0 = time.perf_counter()
+        try:
+            datos = knowledge.leer(nombre, self.directorio)
+            if knowledge.huella(datos) == anterior.knowledge_hash:
+                # Se guardó el archivo sin cambios (o se volvió al contenido actual)
+                return False
+            motor = self.engines.construir(nombre, conocimiento=datos)
+            motor.validar()
+            for facts in PACIENTES_PRUEBA:
+                diag = motor.infer(facts)
+                if diag.label.startswith("Error"):
+                    raise knowledge.ConocimientoInvalido(
+                        f"Paciente de prueba: {diag.label} ({'; '.join(diag.reasoning)})")
+            motor.model_version = anterior.model_version + 1
+            preparar = self.preparar.get(nombre)
+            if preparar is not None:
+                preparar(motor)
+            motor.congelar()
+        except Exception as e:
+            historial["errores"] += 1
+            historial["ultimo_error"] = f"{type(e).__name__}: {e}"
+            log.error("No se recargó el conocimiento de %s; sigue la versión %s: %s",
+                      nombre, anterior.version(), e)
+            return False
+
+        self.engines.reemplazar(nombre, motor)
+        if motor.knowledge_version == anterior.knowledge_version:
+            log.warning("El conocimiento de %s cambió sin cambiar 'version' (%s)",
+                        nombre, motor.knowledge_version)
+        historial["recargas"] += 1
+        historial["ultima_recarga"] = time.time()
+        historial["construccion_s"] = time.perf_counter() - t0
+        historial.pop("ultimo_error", None)
+        log.info("Conocimiento de %s recargado: %s -> %s", nombre, anterior.version(), motor.version())
+        return True
+
+    # --- Tarea periódica ---
+    def start(self):
+        if self.intervalo > 0:
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def _bucle(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.revisar)
+            except Exception:
+                log.exception("Error revisando los archivos de conocimiento")
+            await asyncio.sleep(self.intervalo)
+
+    async def stop(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def stats(self) -> Dict[str, Any]:
+        motores = {}
+        for nombre in self.engines.cargados():
+            motor = self.engines[nombre]
+            motores[nombre] = {
+                "archivo": knowledge.ruta(nombre, self.directorio),
+                "version": motor.version(),
+                "huella": motor.knowledge_hash,
+                **self._historial.get(nombre, {"recargas": 0, "errores": 0}),
+            }
+        return {"intervalo_s": self.intervalo, "motores": motores}
@@ -0,0 +1,184 @@
+"""Reporte de aciertos de cada motor según el feedback de los médicos.
+
+Recorre ``learning_logs`` por bloques de tamaño fijo y acumula solo
+contadores: por motor, aciertos y total; por etiqueta de diagnóstico,
+correctos e incorrectos; y la calibración de ``confidence`` en intervalos
+de ancho 0.1 (cuántos casos, confianza media y tasa de aciertos observada).
+La memoria no depende del tamaño de la tabla: como mucho BLOQUE filas más
+los contadores, con un tope de etiquetas por motor.
+
+El estado (contadores + último id) se guarda en un checkpoint, así cada
+corrida solo lee las filas nuevas.
+
+Uso:
+    python -m app.report [--desde-cero] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from typing import Any, Dict
+
+from app.database import get_db
+
+BLOQUE = 5000
+INTERVALOS = 10
+# Etiquetas distintas por motor; el resto se agrupa (el campo viene del formulario)
+MAX_ETIQUETAS = 50
+OTRAS = "(otras)"
+
+CHECKPOINT = os.environ.get("REPORT_CHECKPOINT", ".cache/accuracy_report.json")
+
+
+def _motor_vacio() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "correctos": 0,
+        "etiquetas": {},
+        # Por intervalo: [casos, suma de confianzas, correctos]
+        "calibracion": [[0, 0.0, 0] for _ in range(INTERVALOS)],
+    }
+
+
+class ReporteAciertos:
+    def __init__(self, db_factory=get_db, checkpoint: str = CHECKPOINT, bloque: int = BLOQUE):
+        self.db_factory = db_factory
+        self.checkpoint = checkpoint
+        self.bloque = bloque
+        self.ultimo_id = 0
+        self.motores: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._cargar()
+
+    def _cargar(self):
+        if not self.checkpoint:
+            return
+        try:
+            with open(self.checkpoint) as f:
+                datos = json.load(f)
+            self.ultimo_id = int(datos["ultimo_id"])
+            self.motores = datos["motores"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _guardar(self):
+        directorio = os.path.dirname(self.checkpoint) or "."
+        os.makedirs(directorio, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"ultimo_id": self.ultimo_id, "motores": self.motores}, f)
+            os.replace(tmp, self.checkpoint)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def reiniciar(self):
+        with self._lock:
+            self.ultimo_id = 0
+            self.motores = {}
+
+    def _contar(self, sistema, diagnosis, corrected, confidence):
+        if corrected is None:
+            return
+        motor = self.motores.setdefault(sistema or "(desconocido)", _motor_vacio())
+        correcto = int(bool(corrected))
+        motor["total"] += 1
+        motor["correctos"] += correcto
+
+        etiquetas = motor["etiquetas"]
+        etiqueta = diagnosis or "(sin etiqueta)"
+        if etiqueta not in etiquetas and len(etiquetas) >= MAX_ETIQUETAS:
+            etiqueta = OTRAS
+        par = etiquetas.setdefault(etiqueta, [0, 0])  # [correctos, incorrectos]
+        par[0 if correcto else 1] += 1
+
+        if confidence is not None and 0.0 <= confidence <= 1.0:
+            i = min(int(confidence * INTERVALOS), INTERVALOS - 1)
+            intervalo = motor["calibracion"][i]
+            intervalo[0] += 1
+            intervalo[1] += confidence
+            intervalo[2] += correcto
+
+    def actualizar(self) -> int:
+        """Procesa las filas nuevas desde el último id; devuelve cuántas leyó."""
+        with self._lock:
+            if self._db is None:
+                self._db = self.db_factory()
+            leidas = 0
+            while True:
+                filas = self._db.execute(
+                    "SELECT id, system_used, diagnosis, corrected, confidence FROM learning_logs "
+                    "WHERE id > ? ORDER BY id LIMIT ?", (self.ultimo_id, self.bloque)).fetchall()
+                if not filas:
+                    break
+                for id_, sistema, diagnosis, corrected, confidence in filas:
+                    self._contar(sistema, diagnosis, corrected, confidence)
+                self.ultimo_id = filas[-1][0]
+                leidas += len(filas)
+            if leidas and self.checkpoint:
+                self._guardar()
+            return leidas
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            motores = {}
+            for nombre, m in self.motores.items():
+                calibracion = []
+                for i, (casos, suma, correctos) in enumerate(m["calibracion"]):
+                    if casos:
+                        calibracion.append({
+                            "desde": i / INTERVALOS,
+                            "hasta": (i + 1) / INTERVALOS,
+                            "casos": casos,
+                            "confianza_media": suma / casos,
+                            "tasa_aciertos": correctos / casos,
+                        })
+                motores[nombre] = {
+                    "total": m["total"],
+                    "correctos": m["correctos"],
+                    "precision": m["correctos"] / m["total"] if m["total"] else 0.0,
+                    "etiquetas": {e: {"correctos": c, "incorrectos": i}
+                                  for e, (c, i) in m["etiquetas"].items()},
+                    "calibracion": calibracion,
+                }
+            return {"ultimo_id": self.ultimo_id, "motores": motores}
+
+
+def _imprimir(resumen):
+    print(f"Filas procesadas hasta id {resumen['ultimo_id']}")
+    for nombre, m in sorted(resumen["motores"].items()):
+        print(f"\n{nombre}: {m['correctos']}/{m['total']} correctos ({m['precision']:.1%})")
+        for etiqueta, c in sorted(m["etiquetas"].items()):
+            print(f"  {etiqueta:<40} correctos {c['correctos']:>7}  incorrectos {c['incorrectos']:>7}")
+        if m["calibracion"]:
+            print("  Calibración (confianza -> aciertos):")
+            for b in m["calibracion"]:
+                print(f"    [{b['desde']:.1f}, {b['hasta']:.1f}) {b['casos']:>7} casos: "
+                      f"confianza media {b['confianza_media']:.2f}, aciertos {b['tasa_aciertos']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aciertos por motor según el feedback")
+    parser.add_argument("--desde-cero", action="store_true", help="ignora el checkpoint")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    reporte = ReporteAciertos()
+    if args.desde_cero:
+        reporte.reiniciar()
+    reporte.actualizar()
+    resumen = reporte.resumen()
+    if args.json:
+        json.dump(resumen, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        _imprimir(resumen)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,664 @@
+"""Motores en procesos propios, detrás de un socket Unix.
+
+Con ``INFERENCE_EXECUTOR=socket`` el proceso web no importa pgmpy, experta
+ni skfuzzy: cada motor corre en uno o más procesos worker
+(``python -m app.rpc <motor> <socket>``) y el registro de la app guarda solo
+un representante liviano (``MotorRemoto``). Así el render HTML no compite
+por el GIL con la inferencia y cada motor escala a sus propios núcleos
+(ENGINE_PROCESSES).
+
+Protocolo: tramas ``<largo u32><id u32><op u8><datos>``. Un pedido de
+diagnóstico lleva la traza pedida y los pacientes; cada paciente ocupa 25
+bytes: la máscara de booleanos y los tres numéricos en float64, tal como
+los guarda ``PatientFacts`` (los hechos se validan antes de enviarse). La
+respuesta lleva por diagnóstico la etiqueta, la confianza, la versión del
+modelo, P(dengue) según el motor (para el ensemble) y la traza ya
+formateada, o nada si se pidió sin traza.
+
+Cliente: por proceso worker se abren ENGINE_CONNECTIONS conexiones y los
+pedidos se reparten en ronda; en cada conexión van en tubería (no se espera
+una respuesta para mandar el pedido siguiente) y las respuestas se emparejan
+por id. Un hilo supervisor revisa cada ENGINE_HEALTH_INTERVAL segundos que
+cada worker siga vivo y responda un ping; si no, lo reinicia. El ping se
+responde desde el hilo lector, así que no detecta un worker trabado dentro
+de una inferencia: para eso cada conexión lleva la antigüedad de su pedido
+pendiente más viejo y el supervisor reinicia el worker si supera
+ENGINE_STALL_TIMEOUT. Los pedidos pendientes de un worker caído o
+reiniciado fallan con ``MotorCaido`` (HTTP 503).
+
+Cada worker recarga su conocimiento por su cuenta (app/reload.py). El
+aprendizaje bayesiano y ``/bayes/sensitivity`` necesitan el modelo en el
+proceso web y no están disponibles en este modo.
+
+Configuración por variables de entorno:
+    ENGINE_PROCESSES         procesos por motor, p. ej. "difuso=2" (1 c/u)
+    ENGINE_CONNECTIONS       conexiones por proceso (2)
+    ENGINE_THREADS           hilos de inferencia por proceso (1)
+    ENGINE_SOCKET_DIR        directorio de los sockets (uno temporal)
+    ENGINE_HEALTH_INTERVAL   segundos entre chequeos (5)
+    ENGINE_HEALTH_TIMEOUT    segundos para responder el ping (2)
+    ENGINE_STALL_TIMEOUT     segundos de un pedido sin respuesta antes de
+                             reiniciar el worker (3 x INFERENCE_TIMEOUT)
+    ENGINE_START_TIMEOUT     segundos para que un worker empiece a escuchar (120)
+"""
+import itertools
+import logging
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.executor import Saturado
+from app.systems.base import SIN_TRAZA, Diagnosis, InferenceEngine
+from app.systems.facts import Hechos, PatientFacts, como_hechos
+
+log = logging.getLogger(__name__)
+
+# Operaciones (pedido) y resultados (respuesta)
+INFER, INFER_BATCH, PING = 1, 2, 3
+OK, ERROR = 0, 1
+
+_CABECERA = struct.Struct("<IIB")
+
+# Paciente: máscara de booleanos y los tres numéricos (ver PatientFacts)
+_PACIENTE = struct.Struct("<B3d")
+_PEDIDO = struct.Struct("<BI")      # traza, cantidad
+
+# Diagnóstico: banderas, confianza, P(dengue)
+_DIAGNOSTICO = struct.Struct("<Bdd")
+_SIN_TRAZA, _CON_PROBABILIDAD = 1, 2
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+class MotorCaido(Saturado):
+    """No hay un worker sano del motor para atender el pedido."""
+
+
+class ErrorRemoto(RuntimeError):
+    """El worker no pudo procesar el pedido."""
+
+
+# --- Codificación ---
+def codificar_pedido(facts_list: List[Hechos], trace: bool) -> bytes:
+    partes = [_PEDIDO.pack(trace, len(facts_list))]
+    for facts in facts_list:
+        facts = como_hechos(facts)
+        partes.append(_PACIENTE.pack(facts.mascara, facts.fiebre, facts.intensidad_dolor_cabeza,
+                                     facts.intensidad_tos))
+    return b"".join(partes)
+
+
+def decodificar_pedido(datos: bytes):
+    trace, cantidad = _PEDIDO.unpack_from(datos)
+    return bool(trace), [PatientFacts(fiebre, idc, itos, mascara)
+                         for mascara, fiebre, idc, itos in _PACIENTE.iter_unpack(
+                             datos[_PEDIDO.size:_PEDIDO.size + cantidad * _PACIENTE.size])]
+
+
+def _texto(partes: list, texto: str, largo: struct.Struct = _U16):
+    datos = texto.encode()
+    partes.append(largo.pack(len(datos)))
+    partes.append(datos)
+
+
+def codificar_diagnosticos(engine: InferenceEngine, diags: List[Diagnosis], trace: bool) -> bytes:
+    partes = [_U32.pack(len(diags))]
+    for diag in diags:
+        probabilidad = engine.probabilidad_dengue(diag)
+        banderas = (0 if trace else _SIN_TRAZA) | (0 if probabilidad is None else _CON_PROBABILIDAD)
+        partes.append(_DIAGNOSTICO.pack(banderas, diag.confidence, probabilidad or 0.0))
+        _texto(partes, diag.label)
+        _texto(partes, diag.model_version)
+        if trace:
+            lineas = list(diag.reasoning)
+            partes.append(_U32.pack(len(lineas)))
+            for linea in lineas:
+                _texto(partes, str(linea), _U32)
+    return b"".join(partes)
+
+
+@dataclass
+class DiagnosticoRemoto(Diagnosis):
+    # P(dengue) calculada por el motor en el worker (ver InferenceEngine.probabilidad_dengue)
+    probabilidad: Optional[float] = None
+
+
+def decodificar_diagnosticos(datos: bytes) -> List[DiagnosticoRemoto]:
+    vista = memoryview(datos)
+    (cantidad,), i = _U32.unpack_from(vista), _U32.size
+
+    def texto(largo: struct.Struct = _U16) -> str:
+        nonlocal i
+        (n,) = largo.unpack_from(vista, i)
+        i += largo.size
+        valor = str(vista[i:i + n], "utf-8")
+        i += n
+        return valor
+
+    diags = []
+    for _ in range(cantidad):
+        banderas, confianza, probabilidad = _DIAGNOSTICO.unpack_from(vista, i)
+        i += _DIAGNOSTICO.size
+        label, version = texto(), texto()
+        if banderas & _SIN_TRAZA:
+            reasoning = SIN_TRAZA
+        else:
+            (n,) = _U32.unpack_from(vista, i)
+            i += _U32.size
+            reasoning = [texto(_U32) for _ in range(n)]
+        diags.append(DiagnosticoRemoto(label, confianza, reasoning, version,
+                                       probabilidad if banderas & _CON_PROBABILIDAD else None))
+    return diags
+
+
+def _trama(ident: int, op: int, datos: bytes) -> bytes:
+    return _CABECERA.pack(len(datos), ident, op) + datos
+
+
+def _leer_trama(lector):
+    cabecera = lector.read(_CABECERA.size)
+    if len(cabecera) < _CABECERA.size:
+        raise ConnectionError("Conexión cerrada")
+    largo, ident, op = _CABECERA.unpack(cabecera)
+    datos = lector.read(largo)
+    if len(datos) < largo:
+        raise ConnectionError("Conexión cerrada")
+    return ident, op, datos
+
+
+# --- Worker ---
+class ServidorMotor:
+    """Un motor atendiendo pedidos en un socket Unix (corre en su propio proceso)."""
+
+    def __init__(self, nombre: str, ruta: str, hilos: int = None):
+        from app.registry import EngineRegistry
+        from app.reload import Recargador
+
+        self.nombre = nombre
+        self.ruta = ruta
+        self.engines = EngineRegistry(habilitados=[nombre])
+        self.engines.precalentar([nombre])
+        self.engines.congelar()
+        self.recargador = Recargador(self.engines)
+        self.pool = ThreadPoolExecutor(hilos or int(os.environ.get("ENGINE_THREADS", 1)),
+                                       thread_name_prefix=f"motor-{nombre}")
+        self._padre = os.getppid()
+
+    def servir(self):
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.ruta)
+        os.chmod(self.ruta, 0o600)
+        sock.listen(64)
+        threading.Thread(target=self._vigilar, name="vigilancia", daemon=True).start()
+        log.info("Motor %s escuchando en %s (pid %d)", self.nombre, self.ruta, os.getpid())
+        while True:
+            conexion, _ = sock.accept()
+            threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _vigilar(self):
+        # Sin el proceso web no hay a quién responder; además, recarga del conocimiento
+        proxima = time.monotonic() + self.recargador.intervalo
+        while True:
+            time.sleep(1.0)
+            if os.getppid() != self._padre:
+                os._exit(0)
+            if self.recargador.intervalo > 0 and time.monotonic() >= proxima:
+                proxima = time.monotonic() + self.recargador.intervalo
+                try:
+                    self.recargador.revisar()
+                except Exception:
+                    log.exception("Error revisando el conocimiento de %s", self.nombre)
+
+    def _atender(self, conexion: socket.socket):
+        lector = conexion.makefile("rb", buffering=65536)
+        lock = threading.Lock()
+        try:
+            while True:
+                ident, op, datos = _leer_trama(lector)
+                if op == PING:
+                    # Se responde desde el hilo lector: mide que el proceso
+                    # atienda. Lleva la versión del modelo que está usando.
+                    version = self.engines[self.nombre].version().encode()
+                    self._responder(conexion, lock, ident, OK, version)
+                else:
+                    self.pool.submit(self._ejecutar, conexion, lock, ident, op, datos)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            lector.close()
+
+    def _ejecutar(self, conexion, lock, ident: int, op: int, datos: bytes):
+        try:
+            trace, facts_list = decodificar_pedido(datos)
+            engine = self.engines[self.nombre]
+            if op == INFER:
+                diags = [engine.infer(facts_list[0], trace)]
+            elif op == INFER_BATCH:
+                diags = engine.infer_batch(facts_list, trace)
+            else:
+                raise ValueError(f"Operación desconocida: {op}")
+            respuesta, resultado = codificar_diagnosticos(engine, diags, trace), OK
+        except Exception as e:
+            respuesta, resultado = f"{type(e).__name__}: {e}".encode(), ERROR
+        self._responder(conexion, lock, ident, resultado, respuesta)
+
+    @staticmethod
+    def _responder(conexion, lock, ident: int, resultado: int, datos: bytes):
+        try:
+            with lock:
+                conexion.sendall(_trama(ident, resultado, datos))
+        except OSError:
+            pass  # el cliente se fue; sus pedidos ya fallaron de su lado
+
+
+# --- Cliente ---
+class _Conexion:
+    """Conexión con pedidos en tubería: las respuestas se emparejan por id."""
+
+    def __init__(self, ruta: str):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(ruta)
+        self._lector = self.sock.makefile("rb", buffering=65536)
+        # id -> (futuro, instante de envío); en orden de envío
+        self._pendientes: Dict[int, Tuple[Future, float]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self.viva = True
+        threading.Thread(target=self._leer, name="rpc-lector", daemon=True).start()
+
+    def enviar(self, op: int, datos: bytes) -> Future:
+        futuro = Future()
+        with self._lock:
+            if not self.viva:
+                raise MotorCaido("Conexión cerrada")
+            ident = next(self._ids) & 0xFFFFFFFF
+            self._pendientes[ident] = (futuro, time.monotonic())
+            try:
+                self.sock.sendall(_trama(ident, op, datos))
+            except OSError as e:
+                self.cerrar(e)
+                raise MotorCaido(str(e))
+        return futuro
+
+    def _leer(self):
+        try:
+            while True:
+                ident, resultado, datos = _leer_trama(self._lector)
+                with self._lock:
+                    futuro, _ = self._pendientes.pop(ident, (None, 0.0))
+                if futuro is None or futuro.done():
+                    continue
+                if resultado == OK:
+                    futuro.set_result(datos)
+                else:
+                    futuro.set_exception(ErrorRemoto(datos.decode(errors="replace")))
+        except Exception as e:
+            self.cerrar(e)
+
+    def cerrar(self, motivo=None):
+        with self._lock:
+            if not self.viva:
+                return
+            self.viva = False
+            pendientes, self._pendientes = self._pendientes, {}
+        for futuro, _ in pendientes.values():
+            if not futuro.done():
+                futuro.set_exception(MotorCaido(f"El worker cerró la conexión ({motivo})"))
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def antiguedad(self) -> float:
+        """Segundos desde que se envió el pedido pendiente más viejo (0 si no hay)."""
+        with self._lock:
+            if not self._pendientes:
+                return 0.0
+            _, enviado = next(iter(self._pendientes.values()))
+        return time.monotonic() - enviado
+
+
+class _Proceso:
+    """Un worker de un motor: el proceso y sus conexiones."""
+
+    def __init__(self, nombre: str, ruta: str, conexiones: int):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.n_conexiones = conexiones
+        self.popen: Optional[subprocess.Popen] = None
+        self.conexiones: List[_Conexion] = []
+        self.reinicios = 0
+        self.arranque_s = 0.0
+        self._turno = itertools.count()
+        # Reentrante: conexion() y ping() reconectan con el lock tomado
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+    def lanzar(self):
+        self.popen = subprocess.Popen([sys.executable, "-m", "app.rpc", self.nombre, self.ruta])
+        self._inicio = time.perf_counter()
+
+    def esperar(self, timeout: float):
+        limite = time.monotonic() + timeout
+        while True:
+            if self.popen.poll() is not None:
+                raise MotorCaido(f"El worker de {self.nombre} terminó al arrancar "
+                                 f"(código {self.popen.returncode})")
+            try:
+                self.conectar()
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise MotorCaido(f"El worker de {self.nombre} no escucha en {self.ruta}")
+                time.sleep(0.05)
+        self.arranque_s = time.perf_counter() - self._inicio
+
+    def conectar(self):
+        with self._lock:
+            nuevas = [_Conexion(self.ruta) for _ in range(self.n_conexiones)]
+            viejas, self.conexiones = self.conexiones, nuevas
+            propias, self._pid = self._pid == os.getpid(), os.getpid()
+        if propias:
+            for conexion in viejas:
+                conexion.cerrar("reconexión")
+
+    def _vivas(self) -> List[_Conexion]:
+        # Tras un fork (servidor prefork) las heredadas son del padre: el hijo
+        # abre las suyas a los mismos workers
+        return [c for c in self.conexiones if c.viva] if self._pid == os.getpid() else []
+
+    def _vivas_o_reconectar(self) -> List[_Conexion]:
+        """Conexiones vivas; si se cortaron todas, reconecta (OSError si no puede).
+
+        Un solo hilo reconecta: los demás esperan el lock y usan las
+        conexiones nuevas, en vez de reemplazarlas y cerrarlas con sus
+        pedidos recién enviados."""
+        vivas = self._vivas()
+        if vivas:
+            return vivas
+        with self._lock:
+            vivas = self._vivas()
+            if not vivas:
+                self.conectar()
+                vivas = self.conexiones
+        return vivas
+
+    def conexion(self) -> Optional[_Conexion]:
+        try:
+            vivas = self._vivas_o_reconectar()
+        except OSError:
+            return None
+        return vivas[next(self._turno) % len(vivas)]
+
+    def ping(self, timeout: float) -> Optional[str]:
+        """Versión del modelo del worker, o None si no está sano."""
+        if self.popen is None or self.popen.poll() is not None:
+            return None
+        try:
+            version = None
+            for conexion in self._vivas_o_reconectar():
+                version = conexion.enviar(PING, b"").result(timeout).decode()
+        except Exception:
+            return None
+        return version
+
+    def antiguedad(self) -> float:
+        """Antigüedad del pedido sin respuesta más viejo entre sus conexiones."""
+        return max((c.antiguedad() for c in self.conexiones), default=0.0)
+
+    def detener(self):
+        for conexion in self.conexiones:
+            conexion.cerrar("detenido")
+        if self.popen is not None and self.popen.poll() is None:
+            self.popen.terminate()
+            try:
+                self.popen.wait(5)
+            except subprocess.TimeoutExpired:
+                self.popen.kill()
+                self.popen.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": self.popen.pid if self.popen else None,
+            "vivo": self.popen is not None and self.popen.poll() is None,
+            "conexiones_vivas": sum(c.viva for c in self.conexiones),
+            "pendientes": sum(c.pendientes() for c in self.conexiones),
+            "pendiente_mas_viejo_s": round(self.antiguedad(), 3),
+            "reinicios": self.reinicios,
+            "arranque_s": self.arranque_s,
+        }
+
+
+def _procesos_por_motor(texto: str) -> Dict[str, int]:
+    procesos = {}
+    for parte in texto.split(","):
+        if "=" in parte:
+            nombre, n = parte.split("=", 1)
+            procesos[nombre.strip()] = int(n)
+    return procesos
+
+
+class MotorRemoto(InferenceEngine):
+    """Representante en el proceso web de un motor que corre en sus workers.
+
+    Su versión es la última que informó un worker (en un diagnóstico o en un
+    ping). ``model_version`` es un contador local que sube cada vez que esa
+    versión cambia, así el cache se invalida también cuando un worker
+    reiniciado vuelve a numerar desde 1.
+    """
+
+    def __init__(self, nombre: str, cliente: "ClienteMotores"):
+        self.nombre = nombre
+        self.cliente = cliente
+        self._version = ""
+        self._lock = threading.Lock()
+
+    def observar(self, version: str):
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self.knowledge_version = version.rpartition("/")[0]
+                self.model_version += 1
+
+    def version(self) -> str:
+        return self._version
+
+    def infer(self, facts: Hechos, trace: bool = True) -> Diagnosis:
+        return self.cliente.enviar(self.nombre, facts, False, trace).result(self.cliente.timeout)
+
+    def infer_batch(self, facts_list: List[Hechos], trace: bool = True) -> List[Diagnosis]:
+        return self.cliente.enviar(self.nombre, facts_list, True, trace).result(self.cliente.timeout)
+
+    def probabilidad_dengue(self, diag: Diagnosis) -> Optional[float]:
+        if isinstance(diag, DiagnosticoRemoto):
+            return diag.probabilidad
+        return super().probabilidad_dengue(diag)
+
+
+class ClienteMotores:
+    def __init__(self, nombres: List[str], procesos: Dict[str, int] = None, conexiones: int = None,
+                 directorio: str = None, intervalo: float = None, timeout: float = None):
+        """``timeout``: espera máxima de ``MotorRemoto.infer`` (la del executor,
+        INFERENCE_TIMEOUT); un pedido sin respuesta por ENGINE_STALL_TIMEOUT
+        (3 veces ese valor por defecto) hace reiniciar el worker."""
+        self.nombres = list(nombres)
+        procesos = procesos if procesos is not None else _procesos_por_motor(
+            os.environ.get("ENGINE_PROCESSES", ""))
+        self.n_procesos = {nombre: max(1, procesos.get(nombre, 1)) for nombre in self.nombres}
+        self.n_conexiones = conexiones or int(os.environ.get("ENGINE_CONNECTIONS", 2))
+        self.directorio = directorio or os.environ.get("ENGINE_SOCKET_DIR")
+        self._temporal = not self.directorio
+        if self._temporal:
+            self.directorio = tempfile.mkdtemp(prefix="motores-")
+        self.intervalo = intervalo if intervalo is not None else float(os.environ.get("ENGINE_HEALTH_INTERVAL", 5))
+        self.timeout_salud = float(os.environ.get("ENGINE_HEALTH_TIMEOUT", 2))
+        self.timeout_arranque = float(os.environ.get("ENGINE_START_TIMEOUT", 120))
+        self.timeout = timeout or float(os.environ.get("INFERENCE_TIMEOUT", 10))
+        self.timeout_colgado = float(os.environ.get("ENGINE_STALL_TIMEOUT", 3 * self.timeout))
+
+        self._procesos: Dict[str, List[_Proceso]] = {}
+        self._representantes: Dict[str, MotorRemoto] = {}
+        self._turnos = {nombre: itertools.count() for nombre in self.nombres}
+        self._lock = threading.Lock()
+        self._cerrado = threading.Event()
+        self._pid = os.getpid()
+        self._supervisor = None
+
+    def _iniciar(self, nombre: str) -> List[_Proceso]:
+        procesos = self._procesos.get(nombre)
+        if procesos is not None:
+            return procesos
+        with self._lock:
+            if nombre in self._procesos:
+                return self._procesos[nombre]
+            # Con el pid: varios procesos web pueden compartir ENGINE_SOCKET_DIR
+            procesos = [_Proceso(nombre, os.path.join(self.directorio, f"{nombre}-{os.getpid()}-{i}.sock"),
+                                 self.n_conexiones)
+                        for i in range(self.n_procesos[nombre])]
+            # Se lanzan todos y después se espera: arrancan en paralelo
+            for proceso in procesos:
+                proceso.lanzar()
+            try:
+                for proceso in procesos:
+                    proceso.esperar(self.timeout_arranque)
+            except Exception:
+                for proceso in procesos:
+                    proceso.detener()
+                raise
+            self._procesos[nombre] = procesos
+            if self._supervisor is None and self.intervalo > 0:
+                self._supervisor = threading.Thread(target=self._supervisar, name="supervisor-motores",
+                                                    daemon=True)
+                self._supervisor.start()
+            log.info("Motor %s: %d worker(s) en %s", nombre, len(procesos), self.directorio)
+            return procesos
+
+    def representante(self, nombre: str) -> MotorRemoto:
+        """Fábrica para EngineRegistry: arranca los workers del motor."""
+        procesos = self._iniciar(nombre)
+        representante = self._representantes.get(nombre)
+        if representante is None:
+            representante = self._representantes.setdefault(nombre, MotorRemoto(nombre, self))
+            version = procesos[0].ping(self.timeout_arranque)
+            if version is not None:
+                representante.observar(version)
+        return representante
+
+    def enviar(self, nombre: str, facts, lote: bool, trace: bool) -> Future:
+        """Diagnóstico (o lista, si ``lote``) como Future de concurrent.futures."""
+        procesos = self._iniciar(nombre)
+        n = len(procesos)
+        inicio = next(self._turnos[nombre])
+        for k in range(n):
+            conexion = procesos[(inicio + k) % n].conexion()
+            if conexion is not None:
+                break
+        else:
+            raise MotorCaido(f"El motor {nombre} no tiene workers disponibles")
+
+        datos = codificar_pedido(facts if lote else [facts], trace)
+        crudo = conexion.enviar(INFER_BATCH if lote else INFER, datos)
+        futuro = Future()
+        representante = self._representantes.get(nombre)
+
+        def _decodificar(f: Future):
+            try:
+                diags = decodificar_diagnosticos(f.result())
+            except BaseException as e:
+                futuro.set_exception(e)
+                return
+            if representante is not None and diags:
+                representante.observar(diags[-1].model_version)
+            futuro.set_result(diags if lote else diags[0])
+
+        crudo.add_done_callback(_decodificar)
+        return futuro
+
+    def _supervisar(self):
+        # Solo en el proceso que lanzó los workers (tras un fork el hilo no existe)
+        while not self._cerrado.wait(self.intervalo):
+            for nombre, procesos in list(self._procesos.items()):
+                for proceso in procesos:
+                    if self._cerrado.is_set():
+                        return
+                    version = proceso.ping(self.timeout_salud)
+                    pid = proceso.popen.pid if proceso.popen else None
+                    if version is None:
+                        log.warning("Worker de %s (pid %s) caído o sin responder: se reinicia", nombre, pid)
+                        self._reiniciar(proceso)
+                        continue
+                    if nombre in self._representantes:
+                        self._representantes[nombre].observar(version)
+                    # El ping lo responde el hilo lector: una inferencia trabada
+                    # solo se nota en la antigüedad de los pendientes
+                    antiguedad = proceso.antiguedad()
+                    if antiguedad > self.timeout_colgado:
+                        log.warning("Worker de %s (pid %s) con un pedido sin respuesta hace %.0f s: "
+                                    "se reinicia", nombre, pid, antiguedad)
+                        self._reiniciar(proceso)
+
+    def _reiniciar(self, proceso: _Proceso):
+        proceso.detener()
+        proceso.reinicios += 1
+        try:
+            proceso.lanzar()
+            proceso.esperar(self.timeout_arranque)
+        except Exception as e:
+            # Se reintenta en la próxima revisión
+            log.error("No se pudo reiniciar el worker de %s: %s", proceso.nombre, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directorio": self.directorio,
+            "conexiones_por_proceso": self.n_conexiones,
+            "motores": {nombre: [p.stats() for p in procesos]
+                        for nombre, procesos in list(self._procesos.items())},
+        }
+
+    def cerrar(self):
+        self._cerrado.set()
+        if os.getpid() != self._pid:
+            return  # copia de un fork: los workers son del proceso que los lanzó
+        for procesos in list(self._procesos.values()):
+            for proceso in procesos:
+                proceso.detener()
+                try:
+                    os.remove(proceso.ruta)
+                except OSError:
+                    pass
+        if self._temporal:
+            try:
+                os.rmdir(self.directorio)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2:
+        print("Uso: python -m app.rpc <motor> <socket>", file=sys.stderr)
+        sys.exit(2)
+    # Lo del proyecto en INFO; las bibliotecas (experta registra cada regla) en WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(name)s: %(message)s")
+    for nombre in ("app", __name__):
+        logging.getLogger(nombre).setLevel(logging.INFO)
+    ServidorMotor(*args).servir()
+
+
+if __name__ == "__main__":
+    main()
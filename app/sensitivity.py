@@ -0,0 +1,153 @@
+"""Análisis de sensibilidad exacto de la red bayesiana.
+
+Calcula P(Dengue=1 | evidencia) para las 32 combinaciones de evidencia en
+todos los puntos de una grilla de valores de CPD, en una sola pasada de
+NumPy. Como Nexo siempre es evidencia y los síntomas solo dependen de
+Dengue, la posterior es exacta:
+
+    P(D=1 | e) = P(D=1 | nexo) * prod P(s | D=1) / sum_d P(D=d | nexo) * prod P(s | D=d)
+
+(DolorCuerpo no se observa y se marginaliza). Cada parámetro agrega un eje a
+los tensores de probabilidades; el resultado tiene forma
+``(n_1, ..., n_k, 32)``, con la última dimensión ordenada por
+``clave_evidencia``. Donde la evidencia es imposible con esos parámetros
+(probabilidad conjunta 0) el resultado es NaN.
+
+Un parámetro es la probabilidad de que un nodo valga 1 dado el estado de su
+padre: ``"Dengue|Nexo=1"`` es P(Dengue=1 | Nexo=1) (0.60 en el modelo del
+experto). Los nodos que no cambian la posterior (Nexo, DolorCuerpo) no se
+aceptan.
+"""
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pgmpy.models import DiscreteBayesianNetwork
+
+# Nodos con CPD que influye en la posterior -> su padre
+PARAMETRIZABLES = {
+    'Dengue': 'Nexo',
+    'Fiebre': 'Dengue',
+    'DolorCabeza': 'Dengue',
+    'Tos': 'Dengue',
+    'DolorGarganta': 'Dengue',
+}
+
+# Síntomas observados, en el orden de clave_evidencia (después de Nexo)
+SINTOMAS = ('Fiebre', 'DolorCabeza', 'Tos', 'DolorGarganta')
+
+# Puntos de grilla por pedido (cada uno son 32 posteriores)
+MAX_PUNTOS = 10000
+
+
+def parametro(nombre: str) -> Tuple[str, int]:
+    """``"Dengue|Nexo=1"`` -> ("Dengue", 1). ValueError si no es válido."""
+    try:
+        nodo, condicion = nombre.split("|")
+        padre, estado = condicion.split("=")
+        nodo, padre, estado = nodo.strip(), padre.strip(), int(estado)
+    except ValueError:
+        raise ValueError(f"Parámetro inválido '{nombre}': se espera 'Nodo|Padre=0' o 'Nodo|Padre=1'")
+    if PARAMETRIZABLES.get(nodo) != padre or estado not in (0, 1):
+        validos = ", ".join(f"{n}|{p}=0/1" for n, p in PARAMETRIZABLES.items())
+        raise ValueError(f"Parámetro inválido '{nombre}'; válidos: {validos}")
+    return nodo, estado
+
+
+def valores_base(model: "DiscreteBayesianNetwork") -> Dict[str, np.ndarray]:
+    """P(nodo=1 | padre=0), P(nodo=1 | padre=1) de cada nodo parametrizable."""
+    return {nodo: np.asarray(model.get_cpds(nodo).get_values()[1], dtype=np.float64)
+            for nodo in PARAMETRIZABLES}
+
+
+def _grilla(grilla: Dict[str, Sequence[float]]) -> List[Tuple[str, int, np.ndarray]]:
+    ejes = []
+    vistos = set()
+    for nombre, valores in grilla.items():
+        nodo, estado = parametro(nombre)
+        if (nodo, estado) in vistos:
+            raise ValueError(f"Parámetro repetido: '{nombre}'")
+        vistos.add((nodo, estado))
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if valores.size == 0 or np.any((valores < 0) | (valores > 1)):
+            raise ValueError(f"Los valores de '{nombre}' deben ser probabilidades en [0, 1]")
+        ejes.append((nodo, estado, valores))
+    puntos = int(np.prod([v.size for _, _, v in ejes])) if ejes else 1
+    if puntos > MAX_PUNTOS:
+        raise ValueError(f"La grilla tiene {puntos} puntos (máximo {MAX_PUNTOS})")
+    return ejes
+
+
+def superficie(model: "DiscreteBayesianNetwork", grilla: Dict[str, Sequence[float]]) -> np.ndarray:
+    """P(Dengue=1 | evidencia) en cada punto de la grilla: forma (n_1, ..., n_k, 32)."""
+    ejes = _grilla(grilla)
+    k = len(ejes)
+    forma = tuple(v.size for _, _, v in ejes)
+
+    # p1[nodo]: P(nodo=1 | padre), forma (n_1, ..., n_k, 2) con los ejes de
+    # los parámetros que lo tocan y tamaño 1 en los demás
+    p1 = {nodo: base.reshape((1,) * k + (2,)) for nodo, base in valores_base(model).items()}
+    for i, (nodo, estado, valores) in enumerate(ejes):
+        eje = [1] * k + [1]
+        eje[i] = valores.size
+        columna = valores.reshape(eje)
+        otra = p1[nodo][..., 1 - estado:2 - estado]
+        partes = (columna, otra) if estado == 0 else (otra, columna)
+        p1[nodo] = np.concatenate(np.broadcast_arrays(*partes), axis=-1)
+
+    # Ejes finales: (..., Dengue, Nexo, Fiebre, DolorCabeza, Tos, DolorGarganta)
+    # P(Dengue=d | Nexo=n): tabla (..., n, d) -> (..., d, n, 1, 1, 1, 1)
+    tabla = np.stack([1.0 - p1['Dengue'], p1['Dengue']], axis=-1)
+    conjunta = np.swapaxes(tabla, -1, -2).reshape(tabla.shape[:-2] + (2, 2, 1, 1, 1, 1))
+    for posicion, nodo in enumerate(SINTOMAS, start=1):
+        # P(síntoma=e | Dengue=d): tabla (..., d, e) -> (..., d, 1, .., e, .., 1)
+        tabla = np.stack([1.0 - p1[nodo], p1[nodo]], axis=-1)
+        ejes_evidencia = (1,) * posicion + (2,) + (1,) * (len(SINTOMAS) - posicion)
+        conjunta = conjunta * tabla.reshape(tabla.shape[:-2] + (2,) + ejes_evidencia)
+    conjunta = np.broadcast_to(conjunta, forma + conjunta.shape[k:])
+    with np.errstate(invalid="ignore"):
+        posterior = conjunta[..., 1, :, :, :, :, :] / conjunta.sum(axis=-6)
+    return posterior.reshape(forma + (32,))
+
+
+def valores_grilla(especificacion) -> np.ndarray:
+    """Lista de valores o rango {"desde", "hasta", "pasos"} (extremos incluidos)."""
+    if isinstance(especificacion, dict):
+        try:
+            pasos = int(especificacion["pasos"])
+            desde, hasta = float(especificacion["desde"]), float(especificacion["hasta"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Un rango necesita 'desde', 'hasta' y 'pasos' numéricos")
+        if pasos < 1 or pasos > MAX_PUNTOS:
+            raise ValueError(f"'pasos' debe estar entre 1 y {MAX_PUNTOS}")
+        return np.linspace(desde, hasta, pasos)
+    try:
+        return np.asarray(especificacion, dtype=np.float64).ravel()
+    except (TypeError, ValueError):
+        raise ValueError("Los valores deben ser una lista de números o un rango")
+
+
+def superficie_ingenua(model: "DiscreteBayesianNetwork", grilla: Dict[str, Sequence[float]]) -> np.ndarray:
+    """Lo mismo con un modelo y VariableElimination por punto (referencia para el benchmark)."""
+    from pgmpy.factors.discrete import TabularCPD
+    from pgmpy.inference import VariableElimination
+    from app.systems.probabilistic import EVIDENCIA
+
+    ejes = _grilla(grilla)
+    forma = tuple(v.size for _, _, v in ejes)
+    base = valores_base(model)
+    resultado = np.empty(forma + (32,))
+    for indice in np.ndindex(*forma):
+        p1 = {nodo: v.copy() for nodo, v in base.items()}
+        for (nodo, estado, valores), i in zip(ejes, indice):
+            p1[nodo][estado] = valores[i]
+        modelo = model.copy()
+        modelo.add_cpds(*[TabularCPD(nodo, 2, [1 - p1[nodo], p1[nodo]], evidence=[padre], evidence_card=[2])
+                          for nodo, padre in PARAMETRIZABLES.items() if nodo in {e[0] for e in ejes}])
+        inferencia = VariableElimination(modelo)
+        for clave in range(32):
+            evidence = {nodo: (clave >> (len(EVIDENCIA) - 1 - j)) & 1 for j, nodo in enumerate(EVIDENCIA)}
+            resultado[indice + (clave,)] = inferencia.query(
+                ['Dengue'], evidence=evidence, show_progress=False).values[1]
+    return resultado
@@ -1,17 +1,109 @@
 # base.py
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Optional
+from .facts import Hechos
+
+# Razonamiento de los diagnósticos pedidos con trace=False
+SIN_TRAZA = ()
+
+class Traza(Sequence):
+    """Razonamiento que se formatea recién cuando alguien lo lee.
+
+    Las subclases guardan solo los valores del caso en campos (__slots__) y
+    arman el texto en ``lineas()``; las secciones fijas son tuplas de
+    constantes compartidas por todos los diagnósticos. Se lee como una
+    lista de str de solo lectura (índices, len, iteración, ==).
+    """
+    __slots__ = ("_texto",)
+
+    def lineas(self) -> List[str]:
+        raise NotImplementedError
+
+    def _lineas(self) -> List[str]:
+        try:
+            return self._texto
+        except AttributeError:
+            self._texto = self.lineas()
+            return self._texto
+
+    def __getitem__(self, i):
+        return self._lineas()[i]
+
+    def __len__(self):
+        return len(self._lineas())
+
+    def __iter__(self):
+        return iter(self._lineas())
+
+    def __eq__(self, otra):
+        if isinstance(otra, (Traza, list, tuple)):
+            return list(self) == list(otra)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._lineas())
 
 @dataclass
 class Diagnosis:
     label: str
     confidence: float
-    reasoning: List[str]
+    # Lista de pasos, Traza (diferida) o SIN_TRAZA
+    reasoning: Sequence
+    # Modelo que lo produjo (ver InferenceEngine.version)
+    model_version: str = ""
 
 class InferenceEngine(ABC):
     """Clase Base que obliga a todos los motores a seguir el mismo estándar."""
-    
+
+    # Se incrementa cada vez que cambia el conocimiento del motor (invalida caches)
+    model_version: int = 0
+    # Campo "version" del archivo de conocimiento (ver knowledge.py)
+    knowledge_version: str = ""
+    # Huella del contenido de ese archivo, para detectar cambios reales
+    knowledge_hash: str = ""
+
+    def version(self) -> str:
+        """``"<versión del archivo>/<model_version>"``: con qué conocimiento y
+        en qué publicación del modelo se hizo un diagnóstico."""
+        return f"{self.knowledge_version}/{self.model_version}"
+
     @abstractmethod
-    def infer(self, facts: Dict[str, Any]) -> Diagnosis:
-        pass
\ No newline at end of file
+    def infer(self, facts: Hechos, trace: bool = True) -> Diagnosis:
+        """Diagnostica un paciente (PatientFacts, o un dict que se convierte
+        con ``facts.como_hechos``). Con ``trace=False`` no se arma el
+        razonamiento (``reasoning`` queda en SIN_TRAZA)."""
+        pass
+
+    def infer_batch(self, facts_list: List[Hechos], trace: bool = True) -> List[Diagnosis]:
+        """Diagnostica una lista de pacientes (mismo orden que la entrada).
+
+        Implementación por defecto: un infer() por paciente. Los motores
+        la sobreescriben con un camino por lotes propio.
+        """
+        return [self.infer(facts, trace) for facts in facts_list]
+
+    def probabilidad_dengue(self, diag: Diagnosis) -> Optional[float]:
+        """Lectura del diagnóstico como P(dengue), para combinar motores.
+
+        Por defecto ``confidence`` ya es esa probabilidad (red bayesiana,
+        difuso). None si el diagnóstico no dice nada sobre dengue.
+        """
+        if diag.label.startswith("Error"):
+            return None
+        return diag.confidence
+
+    def validar(self):
+        """Chequeos extra de un modelo recién construido antes de publicarlo
+        (ver app/reload.py); lanza una excepción si no sirve."""
+
+    def congelar(self):
+        """Precalcula lo que el motor construye de forma diferida y marca sus
+        arrays como de solo lectura.
+
+        Se llama en el proceso maestro antes del fork (ver app/prefork.py)
+        para que los workers compartan esas páginas sin copiarlas.
+        """
@@ -0,0 +1,96 @@
+"""Tabla de decisión compilada a partir de las reglas de DiagnosticoMedico.
+
+Las cuatro reglas solo dependen de ``fiebre > umbral`` y de siete booleanos,
+así que hay 256 combinaciones posibles. Al construir la tabla se ejecuta el
+motor experta una vez por combinación y se guarda la etiqueta, la confianza y
+la traza; la única parte de la traza que varía dentro de una combinación es
+el valor de fiebre, que queda como plantilla ``{f}``. Después cada consulta
+es un índice por máscara de bits, sin agenda ni pattern matching, y la
+traza se formatea recién cuando alguien la lee (``TrazaTabla``).
+
+Las reglas siguen siendo la única fuente de verdad: si cambian, la tabla se
+recompila igual. ``verificar_equivalencia`` compara ambos caminos en todas las
+combinaciones alcanzables (incluyendo valores de fiebre en el umbral).
+"""
+from typing import Callable
+
+from .base import Diagnosis, SIN_TRAZA, Traza
+from .facts import BOOLEANOS, PatientFacts
+
+# El índice de la tabla es la máscara de PatientFacts con el bit de
+# ``fiebre > umbral`` por encima (el más alto)
+
+# Distancia al umbral de los valores de fiebre "marcadores" usados al
+# compilar: no aparecen en otra parte de la traza, así que se pueden
+# reemplazar por la plantilla sin ambigüedad (38.123456789 y 36.123456789
+# con el umbral de 37.5).
+_MARCADOR_ALTA = 0.623456789
+_MARCADOR_NORMAL = -1.376543211
+
+
+def fiebres_verificacion(umbral: float):
+    """Valores de fiebre con los que se verifica la equivalencia (incluye el umbral)."""
+    return (35.0, umbral - 1.0, umbral - 0.1, umbral, umbral + 0.00001, umbral + 0.1, umbral + 1.0, 42.0)
+
+
+def _hechos(mascara: int, fiebre: float) -> PatientFacts:
+    return PatientFacts(fiebre, mascara=mascara & ((1 << len(BOOLEANOS)) - 1))
+
+
+class TrazaTabla(Traza):
+    """Plantillas compiladas de una combinación + el valor de fiebre del caso."""
+    __slots__ = ("plantillas", "fiebre")
+
+    def __init__(self, plantillas, fiebre):
+        self.plantillas = plantillas
+        self.fiebre = fiebre
+
+    def lineas(self):
+        f = self.fiebre
+        return [texto.format(f=f) if dinamica else texto for texto, dinamica in self.plantillas]
+
+
+class TablaDecision:
+    def __init__(self, ejecutar: Callable[[PatientFacts], Diagnosis], umbral_fiebre: float):
+        """``ejecutar`` corre el camino experta para unos hechos;
+        ``umbral_fiebre`` es el de las reglas."""
+        self.umbral_fiebre = umbral_fiebre
+        n = 2 ** (len(BOOLEANOS) + 1)
+        self.entradas = [self._compilar(ejecutar, mascara) for mascara in range(n)]
+
+    def _compilar(self, ejecutar, mascara: int):
+        fiebre_alta = bool(mascara >> len(BOOLEANOS))
+        marcador = self.umbral_fiebre + (_MARCADOR_ALTA if fiebre_alta else _MARCADOR_NORMAL)
+        diag = ejecutar(_hechos(mascara, marcador))
+
+        plantillas = []
+        for linea in diag.reasoning:
+            if str(marcador) in linea:
+                escapada = linea.replace('{', '{{').replace('}', '}}')
+                plantillas.append((escapada.replace(str(marcador), '{f}'), True))
+            else:
+                plantillas.append((linea, False))
+        return diag.label, diag.confidence, tuple(plantillas)
+
+    def evaluar(self, facts: PatientFacts, trace: bool = True, version: str = "") -> Diagnosis:
+        f = facts.fiebre
+        label, confidence, plantillas = self.entradas[(f > self.umbral_fiebre) << len(BOOLEANOS) | facts.mascara]
+        return Diagnosis(label, confidence, TrazaTabla(plantillas, f) if trace else SIN_TRAZA, version)
+
+
+def verificar_equivalencia(tabla: TablaDecision, ejecutar: Callable[[PatientFacts], Diagnosis]) -> int:
+    """Compara tabla y experta en todas las combinaciones alcanzables.
+
+    Devuelve la cantidad de casos verificados; lanza AssertionError en la
+    primera diferencia.
+    """
+    casos = 0
+    for mascara in range(2 ** len(BOOLEANOS)):
+        for fiebre in fiebres_verificacion(tabla.umbral_fiebre):
+            facts = _hechos(mascara, fiebre)
+            esperado = ejecutar(facts)
+            obtenido = tabla.evaluar(facts)
+            if obtenido != esperado:
+                raise AssertionError(f"Difieren para {facts}:\n  experta: {esperado}\n  tabla:   {obtenido}")
+            casos += 1
+    return casos
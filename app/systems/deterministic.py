@@ -1,6 +1,26 @@
+import os
+import functools
 from experta import *
-from typing import Dict, Any
-from .base import InferenceEngine, Diagnosis
+from typing import Dict, Any, List, Optional
+from .base import InferenceEngine, Diagnosis, SIN_TRAZA
+from .pool import ObjectPool
+from .decision_table import TablaDecision, verificar_equivalencia
+from .facts import Hechos, PatientFacts, como_hechos
+from . import knowledge
+
+# Conclusiones de las reglas que afirman dengue
+CONCLUSIONES_DENGUE = ("DENGUE (Alta Probabilidad)", "Sospecha de Dengue (Importado)")
+
+# "compiled": tabla de decision precompilada (ver decision_table.py)
+# "experta": motor de reglas con agenda y red Rete
+MODOS = ("compiled", "experta")
+
+def parametros(conocimiento: Dict[str, Any]):
+    """Umbral de fiebre y confianza de cada conclusión, desde el archivo de conocimiento."""
+    umbral = knowledge.numero(conocimiento, 'umbral_fiebre')
+    confianza = {clave: knowledge.numero(conocimiento, 'confianza', clave, minimo=0, maximo=1)
+                 for clave in ('contexto_local', 'importado', 'covid')}
+    return umbral, confianza
 
 # --- DEFINICIÓN DE HECHOS ---
 class Sintomas(Fact):
@@ -13,12 +33,22 @@ class Epidemiologia(Fact):
 
 # --- MOTOR DE CONOCIMIENTO ---
 class DiagnosticoMedico(KnowledgeEngine):
-    def __init__(self):
+    def __init__(self, conocimiento: Dict[str, Any] = None):
         super().__init__()
+        if conocimiento is None:
+            conocimiento = knowledge.leer("deterministico")
+        self.umbral_fiebre, self.confianza = parametros(conocimiento)
         self.trace = []  # Traza para explicar al usuario
         self.conclusion = None
         self.confidence = 0.0
 
+    def reset(self, **kwargs):
+        # Limpia también la traza y la conclusión para poder reutilizar el motor
+        self.trace = []
+        self.conclusion = None
+        self.confidence = 0.0
+        super().reset(**kwargs)
+
     def log(self, text):
         self.trace.append(text)
 
@@ -30,13 +60,13 @@ class DiagnosticoMedico(KnowledgeEngine):
     @Rule(Sintomas(fiebre=MATCH.f, tos=MATCH.t, dolor_garganta=MATCH.g, dolor_cabeza=MATCH.dc))
     def regla_sintomas_base(self, f, t, g, dc):
         # Lógica en Python (Más segura que ponerla en el decorador)
-        tiene_fiebre = f > 37.5
+        tiene_fiebre = f > self.umbral_fiebre
         sintoma_respiratorio = t or g
         tiene_dolor_cabeza = dc
 
         if tiene_fiebre and (sintoma_respiratorio or tiene_dolor_cabeza):
             self.log("REGLA ACTIVADA: regla_sintomas_base")
-            self.log(f"   Condición: Fiebre {f}°C (>37.5) Y (Tos={t} O Garganta={g} O DolorCabeza={dc})")
+            self.log(f"   Condición: Fiebre {f}°C (>{self.umbral_fiebre:g}) Y (Tos={t} O Garganta={g} O DolorCabeza={dc})")
             self.log("   Resultado: Sospecha de infección viral detectada.")
             self.declare(Fact(sospecha_infeccion=True))
         else:
@@ -71,12 +101,12 @@ class DiagnosticoMedico(KnowledgeEngine):
             self.log("   Condición: Vive en Corrientes Y es Verano")
             self.log("   Resultado: DENGUE (Alta Probabilidad)")
             self.conclusion = "DENGUE (Alta Probabilidad)"
-            self.confidence = 0.95
+            self.confidence = self.confianza['contexto_local']
         else:
             # Caso donde hay riesgo pero no es contexto local (ej: caso importado)
             self.log(" Riesgo Dengue detectado, pero contexto local no aplica.")
             self.conclusion = "Sospecha de Dengue (Importado)"
-            self.confidence = 0.80
+            self.confidence = self.confianza['importado']
 
     # ----------------------------------------------------------------
     # REGLA 4: COVID por Descarte
@@ -89,33 +119,105 @@ class DiagnosticoMedico(KnowledgeEngine):
         self.log("   Condición: Hay síntomas pero NO hay nexo de Dengue.")
         self.log("   Resultado: Posible COVID-19")
         self.conclusion = "Posible COVID-19"
-        self.confidence = 0.60
+        self.confidence = self.confianza['covid']
 
 # --- CLASE INTERFAZ ---
 class RuleBasedEngine(InferenceEngine):
-    def infer(self, facts: Dict[str, Any]) -> Diagnosis:
-        engine = DiagnosticoMedico()
+    def __init__(self, pool_size: int = None, mode: str = None, conocimiento: Dict[str, Any] = None):
+        if mode is None:
+            mode = os.environ.get("RULES_MODE", "compiled")
+        if mode not in MODOS:
+            raise ValueError(f"Modo de reglas desconocido: {mode}")
+        self.mode = mode
+
+        if conocimiento is None:
+            conocimiento = knowledge.leer("deterministico")
+        self.knowledge_version = knowledge.version(conocimiento)
+        self.knowledge_hash = knowledge.huella(conocimiento)
+        umbral_fiebre, _ = parametros(conocimiento)
+
+        # Construir un DiagnosticoMedico compila la red Rete de las reglas:
+        # se hace una vez por motor del pool y entre pedidos solo se reinician
+        # hechos, agenda, traza y conclusion con reset(). Con la tabla
+        # compilada el pool solo sirve para compilarla y validarla: basta uno.
+        if pool_size is None:
+            if mode == "compiled":
+                pool_size = 1
+            else:
+                pool_size = int(os.environ.get("RULES_POOL_SIZE", min(os.cpu_count() or 2, 8)))
+        self.pool = ObjectPool(functools.partial(DiagnosticoMedico, conocimiento), pool_size)
+        # La tabla se compila corriendo las reglas reales una vez por combinacion
+        self.tabla = TablaDecision(self._infer_experta, umbral_fiebre) if mode == "compiled" else None
+
+    def validar(self):
+        if self.tabla is not None:
+            verificar_equivalencia(self.tabla, self._infer_experta)
+
+    def _ejecutar(self, engine: DiagnosticoMedico, facts: PatientFacts) -> Diagnosis:
+        # reset() descarta tambien los hechos derivados (sospecha_infeccion,
+        # riesgo_dengue) de la corrida anterior, no solo Sintomas/Epidemiologia
         engine.reset()
-        
-        # Cargamos los hechos tal cual vienen del formulario
+        self._cargar_hechos(engine, facts)
+        engine.run()
+        return self._diagnostico(engine)
+
+    def _cargar_hechos(self, engine: DiagnosticoMedico, facts: PatientFacts):
         engine.declare(Sintomas(
-            fiebre=facts.get('fiebre', 36.5), 
-            tos=facts.get('tos', False), 
-            dolor_garganta=facts.get('dolor_garganta', False),
-            dolor_cabeza=facts.get('dolor_cabeza', False)
+            fiebre=facts.fiebre,
+            tos=facts.tos,
+            dolor_garganta=facts.dolor_garganta,
+            dolor_cabeza=facts.dolor_cabeza
         ))
         
         engine.declare(Epidemiologia(
-            viaje_brasil=facts['viaje_brasil'],
-            contacto_dengue=facts['contacto_dengue'],
-            vive_corrientes=facts['vive_corrientes'],
-            verano=facts['verano']
+            viaje_brasil=facts.viaje_brasil,
+            contacto_dengue=facts.contacto_dengue,
+            vive_corrientes=facts.vive_corrientes,
+            verano=facts.verano
         ))
-        
-        engine.run()
-        
+
+    def _diagnostico(self, engine: DiagnosticoMedico) -> Diagnosis:
         label = engine.conclusion if engine.conclusion else "Sin Diagnóstico Concluyente"
         # Si no hay conclusión, la confianza es 0.0
         conf = engine.confidence if engine.conclusion else 0.0
         
-        return Diagnosis(label, conf, engine.trace)
\ No newline at end of file
+        return Diagnosis(label, conf, engine.trace)
+
+    def probabilidad_dengue(self, diag: Diagnosis) -> Optional[float]:
+        # La confianza es la de la conclusión: COVID por descarte implica
+        # dengue poco probable; sin conclusión no aporta
+        if diag.label in CONCLUSIONES_DENGUE:
+            return diag.confidence
+        if diag.label == "Posible COVID-19":
+            return 1.0 - diag.confidence
+        return None
+
+    def _infer_experta(self, facts: PatientFacts) -> Diagnosis:
+        with self.pool.acquire() as engine:
+            return self._ejecutar(engine, facts)
+
+    def infer(self, facts: Hechos, trace: bool = True) -> Diagnosis:
+        facts = como_hechos(facts)
+        version = self.version()
+        if self.tabla is not None:
+            return self.tabla.evaluar(facts, trace, version)
+        diag = self._infer_experta(facts)
+        diag.model_version = version
+        if not trace:
+            # Las reglas escriben la traza al dispararse: solo se descarta
+            diag.reasoning = SIN_TRAZA
+        return diag
+
+    def infer_batch(self, facts_list: List[Hechos], trace: bool = True) -> List[Diagnosis]:
+        version = self.version()
+        if self.tabla is not None:
+            evaluar = self.tabla.evaluar
+            return [evaluar(como_hechos(facts), trace, version) for facts in facts_list]
+        # Un solo motor del pool para todo el lote
+        with self.pool.acquire() as engine:
+            diags = [self._ejecutar(engine, como_hechos(facts)) for facts in facts_list]
+        for diag in diags:
+            diag.model_version = version
+            if not trace:
+                diag.reasoning = SIN_TRAZA
+        return diags
@@ -0,0 +1,177 @@
+"""Hechos de un paciente en una representación compacta, común a los motores.
+
+Los siete booleanos van en una máscara de bits (``BOOLEANOS`` en orden, el
+primero en el bit más alto: el mismo orden que la tabla de decisión del
+motor de reglas) y los tres numéricos como float. Un ``PatientFacts`` se
+arma una sola vez por pedido, validado, desde el formulario o desde JSON, y
+lo comparten los motores, el cache (``clave()``) y los lotes; así todos los
+motores leen los mismos campos con los mismos valores por defecto.
+
+Los motores aceptan además un diccionario con las mismas claves, que se
+convierte con ``como_hechos`` (para scripts, benchmarks y los hechos
+guardados en ``learning_logs``).
+"""
+import math
+import sys
+from typing import Any, Dict, Mapping, Tuple, Union
+
+NUMERICOS = ('fiebre', 'intensidad_dolor_cabeza', 'intensidad_tos')
+BOOLEANOS = ('tos', 'dolor_garganta', 'dolor_cabeza', 'viaje_brasil',
+             'contacto_dengue', 'vive_corrientes', 'verano')
+CAMPOS = NUMERICOS + BOOLEANOS
+
+# Valores por defecto del formulario (los booleanos, False)
+DEFECTOS = {'fiebre': 36.0, 'intensidad_dolor_cabeza': 5.0, 'intensidad_tos': 5.0}
+# Rango de los sliders (como PatientData)
+RANGOS = {'intensidad_dolor_cabeza': (0.0, 10.0), 'intensidad_tos': (0.0, 10.0)}
+
+# Límites del camino rápido de ``desde_dict`` (excluyen inf; NaN nunca compara)
+_LIMITES = tuple((campo, *RANGOS.get(campo, (-sys.float_info.max, sys.float_info.max))) for campo in NUMERICOS)
+
+BITS = {campo: 1 << (len(BOOLEANOS) - 1 - i) for i, campo in enumerate(BOOLEANOS)}
+TOS, DOLOR_GARGANTA, DOLOR_CABEZA, VIAJE_BRASIL, CONTACTO_DENGUE, VIVE_CORRIENTES, VERANO = (
+    BITS[campo] for campo in BOOLEANOS)
+MAX_MASCARA = (1 << len(BOOLEANOS)) - 1
+_BITS = tuple(BITS.items())
+
+# Nombres que usaba el motor bayesiano; se aceptan si falta el campo actual
+ALIAS = {'presencia_tos': 'tos', 'estacion_verano': 'verano', 'reside_corrientes': 'vive_corrientes'}
+# Campos del formulario HTML con otro nombre
+FORMULARIO = {'dolor_cabeza': 'dolor_cabeza_check'}
+
+
+class HechosInvalidos(ValueError):
+    """Un campo del paciente no tiene un valor válido."""
+
+
+class PatientFacts:
+    __slots__ = ("mascara", "fiebre", "intensidad_dolor_cabeza", "intensidad_tos")
+
+    def __init__(self, fiebre: float = DEFECTOS['fiebre'],
+                 intensidad_dolor_cabeza: float = DEFECTOS['intensidad_dolor_cabeza'],
+                 intensidad_tos: float = DEFECTOS['intensidad_tos'], mascara: int = 0, **booleanos: bool):
+        """Sin validar: para datos que ya son del tipo correcto (ver ``desde_dict``)."""
+        for campo, valor in booleanos.items():
+            bit = BITS.get(campo)
+            if bit is None:
+                raise TypeError(f"Campo desconocido: {campo}")
+            mascara = mascara | bit if valor else mascara & ~bit
+        self.mascara = mascara
+        self.fiebre = float(fiebre)
+        self.intensidad_dolor_cabeza = float(intensidad_dolor_cabeza)
+        self.intensidad_tos = float(intensidad_tos)
+
+    # --- Construcción validada ---
+    @classmethod
+    def desde_dict(cls, datos: Mapping[str, Any]) -> "PatientFacts":
+        """Desde JSON (o un dict de hechos). Los campos que faltan toman el
+        valor por defecto; las claves desconocidas se ignoran."""
+        get = datos.get
+        numeros = []
+        for campo, minimo, maximo in _LIMITES:
+            valor = get(campo)
+            # Camino rápido: float ya en rango (lo habitual desde JSON)
+            if type(valor) is not float or not minimo <= valor <= maximo:
+                valor = _numero(campo, _valor(datos, campo))
+            numeros.append(valor)
+        mascara = 0
+        for campo, bit in _BITS:
+            valor = get(campo)
+            if valor is True or (valor is not False and _booleano(campo, _valor(datos, campo))):
+                mascara |= bit
+        hechos = cls.__new__(cls)
+        hechos.mascara = mascara
+        hechos.fiebre, hechos.intensidad_dolor_cabeza, hechos.intensidad_tos = numeros
+        return hechos
+
+    @classmethod
+    def desde_formulario(cls, form: Mapping[str, Any]) -> "PatientFacts":
+        """Desde el formulario HTML: los checkboxes marcados llegan como "on"."""
+        numeros = {campo: _numero(campo, form.get(campo)) for campo in NUMERICOS}
+        mascara = 0
+        for campo in BOOLEANOS:
+            if form.get(FORMULARIO.get(campo, campo)) == "on":
+                mascara |= BITS[campo]
+        return cls(mascara=mascara, **numeros)
+
+    # --- Lectura ---
+    def clave(self) -> Tuple[int, float, float, float]:
+        """Tupla canónica e inmutable (clave del cache)."""
+        return self.mascara, self.fiebre, self.intensidad_dolor_cabeza, self.intensidad_tos
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Mismo diccionario que armaba el formulario (JSON de ``learning_logs``)."""
+        datos = {campo: getattr(self, campo) for campo in NUMERICOS}
+        for campo, bit in BITS.items():
+            datos[campo] = bool(self.mascara & bit)
+        return datos
+
+    def __eq__(self, otro):
+        if isinstance(otro, PatientFacts):
+            return self.clave() == otro.clave()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.clave())
+
+    def __reduce__(self):
+        return PatientFacts, (self.fiebre, self.intensidad_dolor_cabeza, self.intensidad_tos, self.mascara)
+
+    def __repr__(self):
+        presentes = [campo for campo, bit in BITS.items() if self.mascara & bit]
+        return (f"PatientFacts(fiebre={self.fiebre:g}, intensidad_dolor_cabeza={self.intensidad_dolor_cabeza:g}, "
+                f"intensidad_tos={self.intensidad_tos:g}, {'+'.join(presentes) or 'sin booleanos'})")
+
+
+def _propiedad(bit: int):
+    return property(lambda self: bool(self.mascara & bit))
+
+
+for _campo, _bit in BITS.items():
+    setattr(PatientFacts, _campo, _propiedad(_bit))
+
+
+def _valor(datos: Mapping[str, Any], campo: str):
+    valor = datos.get(campo)
+    if valor is None:
+        for alias, destino in ALIAS.items():
+            if destino == campo and datos.get(alias) is not None:
+                return datos[alias]
+    return valor
+
+
+def _numero(campo: str, valor) -> float:
+    if valor is None or valor == "":
+        return DEFECTOS[campo]
+    if isinstance(valor, bool):
+        raise HechosInvalidos(f"{campo}: se espera un número, no {valor!r}")
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise HechosInvalidos(f"{campo}: se espera un número, no {valor!r}")
+    if not math.isfinite(numero):
+        raise HechosInvalidos(f"{campo}: {valor!r} no es un valor finito")
+    rango = RANGOS.get(campo)
+    if rango is not None and not rango[0] <= numero <= rango[1]:
+        raise HechosInvalidos(f"{campo}: {numero:g} fuera de rango ({rango[0]:g}-{rango[1]:g})")
+    return numero
+
+
+def _booleano(campo: str, valor) -> bool:
+    if valor is None or valor is False or valor is True:
+        return bool(valor)
+    # 0/1 (p. ej. columnas INTEGER de SQLite); cualquier otra cosa es un error,
+    # no se interpreta por su "verdad" (bool("no") es True)
+    if type(valor) in (int, float) and valor in (0, 1):
+        return bool(valor)
+    raise HechosInvalidos(f"{campo}: se espera true/false, no {valor!r}")
+
+
+Hechos = Union[PatientFacts, Mapping[str, Any]]
+
+
+def como_hechos(facts: Hechos) -> PatientFacts:
+    """``facts`` tal cual si ya es un PatientFacts; si no, validado con ``desde_dict``."""
+    if type(facts) is PatientFacts:
+        return facts
+    return PatientFacts.desde_dict(facts)
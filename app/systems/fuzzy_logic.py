@@ -1,124 +1,328 @@
+import os
+import threading
 import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
-from .base import InferenceEngine, Diagnosis
+from .base import InferenceEngine, Diagnosis, SIN_TRAZA, Traza
+from .pool import ObjectPool
+from .fuzzy_numpy import MamdaniNumpy
+from .fuzzy_surface import EJES_DEFECTO, SuperficieDifusa
+from .facts import CONTACTO_DENGUE, VIAJE_BRASIL, Hechos, PatientFacts, como_hechos
+from . import knowledge
+
+# "numpy": evaluador vectorizado propio (ver fuzzy_numpy.py)
+# "surface": superficie precalculada + interpolacion (ver fuzzy_surface.py)
+# "skfuzzy": ControlSystemSimulation de referencia
+BACKENDS = ("numpy", "surface", "skfuzzy")
+
+SIN_SALIDA = "Error: ninguna regla activa la salida para estas entradas"
+
+# Variables que arma _entradas y salida que se lee: el archivo de
+# conocimiento define sus universos, terminos y reglas, pero no cuales son
+ANTECEDENTES = ('fiebre', 'dolor_cabeza', 'intensidad_tos', 'riesgo_epi')
+CONSECUENTE = 'posibilidad_dengue'
+
+# Funciones de membresia admitidas -> cantidad de parametros
+MEMBRESIAS = {'trimf': 3, 'trapmf': 4, 'gaussmf': 2, 'gbellmf': 3, 'sigmf': 2}
+
+class TrazaDifusa(Traza):
+    """Entradas crisp y salida del caso; el resto de la traza sale del
+    conocimiento (``secciones``, compartidas por todos los diagnosticos)."""
+    __slots__ = ("fiebre", "dolor_cabeza", "intensidad_tos", "epi_score", "viaje", "contacto", "salida",
+                 "secciones")
+
+    def __init__(self, fiebre, dolor_cabeza, intensidad_tos, epi_score, viaje, contacto, salida, secciones):
+        self.fiebre = fiebre
+        self.dolor_cabeza = dolor_cabeza
+        self.intensidad_tos = intensidad_tos
+        self.epi_score = epi_score
+        self.viaje = viaje
+        self.contacto = contacto
+        self.salida = salida
+        self.secciones = secciones
+
+    def lineas(self):
+        descripcion, reglas, pesos = self.secciones
+        viaje = f"+{pesos['viaje_brasil']:g}" if self.viaje else '0'
+        contacto = f"+{pesos['contacto_dengue']:g}" if self.contacto else '0'
+        return [
+            *descripcion,
+            "VALORES DE ENTRADA (Crisp):",
+            f"  - Fiebre = {self.fiebre}C",
+            f"  - Dolor_Cabeza = {self.dolor_cabeza}/10",
+            f"  - Intensidad_Tos = {self.intensidad_tos}/10",
+            f"  - Riesgo_Epi = {self.epi_score} (Viaje:{viaje}, Contacto:{contacto})",
+            *reglas,
+            f"  Salida: {self.salida:.2f}%",
+        ]
+
+def _nombre(variable: str) -> str:
+    # 'dolor_cabeza' -> 'Dolor_Cabeza', como en la traza
+    return variable.title()
+
+def _variables(conocimiento):
+    """{nombre: definicion} de antecedentes y consecuente, validados."""
+    antecedentes = knowledge.campo(conocimiento, 'antecedentes')
+    consecuente = knowledge.campo(conocimiento, 'consecuente')
+    if set(antecedentes) != set(ANTECEDENTES):
+        raise knowledge.ConocimientoInvalido(f"Los antecedentes deben ser {', '.join(ANTECEDENTES)}")
+    if list(consecuente) != [CONSECUENTE]:
+        raise knowledge.ConocimientoInvalido(f"El consecuente debe ser {CONSECUENTE}")
+    variables = {**{v: antecedentes[v] for v in ANTECEDENTES}, CONSECUENTE: consecuente[CONSECUENTE]}
+    for nombre, definicion in variables.items():
+        desde = knowledge.numero(definicion, 'universo', 'desde')
+        hasta = knowledge.numero(definicion, 'universo', 'hasta')
+        paso = knowledge.numero(definicion, 'universo', 'paso', minimo=1e-9)
+        if hasta <= desde:
+            raise knowledge.ConocimientoInvalido(f"Universo vacio en {nombre}")
+        terminos = knowledge.campo(definicion, 'terminos')
+        if not isinstance(terminos, dict) or not terminos:
+            raise knowledge.ConocimientoInvalido(f"{nombre} no tiene terminos")
+        for termino, mf in terminos.items():
+            if (not isinstance(mf, list) or len(mf) != 2 or mf[0] not in MEMBRESIAS
+                    or not isinstance(mf[1], list) or len(mf[1]) != MEMBRESIAS[mf[0]]):
+                raise knowledge.ConocimientoInvalido(
+                    f"{nombre}.{termino}: se espera [tipo, [parametros]] con tipo en {', '.join(MEMBRESIAS)}")
+    return variables
+
+def _reglas(conocimiento, variables):
+    """[(operador, [(variable, termino), ...], termino_salida)], validadas."""
+    reglas = []
+    for i, regla in enumerate(knowledge.campo(conocimiento, 'reglas'), start=1):
+        condicion = knowledge.campo(regla, 'si')
+        salida = knowledge.campo(regla, 'entonces')
+        operador = 'OR' if ' OR ' in condicion else 'AND'
+        if operador == 'OR' and ' AND ' in condicion:
+            raise knowledge.ConocimientoInvalido(f"Regla {i}: no se pueden mezclar AND y OR")
+        literales = []
+        for literal in condicion.split(f' {operador} '):
+            variable, _, termino = literal.strip().partition('=')
+            if variable not in ANTECEDENTES or termino not in variables[variable]['terminos']:
+                raise knowledge.ConocimientoInvalido(f"Regla {i}: '{literal.strip()}' no existe")
+            literales.append((variable, termino))
+        if salida not in variables[CONSECUENTE]['terminos']:
+            raise knowledge.ConocimientoInvalido(f"Regla {i}: termino de salida '{salida}' no existe")
+        reglas.append((operador, literales, salida))
+    if not reglas:
+        raise knowledge.ConocimientoInvalido("No hay reglas")
+    return reglas
+
+def secciones(conocimiento):
+    """Partes fijas de la traza (descripcion, reglas, pesos del riesgo) de un conocimiento."""
+    variables = _variables(conocimiento)
+
+    def linea(nombre):
+        definicion = variables[nombre]
+        universo = definicion['universo']
+        return (f"  - {_nombre(nombre)}: [{universo['desde']:g}-{universo['hasta']:g}]"
+                f"{definicion.get('unidad', '')} -> {{{', '.join(definicion['terminos'])}}}")
+
+    descripcion = (
+        "SISTEMA DIFUSO: Variables Linguisticas",
+        "ANTECEDENTES:",
+        *[linea(v) for v in ANTECEDENTES],
+        "CONSECUENTE:",
+        linea(CONSECUENTE),
+        "---",
+    )
+    reglas = (
+        "---",
+        "REGLAS DIFUSAS:",
+        *[f"  [{salida.upper()}] " + f" {operador} ".join(f"{_nombre(v)}={t}" for v, t in literales)
+          for operador, literales, salida in _reglas(conocimiento, variables)],
+        "---",
+        "DEFUZZIFICACION:",
+        "  Metodo: Centroide",
+    )
+    return descripcion, reglas, pesos_epi(conocimiento)
+
+def pesos_epi(conocimiento):
+    """Puntos que suman al riesgo epidemiologico el viaje y el contacto."""
+    return {clave: knowledge.numero(conocimiento, 'puntaje_epi', clave, minimo=0)
+            for clave in ('viaje_brasil', 'contacto_dengue')}
+
+def construir_sistema(conocimiento=None):
+    """Construye variables, funciones de membresia y reglas del sistema difuso
+    a partir del archivo de conocimiento.
+
+    Cada llamada devuelve un grafo independiente: skfuzzy guarda el estado de
+    la simulacion (entradas, cortes, salidas) en los propios Antecedent/Term,
+    asi que dos simulaciones sobre el mismo ControlSystem se pisan entre si.
+    """
+    if conocimiento is None:
+        conocimiento = knowledge.leer("difuso")
+    variables = _variables(conocimiento)
+
+    # Universo de discurso (extremos incluidos) y funciones de membresia
+    nodos = {}
+    for nombre, definicion in variables.items():
+        universo = definicion['universo']
+        puntos = np.arange(universo['desde'], universo['hasta'] + universo['paso'], universo['paso'])
+        clase = ctrl.Consequent if nombre == CONSECUENTE else ctrl.Antecedent
+        nodo = nodos[nombre] = clase(puntos, nombre)
+        for termino, (tipo, parametros) in definicion['terminos'].items():
+            nodo[termino] = getattr(fuzz, tipo)(nodo.universe, parametros)
+
+    reglas = []
+    for operador, literales, salida in _reglas(conocimiento, variables):
+        antecedente = nodos[literales[0][0]][literales[0][1]]
+        for variable, termino in literales[1:]:
+            if operador == 'AND':
+                antecedente = antecedente & nodos[variable][termino]
+            else:
+                antecedente = antecedente | nodos[variable][termino]
+        reglas.append(ctrl.Rule(antecedente, nodos[CONSECUENTE][salida]))
+    return ctrl.ControlSystem(reglas)
 
 class FuzzyEngine(InferenceEngine):
-    def __init__(self):
-        # Definicion del universo de discurso para cada variable
-        self.fiebre = ctrl.Antecedent(np.arange(35, 42.1, 0.1), 'fiebre')
-        self.dolor_cabeza = ctrl.Antecedent(np.arange(0, 10.1, 0.1), 'dolor_cabeza')
-        self.intensidad_tos = ctrl.Antecedent(np.arange(0, 10.1, 0.1), 'intensidad_tos')
-        self.riesgo_epi = ctrl.Antecedent(np.arange(0, 10.1, 0.1), 'riesgo_epi')
-        self.posibilidad = ctrl.Consequent(np.arange(0, 101, 1), 'posibilidad_dengue')
-
-        # Funciones de membresia - Fiebre
-        self.fiebre['normal'] = fuzz.trapmf(self.fiebre.universe, [35, 35, 36.5, 37.5])
-        self.fiebre['media'] = fuzz.trimf(self.fiebre.universe, [36.5, 37.5, 38.5])
-        self.fiebre['alta'] = fuzz.trapmf(self.fiebre.universe, [37.5, 38.5, 42, 42])
-        
-        # Funciones de membresia compartidas para sintomas (dolor cabeza, tos)
-        for var in [self.dolor_cabeza, self.intensidad_tos]:
-            var['leve'] = fuzz.trapmf(var.universe, [0, 0, 2, 4])
-            var['moderado'] = fuzz.trimf(var.universe, [3, 5, 7])
-            var['severo'] = fuzz.trapmf(var.universe, [6, 8, 10, 10])
+    def __init__(self, pool_size: int = None, backend: str = None, conocimiento: dict = None):
+        if backend is None:
+            backend = os.environ.get("FUZZY_BACKEND", "numpy")
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend difuso desconocido: {backend}")
+        self.backend = backend
+
+        if conocimiento is None:
+            conocimiento = knowledge.leer("difuso")
+        self.knowledge_version = knowledge.version(conocimiento)
+        self.knowledge_hash = knowledge.huella(conocimiento)
+        self.secciones = secciones(conocimiento)
+        self.pesos_epi = self.secciones[2]
+        self.ctrl = construir_sistema(conocimiento)
+        # Reglas y membresias compiladas a arrays (sin estado: seguro entre hilos)
+        self.evaluador = MamdaniNumpy(self.ctrl)
+        # La grilla de riesgo_epi sale de los pesos cargados: cada puntaje
+        # posible cae en un nodo (el puntaje no es continuo, no se interpola)
+        self.superficie = (SuperficieDifusa(self.evaluador, self.ejes()) if backend == "surface"
+                           else None)
+
+        self.pool = None
+        if backend == "skfuzzy":
+            # Pool de simulaciones, cada una con su propio grafo, para poder
+            # atender pedidos concurrentes
+            if pool_size is None:
+                pool_size = int(os.environ.get("FUZZY_POOL_SIZE", min(os.cpu_count() or 2, 8)))
+            self.pool = ObjectPool(lambda: ctrl.ControlSystemSimulation(construir_sistema(conocimiento)),
+                                   pool_size)
+            self.batch_sim = ctrl.ControlSystemSimulation(construir_sistema(conocimiento))
+            self._batch_lock = threading.Lock()
+
+    def ejes(self) -> dict:
+        """Grilla del formulario; en riesgo_epi, los puntajes que pueden salir
+        de ``pesos_epi`` (ninguno, cada uno, ambos)."""
+        puntajes = sorted({0.0, *map(float, self.pesos_epi.values()), float(sum(self.pesos_epi.values()))})
+        if len(puntajes) < 2:
+            # Con todos los pesos en 0 la interpolación necesita igual dos nodos
+            puntajes.append(puntajes[0] + 1.0)
+        return dict(EJES_DEFECTO, riesgo_epi=np.array(puntajes))
+
+    def validar(self):
+        # Toda entrada posible del formulario tiene que activar alguna regla
+        ejes = self.ejes()
+        malla = np.meshgrid(*[ejes[v] for v in ANTECEDENTES], indexing='ij')
+        salida = self.evaluador.evaluar({v: m.ravel() for v, m in zip(ANTECEDENTES, malla)})
+        if np.isnan(salida).any():
+            raise knowledge.ConocimientoInvalido(f"{int(np.isnan(salida).sum())} combinaciones de entradas "
+                                                 "no activan ninguna regla")
+
+    def congelar(self):
+        # La superficie (si existe) ya es de solo lectura
+        self.evaluador.congelar()
+
+    def _entradas(self, facts: PatientFacts):
+        """Valores crisp (fiebre, dolor_cabeza, intensidad_tos, riesgo_epi) del paciente."""
+        # Calcular puntaje epi
+        epi_score = 0
+        if facts.mascara & VIAJE_BRASIL: epi_score += self.pesos_epi['viaje_brasil']
+        if facts.mascara & CONTACTO_DENGUE: epi_score += self.pesos_epi['contacto_dengue']
         
-        # Funciones de membresia - Riesgo Epidemiologico
-        self.riesgo_epi['bajo'] = fuzz.trapmf(self.riesgo_epi.universe, [0, 0, 2, 4])
-        self.riesgo_epi['medio'] = fuzz.trimf(self.riesgo_epi.universe, [3, 5, 7])
-        self.riesgo_epi['alto'] = fuzz.trapmf(self.riesgo_epi.universe, [6, 8, 10, 10])
-
-        # Funciones de membresia - Posibilidad Dengue
-        self.posibilidad['baja'] = fuzz.trapmf(self.posibilidad.universe, [0, 0, 20, 40])
-        self.posibilidad['media'] = fuzz.trimf(self.posibilidad.universe, [30, 50, 70])
-        self.posibilidad['alta'] = fuzz.trapmf(self.posibilidad.universe, [60, 80, 100, 100])
-
-        # Reglas difusas - combinando sintomas
-        self.ctrl = ctrl.ControlSystem([
-            # ALTA: Combinaciones severas
-            ctrl.Rule(self.fiebre['alta'] & self.dolor_cabeza['severo'] & self.riesgo_epi['alto'], self.posibilidad['alta']),
-            ctrl.Rule(self.fiebre['alta'] & self.dolor_cabeza['severo'], self.posibilidad['alta']),
-            ctrl.Rule(self.dolor_cabeza['severo'] & self.intensidad_tos['severo'] & self.riesgo_epi['alto'], self.posibilidad['alta']),
-            ctrl.Rule(self.fiebre['alta'] & self.riesgo_epi['alto'], self.posibilidad['alta']),
-            
-            # MEDIA: Combinaciones moderadas
-            ctrl.Rule(self.fiebre['alta'] & self.dolor_cabeza['moderado'], self.posibilidad['media']),
-            ctrl.Rule(self.fiebre['media'] & self.dolor_cabeza['moderado'], self.posibilidad['media']),
-            ctrl.Rule(self.intensidad_tos['moderado'] & self.dolor_cabeza['moderado'], self.posibilidad['media']),
-            ctrl.Rule(self.fiebre['media'] & self.riesgo_epi['medio'], self.posibilidad['media']),
-            
-            # BAJA: Sintomas leves
-            ctrl.Rule(self.fiebre['normal'] & self.dolor_cabeza['leve'] & self.intensidad_tos['leve'], self.posibilidad['baja']),
-            ctrl.Rule(self.dolor_cabeza['leve'] & self.riesgo_epi['bajo'], self.posibilidad['baja']),
-            ctrl.Rule(self.fiebre['normal'] & self.intensidad_tos['leve'], self.posibilidad['baja']),
-            
-            # Regla por defecto
-            ctrl.Rule(self.fiebre['normal'] | self.fiebre['media'] | self.fiebre['alta'], self.posibilidad['media'])
-        ])
-        self.sim = ctrl.ControlSystemSimulation(self.ctrl)
-
-    def infer(self, facts: dict[str, any]) -> Diagnosis:
+        return facts.fiebre, facts.intensidad_dolor_cabeza, facts.intensidad_tos, epi_score
+
+    def _diagnostico(self, facts: PatientFacts, entradas, result, trace: bool, version: str) -> Diagnosis:
+        if result > 65:
+            label = "ALTA Probabilidad Dengue"
+        elif result > 35:
+            label = "MEDIA Probabilidad Dengue"
+        else:
+            label = "BAJA Probabilidad Dengue"
+
+        if not trace:
+            return Diagnosis(label, result / 100, SIN_TRAZA, version)
+        fiebre, dolor_cabeza, intensidad_tos, epi_score = entradas
+        return Diagnosis(label, result / 100, TrazaDifusa(
+            fiebre, dolor_cabeza, intensidad_tos, epi_score,
+            facts.viaje_brasil, facts.contacto_dengue, result, self.secciones), version)
+
+    def _evaluador(self):
+        return self.superficie if self.superficie is not None else self.evaluador
+
+    def _evaluar_numpy(self, columnas: np.ndarray) -> np.ndarray:
+        return self._evaluador().evaluar({
+            'fiebre': columnas[:, 0],
+            'dolor_cabeza': columnas[:, 1],
+            'intensidad_tos': columnas[:, 2],
+            'riesgo_epi': columnas[:, 3],
+        })
+
+    def infer(self, facts: Hechos, trace: bool = True) -> Diagnosis:
+        # Hechos inválidos: HechosInvalidos, como en los otros motores
+        facts = como_hechos(facts)
+        version = self.version()
+        entradas = self._entradas(facts)
+        fiebre, dolor_cabeza, intensidad_tos, epi_score = entradas
         try:
-            trace = []
-            
-            # Descripcion del sistema difuso
-            trace.append("SISTEMA DIFUSO: Variables Linguisticas")
-            trace.append("ANTECEDENTES:")
-            trace.append("  - Fiebre: [35-42]C -> {normal, media, alta}")
-            trace.append("  - Dolor_Cabeza: [0-10] -> {leve, moderado, severo}")
-            trace.append("  - Intensidad_Tos: [0-10] -> {leve, moderado, severo}")
-            trace.append("  - Riesgo_Epi: [0-10] -> {bajo, medio, alto}")
-            trace.append("CONSECUENTE:")
-            trace.append("  - Posibilidad_Dengue: [0-100]% -> {baja, media, alta}")
-            trace.append("---")
-            
-            # Obtener valores de los sliders
-            dolor_cabeza = float(facts.get('intensidad_dolor_cabeza', 5))
-            intensidad_tos = float(facts.get('intensidad_tos', 5))
-            
-            # Calcular puntaje epi
-            epi_score = 0
-            if facts['viaje_brasil']: epi_score += 5
-            if facts['contacto_dengue']: epi_score += 5
-            
-            trace.append("VALORES DE ENTRADA (Crisp):")
-            trace.append(f"  - Fiebre = {facts['fiebre']}C")
-            trace.append(f"  - Dolor_Cabeza = {dolor_cabeza}/10")
-            trace.append(f"  - Intensidad_Tos = {intensidad_tos}/10")
-            trace.append(f"  - Riesgo_Epi = {epi_score} (Viaje:{'+5' if facts['viaje_brasil'] else '0'}, Contacto:{'+5' if facts['contacto_dengue'] else '0'})")
-            trace.append("---")
-
-            # Asignar inputs al simulador
-            self.sim.input['fiebre'] = float(facts['fiebre'])
-            self.sim.input['dolor_cabeza'] = dolor_cabeza
-            self.sim.input['intensidad_tos'] = intensidad_tos
-            self.sim.input['riesgo_epi'] = epi_score
-            self.sim.compute()
-            
-            result = self.sim.output['posibilidad_dengue']
-            
-            trace.append("REGLAS DIFUSAS:")
-            trace.append("  [ALTA] Fiebre=alta AND DolorCab=severo AND Riesgo=alto")
-            trace.append("  [ALTA] Fiebre=alta AND DolorCab=severo")
-            trace.append("  [ALTA] DolorCab=severo AND Tos=severo AND Riesgo=alto")
-            trace.append("  [ALTA] Fiebre=alta AND Riesgo=alto")
-            trace.append("  [MEDIA] Fiebre=alta AND DolorCab=moderado")
-            trace.append("  [MEDIA] Fiebre=media AND DolorCab=moderado")
-            trace.append("  [MEDIA] Tos=moderado AND DolorCab=moderado")
-            trace.append("  [BAJA] Fiebre=normal AND DolorCab=leve AND Tos=leve")
-            trace.append("  [BAJA] DolorCab=leve AND Riesgo=bajo")
-            trace.append("---")
-            trace.append("DEFUZZIFICACION:")
-            trace.append(f"  Metodo: Centroide")
-            trace.append(f"  Salida: {result:.2f}%")
-            
-            if result > 65:
-                label = "ALTA Probabilidad Dengue"
-            elif result > 35:
-                label = "MEDIA Probabilidad Dengue"
-            else:
-                label = "BAJA Probabilidad Dengue"
-            
-            return Diagnosis(label, result / 100, trace)
+
+            if self.backend != "skfuzzy":
+                result = self._evaluador().evaluar_uno({
+                    'fiebre': fiebre,
+                    'dolor_cabeza': dolor_cabeza,
+                    'intensidad_tos': intensidad_tos,
+                    'riesgo_epi': epi_score,
+                })
+                if np.isnan(result):
+                    return Diagnosis("Error Difuso", 0.0, [SIN_SALIDA], version)
+                return self._diagnostico(facts, entradas, result, trace, version)
+
+            # Asignar inputs a una simulacion libre del pool
+            with self.pool.acquire() as sim:
+                sim.input['fiebre'] = fiebre
+                sim.input['dolor_cabeza'] = dolor_cabeza
+                sim.input['intensidad_tos'] = intensidad_tos
+                sim.input['riesgo_epi'] = epi_score
+                sim.compute()
+                
+                result = sim.output['posibilidad_dengue']
+            return self._diagnostico(facts, entradas, result, trace, version)
+        except Exception as e:
+            return Diagnosis("Error Difuso", 0.0, [f"Error: {str(e)}"], version)
+
+    def infer_batch(self, facts_list: list[Hechos], trace: bool = True) -> list[Diagnosis]:
+        if not facts_list:
+            return []
+        facts_list = [como_hechos(facts) for facts in facts_list]
+        version = self.version()
+        entradas = [self._entradas(facts) for facts in facts_list]
+        columnas = np.array(entradas, dtype=np.float64)
+        try:
+
+            if self.backend != "skfuzzy":
+                results = self._evaluar_numpy(columnas)
+                return [Diagnosis("Error Difuso", 0.0, [SIN_SALIDA], version) if np.isnan(r)
+                        else self._diagnostico(facts, e, float(r), trace, version)
+                        for facts, e, r in zip(facts_list, entradas, results)]
+
+            # skfuzzy acepta arrays como entrada: la fuzzificacion y las reglas
+            # se evaluan para todo el lote de una vez. Usamos un simulador
+            # propio (y su propio grafo) para no mezclar el modo array con el de infer().
+            with self._batch_lock:
+                self.batch_sim.input['fiebre'] = columnas[:, 0]
+                self.batch_sim.input['dolor_cabeza'] = columnas[:, 1]
+                self.batch_sim.input['intensidad_tos'] = columnas[:, 2]
+                self.batch_sim.input['riesgo_epi'] = columnas[:, 3]
+                self.batch_sim.compute()
+
+                results = self.batch_sim.output['posibilidad_dengue']
+            return [self._diagnostico(facts, e, float(r), trace, version)
+                    for facts, e, r in zip(facts_list, entradas, results)]
         except Exception as e:
-            return Diagnosis("Error Difuso", 0.0, [f"Error: {str(e)}"])
\ No newline at end of file
+            return [Diagnosis("Error Difuso", 0.0, [f"Error: {str(e)}"], version) for _ in facts_list]
@@ -0,0 +1,184 @@
+"""Evaluador Mamdani vectorizado (NumPy) equivalente a ControlSystemSimulation.
+
+Se compila una vez a partir de un ``ctrl.ControlSystem`` de skfuzzy y después
+evalúa N pacientes a la vez con operaciones sobre matrices:
+
+1. Fuzzificación: ``np.interp`` de cada entrada sobre cada término.
+2. Reglas: AND = fmin, OR = fmax, NOT = 1 - x (los defaults de skfuzzy).
+3. Acumulación: máximo de las activaciones por término del consecuente.
+4. Recorte + agregación: max_t min(corte_t, mf_t(x)).
+5. Defuzzificación por centroide, con la misma fórmula de trapecios que
+   ``skfuzzy.defuzzify.centroid`` y el mismo remuestreo del universo en los
+   puntos donde cada función de membresía cruza su corte.
+
+Como se replica el remuestreo, la diferencia con skfuzzy es solo de redondeo
+de punto flotante: ver TOLERANCIA.
+"""
+import hashlib
+
+import numpy as np
+from skfuzzy.control.term import Term, TermAggregate
+
+# Diferencia máxima admitida contra skfuzzy, en unidades del consecuente
+# (puntos porcentuales de posibilidad_dengue).
+TOLERANCIA = 1e-6
+
+# Filas por bloque al evaluar lotes grandes (acota la memoria intermedia)
+BLOQUE = 2048
+
+
+class MamdaniNumpy:
+    def __init__(self, control_system):
+        antecedentes = list(control_system.antecedents)
+        consecuentes = list(control_system.consequents)
+        if len(consecuentes) != 1:
+            raise ValueError("El evaluador NumPy soporta un único consecuente")
+
+        # --- Antecedentes: universo + matriz de membresías por variable ---
+        self.variables = [a.label for a in antecedentes]
+        self._universos = []
+        self._mfs = []
+        columnas = {}
+        for antecedente in antecedentes:
+            self._universos.append(np.asarray(antecedente.universe, dtype=np.float64))
+            mfs = []
+            for label, term in antecedente.terms.items():
+                columnas[id(term)] = len(columnas)
+                mfs.append(np.asarray(term.mf, dtype=np.float64))
+            self._mfs.append(np.vstack(mfs))
+
+        # --- Consecuente ---
+        salida = consecuentes[0]
+        self.salida = salida.label
+        self._u_out = np.asarray(salida.universe, dtype=np.float64)
+        terminos_out = list(salida.terms.values())
+        indice_out = {id(t): i for i, t in enumerate(terminos_out)}
+
+        # --- Reglas ---
+        self._reglas = []
+        usados = set()
+        for rule in control_system.rules:
+            if rule.and_func is not np.fmin or rule.or_func is not np.fmax:
+                raise ValueError("El evaluador NumPy solo soporta AND=fmin y OR=fmax")
+            expr = self._compilar(rule.antecedent, columnas)
+            destinos = []
+            for wt in rule.consequent:
+                destinos.append((indice_out[id(wt.term)], float(wt.weight)))
+                usados.add(indice_out[id(wt.term)])
+            self._reglas.append((expr, destinos))
+
+        # Solo participan del resultado los términos que alguna regla activa
+        self._terminos_out = sorted(usados)
+        self._mf_out = np.vstack([np.asarray(terminos_out[i].mf, dtype=np.float64)
+                                  for i in self._terminos_out])
+
+    def congelar(self):
+        """Marca universos y membresías como de solo lectura."""
+        for array in (*self._universos, *self._mfs, self._u_out, self._mf_out):
+            array.flags.writeable = False
+
+    def huella(self) -> str:
+        """Hash de la base de reglas y los parámetros de membresía compilados."""
+        h = hashlib.sha256()
+        for var, u, mfs in zip(self.variables, self._universos, self._mfs):
+            h.update(var.encode())
+            h.update(u.tobytes())
+            h.update(mfs.tobytes())
+        h.update(self.salida.encode())
+        h.update(self._u_out.tobytes())
+        h.update(self._mf_out.tobytes())
+        h.update(repr(self._reglas).encode())
+        return h.hexdigest()
+
+    def _compilar(self, nodo, columnas):
+        """Árbol del antecedente -> tuplas ('and'|'or'|'not', ...) o índice de columna."""
+        if isinstance(nodo, Term):
+            return columnas[id(nodo)]
+        if isinstance(nodo, TermAggregate):
+            if nodo.kind == 'not':
+                return ('not', self._compilar(nodo.term1, columnas))
+            return (nodo.kind, self._compilar(nodo.term1, columnas),
+                    self._compilar(nodo.term2, columnas))
+        raise ValueError(f"Antecedente no soportado: {nodo!r}")
+
+    def _evaluar_expr(self, expr, grados):
+        if isinstance(expr, int):
+            return grados[:, expr]
+        if expr[0] == 'not':
+            return 1.0 - self._evaluar_expr(expr[1], grados)
+        a = self._evaluar_expr(expr[1], grados)
+        b = self._evaluar_expr(expr[2], grados)
+        return np.fmin(a, b) if expr[0] == 'and' else np.fmax(a, b)
+
+    def _fuzzificar(self, entradas):
+        bloques = []
+        for x, u, mfs in zip(entradas, self._universos, self._mfs):
+            x = np.clip(x, u.min(), u.max())
+            bloques.append(np.stack([np.interp(x, u, mf) for mf in mfs], axis=1))
+        return np.hstack(bloques)
+
+    def _cortes(self, grados):
+        cortes = {}
+        for expr, destinos in self._reglas:
+            fuerza = self._evaluar_expr(expr, grados)
+            for t, peso in destinos:
+                activacion = fuerza * peso
+                cortes[t] = activacion if t not in cortes else np.fmax(cortes[t], activacion)
+        return np.stack([cortes[t] for t in self._terminos_out], axis=1)
+
+    def _remuestrear(self, cortes):
+        """Universo de salida + puntos donde cada mf cruza su corte (como skfuzzy)."""
+        n = cortes.shape[0]
+        u = self._u_out
+        puntos = [np.broadcast_to(u, (n, u.size))]
+        for t, mf in enumerate(self._mf_out):
+            c = cortes[:, t:t + 1]
+            # _interp_universe_fast: con corte 0 usa '>', si no '>='
+            sobre = np.where(c == 0.0, mf > 0.0, mf >= c)
+            cruza = sobre[:, 1:] != sobre[:, :-1]
+            dmf = mf[1:] - mf[:-1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                xx = u[:-1] + (c - mf[:-1]) * (u[1:] - u[:-1]) / dmf
+            puntos.append(np.where(cruza, xx, np.nan))
+        x = np.sort(np.hstack(puntos), axis=1)
+        # Los NaN quedan al final: se llevan al extremo para que aporten área 0
+        return np.where(np.isnan(x), u[-1], x)
+
+    def _centroide(self, cortes):
+        x = self._remuestrear(cortes)
+        y = np.zeros_like(x)
+        for t, mf in enumerate(self._mf_out):
+            mf_x = np.interp(x.ravel(), self._u_out, mf).reshape(x.shape)
+            np.maximum(y, np.minimum(cortes[:, t:t + 1], mf_x), out=y)
+
+        x1, x2 = x[:, :-1], x[:, 1:]
+        y1, y2 = y[:, :-1], y[:, 1:]
+        dx = x2 - x1
+        area = 0.5 * dx * (y1 + y2)
+        # momento * area de cada trapecio, sin dividir por (y1 + y2)
+        momento_area = dx * dx / 3.0 * (y2 + 0.5 * y1) + x1 * area
+        total = area.sum(axis=1)
+        resultado = momento_area.sum(axis=1) / np.fmax(total, np.finfo(float).eps)
+        # Igual que skfuzzy: sin membresía de salida no hay resultado
+        return np.where(y.sum(axis=1) == 0, np.nan, resultado)
+
+    def evaluar(self, entradas: dict) -> np.ndarray:
+        """Salida defuzzificada para N pacientes.
+
+        ``entradas`` mapea cada variable antecedente a un escalar o array de
+        largo N. Filas sin membresía de salida devuelven NaN.
+        """
+        columnas = [np.atleast_1d(np.asarray(entradas[v], dtype=np.float64))
+                    for v in self.variables]
+        n = max(c.size for c in columnas)
+        columnas = [np.broadcast_to(c, (n,)) for c in columnas]
+
+        resultado = np.empty(n, dtype=np.float64)
+        for inicio in range(0, n, BLOQUE):
+            fin = min(inicio + BLOQUE, n)
+            grados = self._fuzzificar([c[inicio:fin] for c in columnas])
+            resultado[inicio:fin] = self._centroide(self._cortes(grados))
+        return resultado
+
+    def evaluar_uno(self, entradas: dict) -> float:
+        return float(self.evaluar(entradas)[0])
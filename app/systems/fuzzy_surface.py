@@ -0,0 +1,165 @@
+"""Superficie de respuesta precalculada para el sistema difuso.
+
+Las entradas del motor difuso están acotadas (fiebre en pasos de 0.1 °C,
+sliders enteros 0-10, riesgo epidemiológico 0/5/10), así que la salida
+defuzzificada se puede tabular una vez sobre esa grilla 4-D y responder
+cada consulta con interpolación multilineal. En los nodos de la grilla el
+resultado es exactamente el del evaluador directo; entre nodos es una
+aproximación (ver ``error_maximo``). Si algún nodo vecino es NaN (ninguna
+regla activa la salida en ese nodo) la interpolación no sirve y ese punto
+se evalúa con el evaluador directo.
+
+La tabla se guarda en disco con una clave que combina la huella de las
+reglas/membresías y los ejes, de modo que cualquier cambio en la base de
+conocimiento genera una tabla nueva en lugar de reutilizar una vieja.
+"""
+import bisect
+import hashlib
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from .fuzzy_numpy import MamdaniNumpy
+
+# Grilla por defecto, alineada con los valores que produce el formulario.
+# riesgo_epi corresponde a los pesos de difuso.json; FuzzyEngine.ejes() lo
+# reemplaza por los puntajes del conocimiento cargado
+EJES_DEFECTO = {
+    'fiebre': np.round(np.arange(35.0, 42.05, 0.1), 1),
+    'dolor_cabeza': np.arange(0.0, 11.0),
+    'intensidad_tos': np.arange(0.0, 11.0),
+    'riesgo_epi': np.array([0.0, 5.0, 10.0]),
+}
+
+CACHE_DIR = os.environ.get("FUZZY_SURFACE_CACHE", ".cache/fuzzy_surface")
+
+
+class SuperficieDifusa:
+    def __init__(self, evaluador: MamdaniNumpy, ejes: dict = None, cache_dir: str = CACHE_DIR):
+        ejes = EJES_DEFECTO if ejes is None else ejes
+        self.evaluador = evaluador
+        self.ejes = [np.asarray(ejes[v], dtype=np.float64) for v in evaluador.variables]
+        self.clave = self._clave()
+        self.desde_cache = False
+
+        ruta = os.path.join(cache_dir, f"{self.clave}.npy") if cache_dir else None
+        valores = self._cargar(ruta) if ruta else None
+        if valores is None:
+            valores = self._calcular()
+            if ruta:
+                self._guardar(ruta, valores)
+        else:
+            self.desde_cache = True
+        valores.flags.writeable = False
+        self.valores = valores
+        # Copias en listas de Python para el camino escalar (evaluar_uno)
+        self._ejes_lista = [e.tolist() for e in self.ejes]
+
+    def _clave(self) -> str:
+        h = hashlib.sha256(self.evaluador.huella().encode())
+        for eje in self.ejes:
+            h.update(eje.tobytes())
+        return h.hexdigest()[:32]
+
+    def _calcular(self) -> np.ndarray:
+        malla = np.meshgrid(*self.ejes, indexing='ij')
+        entradas = {v: m.ravel() for v, m in zip(self.evaluador.variables, malla)}
+        return self.evaluador.evaluar(entradas).reshape(malla[0].shape)
+
+    def _cargar(self, ruta):
+        try:
+            valores = np.load(ruta)
+        except (OSError, ValueError):
+            return None
+        if valores.shape != tuple(e.size for e in self.ejes):
+            return None
+        return valores
+
+    @staticmethod
+    def _guardar(ruta, valores):
+        # Escritura atómica: varios workers pueden arrancar a la vez
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, valores)
+            os.replace(tmp, ruta)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @property
+    def puntos(self) -> int:
+        return self.valores.size
+
+    @property
+    def bytes(self) -> int:
+        return self.valores.nbytes + sum(e.nbytes for e in self.ejes)
+
+    def evaluar(self, entradas: dict) -> np.ndarray:
+        """Interpolación multilineal; fuera de la grilla o junto a un nodo NaN
+        se usa el evaluador directo."""
+        columnas = [np.atleast_1d(np.asarray(entradas[v], dtype=np.float64))
+                    for v in self.evaluador.variables]
+        n = max(c.size for c in columnas)
+        columnas = [np.broadcast_to(c, (n,)) for c in columnas]
+
+        dentro = np.ones(n, dtype=bool)
+        indices, pesos = [], []
+        for x, eje in zip(columnas, self.ejes):
+            dentro &= (x >= eje[0]) & (x <= eje[-1])
+            i = np.clip(np.searchsorted(eje, x, side='right') - 1, 0, eje.size - 2)
+            t = np.clip((x - eje[i]) / (eje[i + 1] - eje[i]), 0.0, 1.0)
+            indices.append(i)
+            pesos.append(t)
+
+        resultado = np.zeros(n, dtype=np.float64)
+        for esquina in range(2 ** len(self.ejes)):
+            w = np.ones(n, dtype=np.float64)
+            idx = []
+            for d, (i, t) in enumerate(zip(indices, pesos)):
+                arriba = (esquina >> d) & 1
+                w = w * (t if arriba else 1.0 - t)
+                idx.append(i + arriba)
+            # Peso 0 no debe propagar un NaN del vecino
+            resultado += np.where(w > 0, w * self.valores[tuple(idx)], 0.0)
+
+        directo = ~dentro | ~np.isfinite(resultado)
+        if directo.any():
+            resultado[directo] = self.evaluador.evaluar(
+                {v: c[directo] for v, c in zip(self.evaluador.variables, columnas)})
+        return resultado
+
+    def evaluar_uno(self, entradas: dict) -> float:
+        """Igual que evaluar() para un solo paciente, sin armar arrays."""
+        x = [float(entradas[v]) for v in self.evaluador.variables]
+        indices, pesos = [], []
+        for xi, eje in zip(x, self._ejes_lista):
+            if not eje[0] <= xi <= eje[-1]:
+                return self.evaluador.evaluar_uno(entradas)
+            i = min(max(bisect.bisect_right(eje, xi) - 1, 0), len(eje) - 2)
+            indices.append(i)
+            pesos.append((xi - eje[i]) / (eje[i + 1] - eje[i]))
+
+        resultado = 0.0
+        for esquina in range(2 ** len(x)):
+            w = 1.0
+            idx = []
+            for d, (i, t) in enumerate(zip(indices, pesos)):
+                arriba = (esquina >> d) & 1
+                w *= t if arriba else 1.0 - t
+                idx.append(i + arriba)
+            if w > 0:
+                resultado += w * self.valores[tuple(idx)]
+        if not math.isfinite(resultado):
+            return self.evaluador.evaluar_uno(entradas)
+        return float(resultado)
+
+    def error_maximo(self, n: int = 2000, seed: int = 0) -> float:
+        """Error máximo contra el evaluador directo en puntos aleatorios dentro de la grilla."""
+        rng = np.random.default_rng(seed)
+        entradas = {v: rng.uniform(eje[0], eje[-1], n)
+                    for v, eje in zip(self.evaluador.variables, self.ejes)}
+        return float(np.nanmax(np.abs(self.evaluar(entradas) - self.evaluador.evaluar(entradas))))
@@ -0,0 +1,105 @@
+"""Bases de conocimiento declarativas de los motores.
+
+Cada motor lee su conocimiento (umbrales, CPDs, funciones de membresía,
+reglas difusas) de un archivo versionado ``<KNOWLEDGE_DIR>/<nombre>.json``;
+también se aceptan ``.yaml``/``.yml`` si PyYAML está instalado. El campo
+``version`` es obligatorio y queda registrado en cada diagnóstico
+(``Diagnosis.model_version``).
+
+Los archivos que vienen con el proyecto (``conocimiento/``) reproducen el
+modelo del experto. Los chequeos de estructura los hace cada motor al
+construirse; acá solo se lee, se exige la versión y se calcula la huella
+del contenido (para saber si un archivo editado cambió de verdad).
+
+Configuración por variables de entorno:
+    KNOWLEDGE_DIR   directorio de los archivos (app/systems/conocimiento)
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+DIRECTORIO = os.environ.get("KNOWLEDGE_DIR", os.path.join(os.path.dirname(__file__), "conocimiento"))
+
+# En orden de preferencia si hay más de un archivo para el mismo motor
+EXTENSIONES = (".json", ".yaml", ".yml")
+
+
+class ConocimientoInvalido(ValueError):
+    """El archivo no se puede leer o no tiene la forma que espera el motor."""
+
+
+def ruta(nombre: str, directorio: str = None) -> str:
+    """Archivo de conocimiento del motor (el .json si no existe ninguno)."""
+    base = os.path.join(directorio or DIRECTORIO, nombre)
+    for extension in EXTENSIONES:
+        if os.path.exists(base + extension):
+            return base + extension
+    return base + EXTENSIONES[0]
+
+
+def estado(nombre: str, directorio: str = None) -> Optional[Tuple[str, int, int]]:
+    """(ruta, mtime_ns, tamaño) del archivo, para detectar cambios sin leerlo."""
+    archivo = ruta(nombre, directorio)
+    try:
+        st = os.stat(archivo)
+    except OSError:
+        return None
+    return archivo, st.st_mtime_ns, st.st_size
+
+
+def leer(nombre: str, directorio: str = None) -> Dict[str, Any]:
+    archivo = ruta(nombre, directorio)
+    try:
+        with open(archivo, encoding="utf-8") as f:
+            if archivo.endswith(".json"):
+                datos = json.load(f)
+            else:
+                datos = _leer_yaml(f, archivo)
+    except OSError as e:
+        raise ConocimientoInvalido(f"{archivo}: {e}")
+    except json.JSONDecodeError as e:
+        raise ConocimientoInvalido(f"{archivo}: {e}")
+    if not isinstance(datos, dict) or "version" not in datos:
+        raise ConocimientoInvalido(f"{archivo}: falta el campo 'version'")
+    return datos
+
+
+def _leer_yaml(f, archivo: str):
+    try:
+        import yaml
+    except ImportError:
+        raise ConocimientoInvalido(f"{archivo}: hace falta PyYAML para leer YAML")
+    try:
+        return yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        raise ConocimientoInvalido(f"{archivo}: {e}")
+
+
+def version(datos: Dict[str, Any]) -> str:
+    return str(datos["version"])
+
+
+def huella(datos: Dict[str, Any]) -> str:
+    """Hash del contenido, independiente del formato y del orden de las claves."""
+    texto = json.dumps(datos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()[:16]
+
+
+def campo(datos: Dict[str, Any], *claves: str):
+    """``datos[c1][c2]...``; ConocimientoInvalido si falta alguna clave."""
+    valor = datos
+    for i, clave in enumerate(claves):
+        if not isinstance(valor, dict) or clave not in valor:
+            raise ConocimientoInvalido(f"Falta '{'.'.join(claves[:i + 1])}'")
+        valor = valor[clave]
+    return valor
+
+
+def numero(datos: Dict[str, Any], *claves: str, minimo: float = None, maximo: float = None) -> float:
+    valor = campo(datos, *claves)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        raise ConocimientoInvalido(f"'{'.'.join(claves)}' debe ser un número")
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ConocimientoInvalido(f"'{'.'.join(claves)}' fuera de rango: {valor}")
+    return valor
@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class ObjectPool:
+    """Pool de objetos reutilizables (uno por hilo a la vez) con métricas de contención."""
+
+    def __init__(self, factory: Callable[[], Any], size: int):
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser >= 1")
+        self.size = size
+        self._free = queue.LifoQueue()
+        for _ in range(size):
+            self._free.put(factory())
+
+        self._lock = threading.Lock()
+        self.acquisitions = 0   # préstamos totales
+        self.contended = 0      # préstamos que tuvieron que esperar
+        self.timeouts = 0
+        self.wait_time = 0.0    # segundos esperando un objeto libre
+        self.max_wait = 0.0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Presta un objeto del pool; lanza TimeoutError si no se libera ninguno a tiempo."""
+        waited = 0.0
+        try:
+            obj = self._free.get_nowait()
+        except queue.Empty:
+            t0 = time.perf_counter()
+            try:
+                obj = self._free.get(timeout=timeout)
+            except queue.Empty:
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError("No hay objetos libres en el pool")
+            waited = time.perf_counter() - t0
+
+        with self._lock:
+            self.acquisitions += 1
+            if waited:
+                self.contended += 1
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            yield obj
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._free.put(obj)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "timeouts": self.timeouts,
+                "wait_time_s": self.wait_time,
+                "max_wait_s": self.max_wait,
+            }
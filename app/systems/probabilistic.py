@@ -1,159 +1,305 @@
 from pgmpy.models import DiscreteBayesianNetwork
 from pgmpy.factors.discrete import TabularCPD
 from pgmpy.inference import VariableElimination
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Optional
+import threading
+import numpy as np
 # Asegurate de importar tus clases base correctamente según tu estructura de carpetas
-from .base import InferenceEngine, Diagnosis 
+from .base import InferenceEngine, Diagnosis, SIN_TRAZA, Traza
+from . import facts as hechos
+from .facts import Hechos, PatientFacts, como_hechos
+from . import knowledge
 
-class BayesianEngine(InferenceEngine):
-    def __init__(self):
-        # 1. Definir la Estructura (Causa -> Efecto)
-        # Agregamos 'Nexo' como causa principal.
-        # Agregamos 'Tos' y 'DolorGarganta' que tenías en la pantalla pero no en la red.
-        self.model = DiscreteBayesianNetwork([
-            ('Nexo', 'Dengue'),          # Nexo Epidemiológico causa probabilidad de Dengue
-            ('Dengue', 'Fiebre'),
-            ('Dengue', 'DolorCabeza'),
-            ('Dengue', 'DolorCuerpo'),
-            ('Dengue', 'Tos'),           # Nuevo
-            ('Dengue', 'DolorGarganta')  # Nuevo
-        ])
-
-        # 2. Definir Tablas de Probabilidad (CPDs)
-
-        # A. Nodo NEXO (Abstrae Viaje, Contacto y Zona)
-        # Valores: [0=No hay nexo, 1=Hay nexo]
-        # (La prob a priori no importa mucho porque siempre la vamos a setear como evidencia)
-        cpd_nexo = TabularCPD(variable='Nexo', variable_card=2, values=[[0.7], [0.3]])
-
-        # B. Nodo DENGUE (Depende del Nexo)
-        # Si NO hay nexo: Probabilidad base muy baja (0.05).
-        # Si SI hay nexo: Probabilidad alta (0.60) -> Sube mucho la sospecha inicial.
-        cpd_dengue = TabularCPD(variable='Dengue', variable_card=2, 
-                                values=[[0.95, 0.40],   # P(No Dengue)
-                                        [0.05, 0.60]],  # P(Si Dengue)
-                                evidence=['Nexo'], evidence_card=[2])
-
-        # C. SÍNTOMAS (Dependen de Dengue)
-        
-        # Fiebre: Muy común en Dengue
-        cpd_fiebre = TabularCPD(variable='Fiebre', variable_card=2, 
-                                values=[[0.9, 0.1],  # P(No|No), P(No|Si)
-                                        [0.1, 0.9]], # P(Si|No), P(Si|Si)
-                                evidence=['Dengue'], evidence_card=[2])
-
-        # Dolor Cabeza: Muy común (Retroocular)
-        cpd_cabeza = TabularCPD(variable='DolorCabeza', variable_card=2, 
-                                values=[[0.8, 0.15], 
-                                        [0.2, 0.85]],
-                                evidence=['Dengue'], evidence_card=[2])
-
-        # Dolor Cuerpo: Común ("Quebrantahuesos")
-        cpd_cuerpo = TabularCPD(variable='DolorCuerpo', variable_card=2, 
-                                values=[[0.8, 0.2], 
-                                        [0.2, 0.8]],
-                                evidence=['Dengue'], evidence_card=[2])
-
-        # Tos: POCO común en Dengue (es más de Covid/Gripe). 
-        # Si tiene Dengue, la prob de tos es baja (0.2).
-        cpd_tos = TabularCPD(variable='Tos', variable_card=2, 
-                             values=[[0.6, 0.8], 
-                                     [0.4, 0.2]], # P(Si|No)=0.4 (Gripe comun), P(Si|Si)=0.2
-                             evidence=['Dengue'], evidence_card=[2])
-
-        # Dolor Garganta: POCO común en Dengue.
-        cpd_garganta = TabularCPD(variable='DolorGarganta', variable_card=2, 
-                                  values=[[0.6, 0.7], 
-                                          [0.4, 0.3]], 
-                                  evidence=['Dengue'], evidence_card=[2])
-
-        # Agregar CPDs y verificar
-        self.model.add_cpds(cpd_nexo, cpd_dengue, cpd_fiebre, cpd_cabeza, cpd_cuerpo, cpd_tos, cpd_garganta)
-        self.model.check_model()
-        self.inference = VariableElimination(self.model)
-
-    def infer(self, facts: Dict[str, Any]) -> Diagnosis:
-        evidence = {}
-        trace = []
-        
-        trace.append("RED BAYESIANA: Estructura Actualizada")
-        trace.append("NODOS: Nexo -> Dengue -> {Síntomas}")
-        trace.append("---")
-        
-        # --- 1. LÓGICA DE UNIFICACIÓN DE RIESGO (CRÍTICO) ---
-        # Aquí combinamos las variables del TP (Corrientes, Contacto, Viaje) en un solo nodo 'Nexo'
-        
-        es_verano = facts.get('estacion_verano', False) # Asumiendo que viene del checkbox
-        en_corrientes = facts.get('reside_corrientes', False)
-        contacto = facts.get('contacto_dengue', False)
-        viaje = facts.get('viaje_brasil', False)
-        
-        tiene_riesgo = False
-        razon_riesgo = []
-
-        if viaje:
-            tiene_riesgo = True
-            razon_riesgo.append("Viaje a Brasil")
-        if contacto:
-            tiene_riesgo = True
-            razon_riesgo.append("Contacto estrecho")
-        if en_corrientes and es_verano:
-            tiene_riesgo = True
-            razon_riesgo.append("Zona Endémica (Corrientes+Verano)")
-
-        if tiene_riesgo:
-            evidence['Nexo'] = 1
-            trace.append(f"  - Nexo Epidemiológico = 1 (DETECTADO)")
-            trace.append(f"    Motivos: {', '.join(razon_riesgo)}")
+# Nodos observados, en el orden en que se arma la matriz de evidencia
+EVIDENCIA = ('Nexo', 'Fiebre', 'DolorCabeza', 'Tos', 'DolorGarganta')
+
+# Checkboxes simples: campo de PatientFacts -> nodo de la red
+SENSORES = {
+    'dolor_cabeza': 'DolorCabeza', 
+    'tos': 'Tos', 
+    'dolor_garganta': 'DolorGarganta'
+}
+
+# Nodo -> padre. Nexo abstrae Viaje, Contacto y Zona; los síntomas dependen de Dengue.
+ESTRUCTURA = {
+    'Nexo': None,
+    'Dengue': 'Nexo',
+    'Fiebre': 'Dengue',
+    'DolorCabeza': 'Dengue',
+    'DolorCuerpo': 'Dengue',
+    'Tos': 'Dengue',
+    'DolorGarganta': 'Dengue',
+}
+
+ENCABEZADO = (
+    "RED BAYESIANA: Estructura Actualizada",
+    "NODOS: Nexo -> Dengue -> {Síntomas}",
+    "---",
+)
+
+class TrazaBayesiana(Traza):
+    """Evidencia, motivos del nexo y posterior del caso."""
+    __slots__ = ("evidence", "motivos", "prob_dengue", "umbral_fiebre")
+
+    def __init__(self, evidence, motivos, prob_dengue, umbral_fiebre):
+        self.evidence = evidence
+        self.motivos = motivos
+        self.prob_dengue = prob_dengue
+        self.umbral_fiebre = umbral_fiebre
+
+    def lineas(self):
+        trace = list(ENCABEZADO)
+        if self.evidence['Nexo']:
+            trace.append("  - Nexo Epidemiológico = 1 (DETECTADO)")
+            trace.append(f"    Motivos: {', '.join(self.motivos)}")
         else:
-            evidence['Nexo'] = 0
             trace.append("  - Nexo Epidemiológico = 0 (No detectado)")
+        if self.evidence['Fiebre']:
+            trace.append(f"  - Fiebre = 1 (>{self.umbral_fiebre:g}°C)")
+        for key_nodo in SENSORES.values():
+            if self.evidence[key_nodo]:
+                trace.append(f"  - {key_nodo} = 1 (Presente)")
+        trace.append("---")
+        trace.append("CÁLCULO DE PROBABILIDAD POSTERIOR:")
+        trace.append(f"  P(Dengue | Evidencia) = {self.prob_dengue:.2%}")
+        return trace
 
-        # --- 2. MAPEO DE SÍNTOMAS ---
-        
-        # Fiebre
-        if facts['fiebre'] > 37.5:
-            evidence['Fiebre'] = 1
-            trace.append(f"  - Fiebre = 1 (>37.5°C)")
+def clave_evidencia(evidence: Dict[str, int]) -> int:
+    """Empaqueta la evidencia binaria en un entero de 5 bits (Nexo = bit más alto)."""
+    clave = 0
+    for nodo in EVIDENCIA:
+        clave = (clave << 1) | evidence[nodo]
+    return clave
+
+def _evidencia_mascara(mascara: int):
+    """Evidencia (sin Fiebre), motivos del nexo y clave parcial de una máscara de PatientFacts.
+
+    Aquí combinamos las variables del TP (Corrientes, Contacto, Viaje) en un solo nodo 'Nexo'.
+    """
+    motivos = []
+    if mascara & hechos.VIAJE_BRASIL:
+        motivos.append("Viaje a Brasil")
+    if mascara & hechos.CONTACTO_DENGUE:
+        motivos.append("Contacto estrecho")
+    if mascara & hechos.VIVE_CORRIENTES and mascara & hechos.VERANO:
+        motivos.append("Zona Endémica (Corrientes+Verano)")
+
+    evidence = {'Nexo': 1 if motivos else 0, 'Fiebre': 0}
+    for campo, nodo in SENSORES.items():
+        evidence[nodo] = 1 if mascara & hechos.BITS[campo] else 0
+    return evidence, tuple(motivos), clave_evidencia(evidence)
+
+# Las 128 máscaras posibles, precalculadas: por paciente queda solo el bit de fiebre
+_POR_MASCARA = tuple(_evidencia_mascara(m) for m in range(hechos.MAX_MASCARA + 1))
+_BIT_FIEBRE = 1 << (len(EVIDENCIA) - 1 - EVIDENCIA.index('Fiebre'))
+
+def _cpd(nodo: str, padre, datos) -> TabularCPD:
+    valores = np.asarray(knowledge.campo(datos, 'valores'), dtype=np.float64)
+    forma = (2, 1) if padre is None else (2, 2)
+    if valores.shape != forma:
+        raise knowledge.ConocimientoInvalido(f"CPD de {nodo}: se esperaba una tabla {forma[0]}x{forma[1]}")
+    if np.any(valores < 0) or not np.allclose(valores.sum(axis=0), 1.0):
+        raise knowledge.ConocimientoInvalido(f"CPD de {nodo}: cada columna debe sumar 1")
+    if padre is None:
+        return TabularCPD(variable=nodo, variable_card=2, values=valores)
+    return TabularCPD(variable=nodo, variable_card=2, values=valores,
+                      evidence=[padre], evidence_card=[2])
+
+class EstadoBayesiano(NamedTuple):
+    """Lo que se publica de una vez: un pedido lee el estado una sola vez y
+    calcula y firma con el mismo modelo, tabla y versión."""
+    model: DiscreteBayesianNetwork
+    inference: VariableElimination
+    tabla: Optional[np.ndarray]
+    model_version: int
+
+class BayesianEngine(InferenceEngine):
+    def __init__(self, compiled: bool = True, conocimiento: Dict[str, Any] = None):
+        # Modo compilado: P(Dengue | evidencia) precalculada para las 32
+        # combinaciones posibles de evidencia (ver _tabla_posterior)
+        self.compiled = compiled
+        # Serializa las publicaciones (update_cpds, model_version, tabla lazy);
+        # los pedidos leen self._estado sin lock
+        self._publicar = threading.Lock()
+
+        if conocimiento is None:
+            conocimiento = knowledge.leer("probabilistico")
+        self.knowledge_version = knowledge.version(conocimiento)
+        self.knowledge_hash = knowledge.huella(conocimiento)
+        self.umbral_fiebre = knowledge.numero(conocimiento, 'umbral_fiebre')
+
+        # 1. Estructura (Causa -> Efecto): fija, porque la evidencia y la
+        # posterior por lotes dependen de ella. El archivo solo trae las CPDs.
+        cpds = knowledge.campo(conocimiento, 'cpds')
+        for nodo, padre in ESTRUCTURA.items():
+            if knowledge.campo(cpds, nodo, 'padre') != padre:
+                raise knowledge.ConocimientoInvalido(f"El padre de {nodo} debe ser {padre}")
+        sobrantes = set(cpds) - set(ESTRUCTURA)
+        if sobrantes:
+            raise knowledge.ConocimientoInvalido(f"Nodos desconocidos: {', '.join(sorted(sobrantes))}")
+        model = DiscreteBayesianNetwork([(padre, nodo) for nodo, padre in ESTRUCTURA.items() if padre])
+
+        # 2. Tablas de probabilidad (CPDs), columnas por estado del padre
+        model.add_cpds(*[_cpd(nodo, padre, cpds[nodo]) for nodo, padre in ESTRUCTURA.items()])
+        model.check_model()
+        self._estado = EstadoBayesiano(model, VariableElimination(model), None, 0)
+
+    # --- Estado publicado ---
+    def estado(self) -> EstadoBayesiano:
+        return self._estado
+
+    @property
+    def model(self) -> DiscreteBayesianNetwork:
+        return self._estado.model
+
+    @property
+    def inference(self) -> VariableElimination:
+        return self._estado.inference
+
+    @property
+    def model_version(self) -> int:
+        return self._estado.model_version
+
+    @model_version.setter
+    def model_version(self, valor: int):
+        with self._publicar:
+            self._estado = self._estado._replace(model_version=valor)
+
+    def version(self, estado: EstadoBayesiano = None) -> str:
+        return f"{self.knowledge_version}/{(estado or self._estado).model_version}"
+
+    def update_cpds(self, *cpds: TabularCPD):
+        """Reemplaza CPDs del modelo y recompila la tabla.
+
+        Es la única vía soportada para cambiar probabilidades. El modelo
+        nuevo (copia + CPDs + tabla + versión) se arma aparte y se publica
+        en una sola asignación, así los pedidos en curso siguen usando el
+        anterior completo y nunca ven uno a medio actualizar.
+        """
+        model = self._estado.model.copy()
+        model.add_cpds(*cpds)
+        model.check_model()
+        inference = VariableElimination(model)
+        tabla = self._compilar_tabla(inference) if self.compiled else None
+
+        with self._publicar:
+            self._estado = EstadoBayesiano(model, inference, tabla, self._estado.model_version + 1)
+
+    def validar(self):
+        # Con probabilidades 0/1 alguna evidencia puede quedar imposible y
+        # su posterior sería NaN
+        tabla = self._tabla_posterior() if self.compiled else self._compilar_tabla(self.inference)
+        if not np.all(np.isfinite(tabla)):
+            raise knowledge.ConocimientoInvalido("Hay combinaciones de evidencia imposibles en la red")
+
+    def congelar(self):
+        # La tabla ya nace de solo lectura; solo hay que construirla antes del fork
+        if self.compiled:
+            self._tabla_posterior()
+
+    @staticmethod
+    def _compilar_tabla(inference) -> np.ndarray:
+        tabla = np.empty(2 ** len(EVIDENCIA), dtype=np.float64)
+        for clave in range(tabla.size):
+            evidence = {nodo: (clave >> (len(EVIDENCIA) - 1 - i)) & 1
+                        for i, nodo in enumerate(EVIDENCIA)}
+            result = inference.query(variables=['Dengue'], evidence=evidence,
+                                     show_progress=False)
+            tabla[clave] = result.values[1]
+        tabla.flags.writeable = False
+        return tabla
+
+    def _tabla_posterior(self, estado: EstadoBayesiano = None) -> np.ndarray:
+        """Tabla plana de 32 posteriores de ``estado`` indexada por
+        clave_evidencia (lazy: se guarda si el estado sigue publicado)."""
+        estado = estado or self._estado
+        if estado.tabla is not None:
+            return estado.tabla
+        tabla = self._compilar_tabla(estado.inference)
+        with self._publicar:
+            if self._estado is estado:
+                self._estado = estado._replace(tabla=tabla)
+        return tabla
+
+    def _evidencia(self, facts: Hechos):
+        """Traduce los hechos del paciente a evidencia de la red (+ motivos del nexo)."""
+        facts = como_hechos(facts)
+        evidence, motivos, _ = _POR_MASCARA[facts.mascara]
+        # Fiebre (importante setear el 0 si no tiene fiebre)
+        return dict(evidence, Fiebre=1 if facts.fiebre > self.umbral_fiebre else 0), list(motivos)
+
+    def _clave(self, facts: PatientFacts) -> int:
+        """clave_evidencia del paciente sin armar el diccionario de evidencia."""
+        clave = _POR_MASCARA[facts.mascara][2]
+        return clave | _BIT_FIEBRE if facts.fiebre > self.umbral_fiebre else clave
+
+    def _diagnostico(self, prob_dengue, evidence, motivos, trace: bool, version: str) -> Diagnosis:
+        # Ajuste de etiqueta visual
+        if prob_dengue > 0.8:
+            label = "ALTA PROBABILIDAD DENGUE"
+        elif prob_dengue > 0.4:
+            label = "SOSPECHOSO (Probabilidad Media)"
         else:
-            evidence['Fiebre'] = 0 # Importante setear el 0 si no tiene fiebre
+            label = "Baja Probabilidad Dengue"
             
-        # Checkboxes simples
-        sensores = {
-            'dolor_cabeza': 'DolorCabeza', 
-            'presencia_tos': 'Tos', 
-            'dolor_garganta': 'DolorGarganta'
-        }
-        
-        for key_form, key_nodo in sensores.items():
-            if facts.get(key_form):
-                evidence[key_nodo] = 1
-                trace.append(f"  - {key_nodo} = 1 (Presente)")
-            else:
-                evidence[key_nodo] = 0
-                # No agregamos al trace lo que no está para no ensuciar, o sí si prefieres:
-                # trace.append(f"  - {key_nodo} = 0")
+        reasoning = TrazaBayesiana(evidence, motivos, prob_dengue, self.umbral_fiebre) if trace else SIN_TRAZA
+        return Diagnosis(label, float(prob_dengue), reasoning, version)
 
-        trace.append("---")
+    def _posterior_batch(self, model, evidencias):
+        """P(Dengue=1 | evidencia) para N pacientes en una sola pasada NumPy.
+
+        Como Nexo siempre es evidencia y los síntomas solo dependen de Dengue,
+        la posterior es P(Dengue|Nexo) * prod P(Síntoma|Dengue), normalizada.
+        DolorCuerpo no se observa y se marginaliza (suma 1).
+        """
+        ev = np.array([[e[nodo] for nodo in EVIDENCIA] for e in evidencias], dtype=np.intp)
+        # Columnas: Dengue=0, Dengue=1
+        conjunta = model.get_cpds('Dengue').values[:, ev[:, 0]].T
+        for col, nodo in enumerate(EVIDENCIA[1:], start=1):
+            conjunta = conjunta * model.get_cpds(nodo).values[ev[:, col], :]
+        return conjunta[:, 1] / conjunta.sum(axis=1)
+
+    def infer(self, facts: Hechos, trace: bool = True) -> Diagnosis:
+        facts = como_hechos(facts)
+        estado = self._estado  # una sola lectura: update_cpds puede publicar otro
+        version = self.version(estado)
         
-        # --- 3. INFERENCIA ---
+        # --- INFERENCIA ---
         try:
-            # Consultamos la probabilidad de Dengue dada la evidencia acumulada
-            result = self.inference.query(variables=['Dengue'], evidence=evidence)
-            prob_dengue = result.values[1] # El índice 1 corresponde al estado "1" (Tiene Dengue)
-            
-            trace.append("CÁLCULO DE PROBABILIDAD POSTERIOR:")
-            trace.append(f"  P(Dengue | Evidencia) = {prob_dengue:.2%}")
-            
-            # Ajuste de etiqueta visual
-            if prob_dengue > 0.8:
-                label = "ALTA PROBABILIDAD DENGUE"
-            elif prob_dengue > 0.4:
-                label = "SOSPECHOSO (Probabilidad Media)"
+            if self.compiled:
+                # Búsqueda O(1) en la tabla precalculada; la evidencia se arma solo para la traza
+                prob_dengue = self._tabla_posterior(estado)[self._clave(facts)]
+                if not trace:
+                    return self._diagnostico(prob_dengue, None, None, False, version)
+                evidence, motivos = self._evidencia(facts)
             else:
-                label = "Baja Probabilidad Dengue"
-                
-            return Diagnosis(label, float(prob_dengue), trace)
+                evidence, motivos = self._evidencia(facts)
+                # Consultamos la probabilidad de Dengue dada la evidencia acumulada
+                result = estado.inference.query(variables=['Dengue'], evidence=evidence)
+                prob_dengue = result.values[1] # El índice 1 corresponde al estado "1" (Tiene Dengue)
+            return self._diagnostico(prob_dengue, evidence, motivos, trace, version)
             
         except Exception as e:
-            return Diagnosis("Error en Inferencia", 0.0, [str(e)])
\ No newline at end of file
+            return Diagnosis("Error en Inferencia", 0.0, [str(e)], version)
+
+    def infer_batch(self, facts_list: List[Hechos], trace: bool = True) -> List[Diagnosis]:
+        if not facts_list:
+            return []
+        facts_list = [como_hechos(facts) for facts in facts_list]
+        estado = self._estado
+        version = self.version(estado)
+        try:
+            if self.compiled:
+                claves = np.fromiter((self._clave(facts) for facts in facts_list),
+                                     dtype=np.intp, count=len(facts_list))
+                probs = self._tabla_posterior(estado)[claves]
+                if not trace:
+                    return [self._diagnostico(p, None, None, False, version) for p in probs]
+                preparados = [self._evidencia(facts) for facts in facts_list]
+            else:
+                preparados = [self._evidencia(facts) for facts in facts_list]
+                probs = self._posterior_batch(estado.model, [evidence for evidence, _ in preparados])
+        except Exception as e:
+            return [Diagnosis("Error en Inferencia", 0.0, [str(e)], version) for _ in facts_list]
+        return [self._diagnostico(p, evidence, motivos, trace, version)
+                for p, (evidence, motivos) in zip(probs, preparados)]
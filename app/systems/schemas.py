@@ -1,20 +1,35 @@
 # schemas.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
+from .facts import PatientFacts
+
 # La "Memoria de Trabajo": Datos del paciente actual
 class PatientData(BaseModel):
-    fiebre: float  # Grados centigrados
+    # NaN/inf no son valores válidos (422 como cualquier otro campo inválido)
+    fiebre: float = Field(allow_inf_nan=False)  # Grados centigrados
     tos: bool
     dolor_garganta: bool
     viaje_brasil: bool
     contacto_dengue: bool
     vive_corrientes: bool
     verano: bool
+    # Motor difuso (sliders 0-10) y checkbox de dolor de cabeza; mismos
+    # valores por defecto que el formulario
+    dolor_cabeza: bool = False
+    intensidad_dolor_cabeza: float = Field(5, ge=0, le=10, allow_inf_nan=False)
+    intensidad_tos: float = Field(5, ge=0, le=10, allow_inf_nan=False)
+
+    def hechos(self) -> PatientFacts:
+        """Los mismos hechos que arma facts_from_form."""
+        return PatientFacts.desde_dict(self.model_dump())
 
 # Estructura de respuesta del Subsistema de Explicación
 class DiagnosisResult(BaseModel):
     sistema: str
     diagnostico: str
     confianza: float # 0.0 a 1.0
-    explicacion: List[str] # Traza del razonamiento
\ No newline at end of file
+    # "<versión del conocimiento>/<publicación del modelo>" que lo produjo
+    version_modelo: Optional[str] = None
+    # Traza del razonamiento; None en las respuestas compactas
+    explicacion: Optional[List[str]] = None
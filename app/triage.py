@@ -0,0 +1,384 @@
+"""Triage masivo de un archivo CSV o JSONL de pacientes.
+
+Lee el archivo fila por fila (nunca entero), arma con cada fila el mismo
+diccionario de hechos que ``/diagnose`` y lo diagnostica con el motor
+elegido, por bloques, en un pool de procesos. Los resultados se escriben en
+el orden de la entrada. En memoria hay como mucho ``2 x procesos`` bloques en
+vuelo, así que el uso no depende del tamaño del archivo.
+
+Las columnas se llaman como los campos de la API (``fiebre``, ``tos``,
+``viaje_brasil``...); ``--columna campo=columna`` usa otro nombre. Las que
+faltan toman el valor por defecto del formulario; los booleanos aceptan
+si/no, 1/0, true/false, x o vacío, y los números admiten coma decimal. Una
+fila que no se puede leer sale con etiqueta ``Error de datos: <motivo>`` y no
+corta la corrida.
+
+Con ``--checkpoint`` se guarda, después de escribir cada bloque, cuántas
+filas van y el largo de la salida. ``--reanudar`` recorta la salida a ese
+largo, saltea esas filas de la entrada y sigue.
+
+Uso:
+    python -m app.triage ENTRADA --motor difuso [--salida F] [--formato jsonl|csv]
+                         [--traza] [--bloque 500] [--procesos N]
+                         [--checkpoint F.json [--reanudar]] [--id COLUMNA]
+                         [--columna campo=columna ...]
+"""
+import argparse
+import csv
+import functools
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.registry import MOTORES, construir
+from app.systems.facts import BOOLEANOS, DEFECTOS, NUMERICOS, RANGOS, PatientFacts
+
+BLOQUE = 500
+
+# Campo -> valor por defecto (los mismos que facts_from_form / facts_from_json)
+VERDADEROS = {'1', 'true', 'verdadero', 'si', 'sí', 's', 'yes', 'y', 'on', 'x'}
+FALSOS = {'', '0', 'false', 'falso', 'no', 'n', 'off'}
+
+ERROR_DATOS = "Error de datos"
+
+
+# --- Filas -> hechos ---
+def _booleano(valor) -> bool:
+    if valor is None or isinstance(valor, bool):
+        return bool(valor)
+    if isinstance(valor, (int, float)):
+        if valor in (0, 1):
+            return bool(valor)
+    elif isinstance(valor, str):
+        texto = valor.strip().lower()
+        if texto in VERDADEROS:
+            return True
+        if texto in FALSOS:
+            return False
+    raise ValueError(f"no es un booleano: {valor!r}")
+
+
+def _numero(valor, defecto: float) -> float:
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return defecto
+    if isinstance(valor, bool):
+        raise ValueError(f"no es un número: {valor!r}")
+    if isinstance(valor, str):
+        valor = valor.strip().replace(",", ".")
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"no es un número: {valor!r}")
+    if not math.isfinite(numero):
+        raise ValueError(f"no es un valor finito: {valor!r}")
+    return numero
+
+
+def hechos(fila: Dict[str, Any], columnas: Dict[str, str] = None) -> PatientFacts:
+    """Hechos de una fila; ValueError si algún valor no se puede leer."""
+    columnas = columnas or {}
+    facts = {}
+    for campo in NUMERICOS:
+        try:
+            facts[campo] = _numero(fila.get(columnas.get(campo, campo)), DEFECTOS[campo])
+        except ValueError as e:
+            raise ValueError(f"{campo}: {e}")
+        minimo, maximo = RANGOS.get(campo, (None, None))
+        if minimo is not None and not minimo <= facts[campo] <= maximo:
+            raise ValueError(f"{campo}: fuera de rango ({facts[campo]:g}, se espera {minimo:g}-{maximo:g})")
+    for campo in BOOLEANOS:
+        try:
+            facts[campo] = _booleano(fila.get(columnas.get(campo, campo)))
+        except ValueError as e:
+            raise ValueError(f"{campo}: {e}")
+    return PatientFacts(**facts)
+
+
+def leer_filas(f, formato: str) -> Iterator[Dict[str, Any]]:
+    """Filas como diccionarios, de a una. En JSONL las líneas vacías no cuentan."""
+    if formato == "csv":
+        yield from csv.DictReader(f)
+        return
+    for numero, linea in enumerate(f, 1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except json.JSONDecodeError as e:
+            fila = {"__error__": f"línea {numero}: JSON inválido ({e.msg})"}
+        if not isinstance(fila, dict):
+            fila = {"__error__": f"línea {numero}: se espera un objeto JSON"}
+        yield fila
+
+
+def _formato(ruta: str, formato: Optional[str]) -> str:
+    if formato:
+        return formato
+    return "csv" if ruta.lower().endswith(".csv") else "jsonl"
+
+
+# --- Inferencia (en los procesos del pool) ---
+_motor = None
+
+
+def _inicializar(fabrica):
+    global _motor
+    _motor = fabrica()
+
+
+def _diagnosticar(facts_list: List[Dict[str, Any]], trace: bool) -> List[Tuple]:
+    diags = _motor.infer_batch(facts_list, trace)
+    return [(d.label, d.confidence, d.model_version, list(d.reasoning) if trace else None) for d in diags]
+
+
+class _Local:
+    """Mismo contrato que el pool, en el proceso actual (``--procesos 0``)."""
+
+    def __init__(self, fabrica):
+        _inicializar(fabrica)
+
+    def submit(self, funcion, *args):
+        from concurrent.futures import Future
+        futuro = Future()
+        try:
+            futuro.set_result(funcion(*args))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+# --- Salida ---
+class _Escritor:
+    def __init__(self, f, formato: str, trace: bool, con_id: bool, encabezado: bool):
+        self.f = f
+        self.formato = formato
+        self.trace = trace
+        self.con_id = con_id
+        if formato == "csv":
+            self._csv = csv.writer(f, lineterminator="\n")
+            if encabezado:
+                self._csv.writerow((["id"] if con_id else []) + ["fila", "label", "confidence", "model_version"]
+                                   + (["reasoning"] if trace else []))
+
+    def escribir(self, fila: int, ident, label: str, confidence: float, version: str, reasoning):
+        if self.formato == "csv":
+            self._csv.writerow(([ident] if self.con_id else []) + [fila, label, f"{confidence:.6g}", version]
+                               + ([" | ".join(reasoning or [])] if self.trace else []))
+            return
+        registro = {"id": ident} if self.con_id else {}
+        registro.update(fila=fila, label=label, confidence=confidence, model_version=version)
+        if self.trace:
+            registro["reasoning"] = reasoning or []
+        self.f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+# --- Checkpoint ---
+def _leer_checkpoint(ruta: str) -> Dict[str, Any]:
+    with open(ruta) as f:
+        return json.load(f)
+
+
+def _guardar_checkpoint(ruta: str, datos: Dict[str, Any]):
+    directorio = os.path.dirname(ruta) or "."
+    os.makedirs(directorio, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(datos, f)
+        os.replace(tmp, ruta)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class _Progreso:
+    def __init__(self, salida, intervalo: float, inicial: int):
+        self.salida = salida
+        self.intervalo = intervalo
+        self.inicial = inicial
+        self.t0 = self._ultimo = time.perf_counter()
+        self._vuelta = "\r" if salida.isatty() else ""
+        self._fin = "" if salida.isatty() else "\n"
+
+    def mostrar(self, filas: int, errores: int, final: bool = False):
+        ahora = time.perf_counter()
+        if not final and (self.intervalo <= 0 or ahora - self._ultimo < self.intervalo):
+            return
+        self._ultimo = ahora
+        nuevas = filas - self.inicial
+        velocidad = nuevas / (ahora - self.t0) if ahora > self.t0 else 0.0
+        self.salida.write(f"{self._vuelta}  {filas} filas ({errores} con errores de datos), "
+                          f"{velocidad:.0f} filas/s{self._fin}")
+        if final and self._vuelta:
+            self.salida.write("\n")
+        self.salida.flush()
+
+
+def triar(entrada: str, motor: str, salida: str = "-", formato_entrada: str = None,
+          formato_salida: str = "jsonl", trace: bool = False, bloque: int = BLOQUE,
+          procesos: int = None, checkpoint: str = None, reanudar: bool = False,
+          columna_id: str = None, columnas: Dict[str, str] = None,
+          progreso: float = 1.0) -> Dict[str, Any]:
+    """Diagnostica todas las filas de ``entrada``; devuelve un resumen de la corrida."""
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor} (válidos: {', '.join(MOTORES)})")
+    if checkpoint and salida == "-":
+        raise ValueError("El checkpoint necesita una salida en archivo (--salida)")
+    formato_entrada = _formato(entrada, formato_entrada)
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    config = {"entrada": os.path.abspath(entrada) if entrada != "-" else "-",
+              "salida": os.path.abspath(salida) if salida != "-" else "-",
+              "motor": motor, "formato": formato_salida, "traza": trace,
+              "id": columna_id, "columnas": columnas or {}}
+
+    ya = bytes_salida = 0
+    if reanudar and checkpoint and os.path.exists(checkpoint):
+        previo = _leer_checkpoint(checkpoint)
+        distintos = [k for k, v in config.items() if previo.get(k) != v]
+        if distintos:
+            raise ValueError(f"El checkpoint es de otra corrida (difiere: {', '.join(distintos)})")
+        ya, bytes_salida = int(previo["filas"]), int(previo["bytes"])
+
+    if salida == "-":
+        f_salida = sys.stdout
+    else:
+        f_salida = open(salida, "r+" if ya else "w", encoding="utf-8", newline="")
+        # Lo escrito después del último checkpoint se vuelve a calcular
+        f_salida.truncate(bytes_salida)
+        f_salida.seek(bytes_salida)
+    f_entrada = sys.stdin if entrada == "-" else open(entrada, encoding="utf-8-sig", newline="")
+
+    fabrica = functools.partial(construir, MOTORES[motor])
+    if procesos > 0:
+        pool = ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context("fork"),
+                                   initializer=_inicializar, initargs=(fabrica,))
+    else:
+        pool = _Local(fabrica)
+    escritor = _Escritor(f_salida, formato_salida, trace, columna_id is not None, encabezado=not ya)
+    indicador = _Progreso(sys.stderr, progreso, ya)
+    en_vuelo: deque = deque()
+    filas, errores = ya, 0
+
+    def _vaciar(hasta: int):
+        # Escribe los bloques terminados en orden, hasta dejar ``hasta`` en vuelo
+        nonlocal filas, errores
+        while len(en_vuelo) > hasta:
+            registros, futuro = en_vuelo.popleft()
+            resultados = iter(futuro.result())
+            for numero, ident, error in registros:
+                if error is not None:
+                    errores += 1
+                    escritor.escribir(numero, ident, f"{ERROR_DATOS}: {error}", 0.0, "", [])
+                else:
+                    escritor.escribir(numero, ident, *next(resultados))
+            filas += len(registros)
+            if checkpoint:
+                f_salida.flush()
+                os.fsync(f_salida.fileno())
+                _guardar_checkpoint(checkpoint, {**config, "filas": filas, "bytes": f_salida.tell()})
+            indicador.mostrar(filas, errores)
+
+    try:
+        filas_entrada = itertools.islice(leer_filas(f_entrada, formato_entrada), ya, None)
+        numeros = itertools.count(ya + 1)
+        while True:
+            registros, facts_list = [], []
+            for fila in itertools.islice(filas_entrada, bloque):
+                numero = next(numeros)
+                ident = fila.get(columna_id) if columna_id is not None else None
+                error = fila.get("__error__")
+                if error is None:
+                    try:
+                        facts_list.append(hechos(fila, columnas))
+                    except ValueError as e:
+                        error = str(e)
+                registros.append((numero, ident, error))
+            if not registros:
+                break
+            # Como mucho dos bloques por proceso: la memoria no crece con el archivo
+            _vaciar(2 * max(procesos, 1) - 1)
+            en_vuelo.append((registros, pool.submit(_diagnosticar, facts_list, trace)))
+        _vaciar(0)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if f_entrada is not sys.stdin:
+            f_entrada.close()
+        if f_salida is not sys.stdout:
+            f_salida.close()
+        else:
+            f_salida.flush()
+        indicador.mostrar(filas, errores, final=True)
+
+    segundos = time.perf_counter() - indicador.t0
+    return {"filas": filas, "nuevas": filas - ya, "errores_datos": errores, "segundos": segundos,
+            "filas_por_s": (filas - ya) / segundos if segundos else 0.0}
+
+
+def _columnas(pares: List[str]) -> Dict[str, str]:
+    columnas = {}
+    for par in pares:
+        campo, sep, columna = par.partition("=")
+        if not sep or campo not in NUMERICOS and campo not in BOOLEANOS:
+            raise argparse.ArgumentTypeError(f"--columna espera campo=columna con un campo conocido: {par}")
+        columnas[campo] = columna
+    return columnas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("entrada", help="archivo CSV o JSONL ('-' = entrada estándar)")
+    parser.add_argument("--motor", required=True, choices=list(MOTORES))
+    parser.add_argument("--salida", default="-", help="archivo de resultados ('-' = salida estándar)")
+    parser.add_argument("--formato-entrada", choices=("csv", "jsonl"),
+                        help="por defecto, según la extensión")
+    parser.add_argument("--formato", choices=("jsonl", "csv"), default="jsonl", help="formato de salida")
+    parser.add_argument("--traza", action="store_true", help="incluye el razonamiento")
+    parser.add_argument("--bloque", type=int, default=BLOQUE, help="filas por pedido al pool")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="procesos del pool (por defecto CPUs; 0 = en este proceso)")
+    parser.add_argument("--checkpoint", help="archivo de checkpoint para poder reanudar")
+    parser.add_argument("--reanudar", action="store_true", help="sigue desde el checkpoint")
+    parser.add_argument("--id", dest="columna_id", help="columna a copiar en cada resultado")
+    parser.add_argument("--columna", action="append", default=[], metavar="CAMPO=COLUMNA",
+                        help="nombre de la columna de un campo (repetible)")
+    parser.add_argument("--progreso", type=float, default=1.0, help="segundos entre avisos (0 = solo al final)")
+    args = parser.parse_args(argv)
+    if args.bloque < 1:
+        parser.error("--bloque debe ser positivo")
+    if args.reanudar and not args.checkpoint:
+        parser.error("--reanudar necesita --checkpoint")
+    try:
+        columnas = _columnas(args.columna)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    try:
+        resumen = triar(args.entrada, args.motor, args.salida, args.formato_entrada, args.formato,
+                        args.traza, args.bloque, args.procesos, args.checkpoint, args.reanudar,
+                        args.columna_id, columnas, args.progreso)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        if args.checkpoint:
+            print("Interrumpido; se puede seguir con --reanudar", file=sys.stderr)
+        sys.exit(130)
+    print(f"{resumen['nuevas']} filas en {resumen['segundos']:.1f} s ({resumen['filas_por_s']:.0f} filas/s), "
+          f"{resumen['errores_datos']} con errores de datos", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
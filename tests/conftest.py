@@ -0,0 +1,27 @@
+import os
+import warnings
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_main(tmp_path_factory):
+    """app.main importado con el directorio de trabajo en un temporal: la base
+    (expert_data.db), la clave de sesión y los caches no quedan en el repo."""
+    directorio = tmp_path_factory.mktemp("app")
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    warnings.filterwarnings("ignore")
+    try:
+        import app.main
+        yield app.main
+    finally:
+        os.chdir(anterior)
+
+
+@pytest.fixture(scope="session")
+def cliente(app_main):
+    from starlette.testclient import TestClient
+
+    with TestClient(app_main.app) as cliente:
+        yield cliente
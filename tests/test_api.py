@@ -0,0 +1,50 @@
+"""Validación de los hechos del paciente y del tamaño de los lotes en las rutas de diagnóstico."""
+import pytest
+
+PACIENTE = {"fiebre": 39.0, "tos": True, "dolor_garganta": False, "viaje_brasil": True,
+            "contacto_dengue": False, "vive_corrientes": True, "verano": True}
+NO_FINITOS = ["nan", "inf", "-inf", "NaN", "Infinity"]
+
+
+@pytest.mark.parametrize("valor", NO_FINITOS)
+@pytest.mark.parametrize("campo", ["fiebre", "intensidad_dolor_cabeza", "intensidad_tos"])
+def test_api_rechaza_no_finitos(cliente, campo, valor):
+    r = cliente.post("/api/diagnose/deterministico", json=dict(PACIENTE, **{campo: valor}))
+    assert r.status_code == 422
+    assert r.json()["error"] == "Datos del paciente inválidos"
+
+
+@pytest.mark.parametrize("valor", NO_FINITOS)
+@pytest.mark.parametrize("motor", ["deterministico", "probabilistico", "difuso", "ensemble"])
+def test_formulario_rechaza_no_finitos(cliente, motor, valor):
+    r = cliente.post("/diagnose", data={"engine": motor, "fiebre": valor, "tos": "on"})
+    assert r.status_code == 400
+    assert "Datos inválidos" in r.text
+
+
+@pytest.mark.parametrize("valor", NO_FINITOS)
+def test_lote_rechaza_no_finitos(cliente, valor):
+    r = cliente.post("/diagnose/batch", json={"engine": "difuso",
+                                              "patients": [PACIENTE, dict(PACIENTE, fiebre=valor)]})
+    assert r.status_code == 400
+
+
+def test_rutas_aceptan_un_paciente_valido(cliente):
+    assert cliente.post("/api/diagnose/difuso", json=PACIENTE).status_code == 200
+    assert cliente.post("/diagnose", data={"engine": "difuso", "fiebre": "39", "tos": "on"}).status_code == 200
+    r = cliente.post("/diagnose/batch", json={"engine": "difuso", "patients": [PACIENTE]})
+    assert r.status_code == 200 and len(r.json()["results"]) == 1
+
+
+def test_lote_demasiado_grande(cliente, app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "LOTE_MAX", 3)
+    r = cliente.post("/diagnose/batch", json={"engine": "difuso", "patients": [PACIENTE] * 4})
+    assert r.status_code == 413
+    assert "máximo 3" in r.json()["error"]
+    r = cliente.post("/diagnose/batch", json={"engine": "difuso", "patients": [PACIENTE] * 3})
+    assert r.status_code == 200 and len(r.json()["results"]) == 3
+
+
+def test_lote_sin_lista(cliente):
+    r = cliente.post("/diagnose/batch", json={"engine": "difuso", "patients": PACIENTE})
+    assert r.status_code == 400
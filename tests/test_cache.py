@@ -0,0 +1,87 @@
+"""Cache de diagnósticos: invalidación por model_version, TTL y LRU."""
+from types import SimpleNamespace
+
+import pytest
+
+from app import cache as modulo
+from app.cache import ResultCache
+from app.systems.base import Diagnosis
+from app.systems.decision_table import _hechos
+
+A, B, C = _hechos(0, 36.5), _hechos(1, 38.0), _hechos(2, 39.5)
+
+
+def _diag(confianza):
+    return Diagnosis("Etiqueta", confianza, ["paso"], "1/0")
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(modulo, "time", SimpleNamespace(monotonic=lambda: ahora[0]))
+    return ahora
+
+
+def test_acierto_devuelve_una_copia():
+    cache, engine = ResultCache(capacidad=4, ttl=0), SimpleNamespace(model_version=0)
+    cache.put("m", engine, A, _diag(0.5))
+    diag = cache.get("m", engine, A)
+    assert diag.confidence == 0.5
+    diag.reasoning.append("otro")
+    assert list(cache.get("m", engine, A).reasoning) == ["paso"]
+    e = cache.stats()["motores"]["m"]
+    assert (e["aciertos"], e["fallos"]) == (2, 0)
+
+
+def test_cambio_de_version_vacia_el_espacio():
+    cache, engine = ResultCache(capacidad=4, ttl=0), SimpleNamespace(model_version=0)
+    otro = SimpleNamespace(model_version=0)
+    cache.put("m", engine, A, _diag(0.5))
+    cache.put("otro", otro, A, _diag(0.7))
+    engine.model_version = 1
+    assert cache.get("m", engine, A) is None
+    # Los demás motores no se tocan
+    assert cache.get("otro", otro, A).confidence == 0.7
+    e = cache.stats()["motores"]["m"]
+    assert (e["entradas"], e["version_modelo"], e["invalidaciones"], e["fallos"]) == (0, 1, 1, 1)
+
+
+def test_put_con_version_vieja_no_se_guarda():
+    cache, engine = ResultCache(capacidad=4, ttl=0), SimpleNamespace(model_version=0)
+    version = engine.model_version   # leída antes de inferir
+    engine.model_version = 1         # el modelo cambió durante la inferencia
+    cache.put("m", engine, A, _diag(0.5), version=version)
+    assert cache.get("m", engine, A) is None
+    cache.put("m", engine, A, _diag(0.6), version=engine.model_version)
+    assert cache.get("m", engine, A).confidence == 0.6
+
+
+def test_ttl_vence_las_entradas(reloj):
+    cache, engine = ResultCache(capacidad=4, ttl=10), SimpleNamespace(model_version=0)
+    cache.put("m", engine, A, _diag(0.5))
+    reloj[0] += 10
+    assert cache.get("m", engine, A) is not None
+    reloj[0] += 0.5
+    assert cache.get("m", engine, A) is None
+    e = cache.stats()["motores"]["m"]
+    assert (e["entradas"], e["vencidos"], e["aciertos"], e["fallos"]) == (0, 1, 1, 1)
+
+
+def test_lru_desaloja_la_menos_usada():
+    cache, engine = ResultCache(capacidad=2, ttl=0), SimpleNamespace(model_version=0)
+    cache.put("m", engine, A, _diag(0.1))
+    cache.put("m", engine, B, _diag(0.2))
+    cache.get("m", engine, A)              # A pasa a ser la más reciente
+    cache.put("m", engine, C, _diag(0.3))  # sale B
+    assert cache.get("m", engine, B) is None
+    assert cache.get("m", engine, A).confidence == 0.1
+    assert cache.get("m", engine, C).confidence == 0.3
+    e = cache.stats()["motores"]["m"]
+    assert (e["entradas"], e["desalojos"]) == (2, 1)
+
+
+def test_capacidad_cero_desactiva():
+    cache, engine = ResultCache(capacidad=0, ttl=0), SimpleNamespace(model_version=0)
+    cache.put("m", engine, A, _diag(0.5))
+    assert cache.get("m", engine, A) is None
+    assert cache.stats()["motores"] == {}
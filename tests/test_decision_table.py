@@ -0,0 +1,45 @@
+"""La tabla de decisión compilada tiene que responder lo mismo que las reglas experta."""
+import pytest
+
+from app.systems.decision_table import _hechos, fiebres_verificacion, verificar_equivalencia
+from app.systems.deterministic import RuleBasedEngine
+from app.systems.facts import MAX_MASCARA
+
+
+@pytest.fixture(scope="module")
+def experta():
+    return RuleBasedEngine(pool_size=1, mode="experta")
+
+
+@pytest.fixture(scope="module")
+def compilado():
+    return RuleBasedEngine(pool_size=1, mode="compiled")
+
+
+def test_verificar_equivalencia_contra_experta(experta, compilado):
+    casos = verificar_equivalencia(compilado.tabla, experta._infer_experta)
+    assert casos == (MAX_MASCARA + 1) * len(fiebres_verificacion(compilado.tabla.umbral_fiebre))
+
+
+def test_etiqueta_confianza_y_traza_por_combinacion(experta, compilado):
+    umbral = compilado.tabla.umbral_fiebre
+    for mascara in range(MAX_MASCARA + 1):
+        for fiebre in (umbral - 0.1, umbral, umbral + 0.1):
+            facts = _hechos(mascara, fiebre)
+            esperado = experta.infer(facts)
+            obtenido = compilado.infer(facts)
+            assert obtenido.label == esperado.label, facts
+            assert obtenido.confidence == esperado.confidence, facts
+            assert list(obtenido.reasoning) == list(esperado.reasoning), facts
+
+
+def test_detecta_una_entrada_distinta(experta, compilado):
+    tabla = compilado.tabla
+    original = tabla.entradas[0]
+    label, confidence, plantillas = original
+    tabla.entradas[0] = (label, confidence + 0.01, plantillas)
+    try:
+        with pytest.raises(AssertionError):
+            verificar_equivalencia(tabla, experta._infer_experta)
+    finally:
+        tabla.entradas[0] = original
@@ -0,0 +1,140 @@
+"""Executor de inferencia: rechazo con la cola llena, timeouts y devolución de cupos."""
+import asyncio
+import threading
+
+import pytest
+
+from app.executor import InferenceExecutor, Saturado
+from app.systems.base import Diagnosis
+
+
+class MotorFalso:
+    """Bloquea cada inferencia hasta que se libera ``seguir``; ``falla`` la hace lanzar."""
+
+    model_version = 0
+
+    def __init__(self, falla: Exception = None):
+        self.seguir = threading.Event()
+        self.falla = falla
+
+    def infer(self, facts, trace=True):
+        self.seguir.wait(5)
+        if self.falla is not None:
+            raise self.falla
+        return Diagnosis("ok", 1.0, [], "1/0")
+
+    def infer_batch(self, facts_list, trace=True):
+        return [self.infer(facts, trace) for facts in facts_list]
+
+
+def _executor(motor, **kwargs):
+    kwargs = dict(dict(kind="thread", max_workers=4, concurrencia=1, cola_max=1, timeout=5), **kwargs)
+    return InferenceExecutor({"m": motor}, **kwargs)
+
+
+def _cupos_libres(executor):
+    return executor._estado("m").semaforo._value
+
+
+async def _hasta(condicion, limite=5.0):
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + limite
+    while not condicion():
+        assert loop.time() < fin, "no se cumplió a tiempo"
+        await asyncio.sleep(0.01)
+
+
+def test_cola_llena_rechaza_y_los_cupos_vuelven():
+    motor = MotorFalso()
+    executor = _executor(motor)
+
+    async def correr():
+        primero = asyncio.create_task(executor.infer("m", {}))
+        await _hasta(lambda: executor._estado("m").en_curso == 1)
+        segundo = asyncio.create_task(executor.infer("m", {}))
+        await _hasta(lambda: executor._estado("m").en_cola == 1)
+        with pytest.raises(Saturado):
+            await executor.infer("m", {})
+        motor.seguir.set()
+        assert (await primero).label == "ok"
+        assert (await segundo).label == "ok"
+        await _hasta(lambda: executor._estado("m").en_curso == 0)
+
+    asyncio.run(correr())
+    stats = executor.stats()["motores"]["m"]
+    assert (stats["rechazados"], stats["completados"], stats["en_cola"]) == (1, 2, 0)
+    assert _cupos_libres(executor) == 1
+    executor.shutdown()
+
+
+def test_motor_lento_da_timeout_y_libera_el_cupo_al_terminar():
+    motor = MotorFalso()
+    executor = _executor(motor, timeout=0.1)
+
+    async def correr():
+        with pytest.raises(TimeoutError):
+            await executor.infer("m", {})
+        # El trabajo sigue corriendo: el cupo no se devuelve todavía
+        assert executor.stats()["motores"]["m"]["en_curso"] == 1
+        assert _cupos_libres(executor) == 0
+        motor.seguir.set()
+        await _hasta(lambda: _cupos_libres(executor) == 1)
+
+    asyncio.run(correr())
+    stats = executor.stats()["motores"]["m"]
+    assert (stats["timeouts"], stats["en_curso"]) == (1, 0)
+    executor.shutdown()
+
+
+def test_timeout_esperando_en_la_cola():
+    motor = MotorFalso()
+    executor = _executor(motor, timeout=0.2)
+
+    async def correr():
+        primero = asyncio.create_task(executor.infer("m", {}))
+        await _hasta(lambda: executor._estado("m").en_curso == 1)
+        with pytest.raises(TimeoutError):
+            await executor.infer("m", {})
+        assert executor.stats()["motores"]["m"]["en_cola"] == 0
+        motor.seguir.set()
+        with pytest.raises(TimeoutError):
+            await primero
+        await _hasta(lambda: _cupos_libres(executor) == 1)
+
+    asyncio.run(correr())
+    executor.shutdown()
+
+
+def test_error_del_motor_devuelve_el_cupo():
+    motor = MotorFalso(falla=ValueError("roto"))
+    motor.seguir.set()
+    executor = _executor(motor, concurrencia=2)
+
+    async def correr():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await executor.infer_batch("m", [{}, {}])
+        await _hasta(lambda: _cupos_libres(executor) == 2)
+
+    asyncio.run(correr())
+    stats = executor.stats()["motores"]["m"]
+    assert (stats["errores"], stats["en_curso"], stats["completados"]) == (3, 0, 0)
+    executor.shutdown()
+
+
+def test_error_al_enviar_devuelve_el_cupo(monkeypatch):
+    executor = _executor(MotorFalso())
+
+    def enviar(*args):
+        raise RuntimeError("pool cerrado")
+
+    monkeypatch.setattr(executor, "_enviar", enviar)
+
+    async def correr():
+        with pytest.raises(RuntimeError):
+            await executor.infer("m", {})
+
+    asyncio.run(correr())
+    assert _cupos_libres(executor) == 1
+    assert executor.stats()["motores"]["m"]["errores"] == 1
+    executor.shutdown()
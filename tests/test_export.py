@@ -0,0 +1,44 @@
+"""Exportación columnar: el conteo y la lectura ven la misma foto de la tabla."""
+import json
+
+import numpy as np
+
+from app.database import get_db
+from app.export import exportar
+
+
+class ConBorrado:
+    """Base que, tras la primera consulta, borra filas desde otra conexión."""
+
+    def __init__(self, db, otra):
+        self.db = db
+        self.otra = otra
+        self.conn = db.conn
+        self.consultas = 0
+
+    def execute(self, *args):
+        cursor = self.db.execute(*args)
+        self.consultas += 1
+        if self.consultas == 1:
+            self.otra.execute("DELETE FROM learning_logs WHERE id % 3 = 0")
+            self.otra.execute("INSERT INTO learning_logs (timestamp, system_used) VALUES ('2024-01-02T00:00:00', 'difuso')")
+        return cursor
+
+
+def test_exporta_la_foto_del_inicio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = get_db()
+    db.t.learning_logs.insert_all([
+        dict(timestamp=f"2024-01-01T00:00:{i % 60:02d}", system_used="difuso",
+             diagnosis="ALTA" if i % 2 else "BAJA", corrected=i % 2 == 0, fiebre=36.0 + i / 100)
+        for i in range(100)])
+
+    filas = exportar(str(tmp_path / "export"), db=ConBorrado(db, get_db()), bloque=7)
+    assert filas == 100
+    ids = np.load(tmp_path / "export" / "id.npy", mmap_mode="r")
+    assert list(ids) == list(range(1, 101))
+    fiebre = np.load(tmp_path / "export" / "fiebre.npy", mmap_mode="r")
+    assert np.allclose(fiebre, 36.0 + np.arange(100) / 100)
+    assert json.loads((tmp_path / "export" / "esquema.json").read_text())["filas"] == 100
+    # La exportación siguiente ya ve los cambios
+    assert exportar(str(tmp_path / "export2"), db=db) == 100 - 33 + 1
@@ -0,0 +1,97 @@
+"""Escritor de feedback: un lote que falla se reintenta, nunca se descarta."""
+import asyncio
+import json
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+from app.feedback import ColaLlena, FeedbackWriter
+
+
+class BaseFalsa:
+    """Imita la conexión de fastlite; falla mientras ``caida`` sea verdadero."""
+
+    def __init__(self, fallas: int = 0):
+        self.fallas = fallas
+        self.caida = False
+        self.filas = []
+        self.conn = nullcontext()
+        self.t = SimpleNamespace(learning_logs=SimpleNamespace(insert_all=self._insertar))
+
+    def _insertar(self, lote):
+        if self.caida or self.fallas > 0:
+            self.fallas -= 1
+            raise OSError("database is locked")
+        self.filas.extend(lote)
+
+
+def _escritor(base, tmp_path, **kwargs):
+    kwargs = dict(dict(max_lote=4, intervalo=0.01, capacidad=8), **kwargs)
+    return FeedbackWriter(lambda: base, archivo_pendiente=str(tmp_path / "pendiente.jsonl"), **kwargs)
+
+
+def test_reintenta_el_lote_hasta_escribirlo(tmp_path):
+    base = BaseFalsa(fallas=8)
+
+    async def correr():
+        escritor = _escritor(base, tmp_path)
+        escritor.start()
+        for i in range(20):
+            await escritor.submit({"id": i})
+        await escritor.stop()
+        return escritor
+
+    escritor = asyncio.run(correr())
+    assert [r["id"] for r in base.filas] == list(range(20))
+    assert escritor.errores == 8
+    assert escritor.guardados == 0
+    assert not (tmp_path / "pendiente.jsonl").exists()
+
+
+def test_base_caida_llena_la_cola_y_rechaza(tmp_path):
+    base = BaseFalsa()
+    base.caida = True
+
+    async def correr():
+        escritor = _escritor(base, tmp_path, espera_max=0.05)
+        escritor.start()
+        # Un lote de un registro en reintento y después la cola llena
+        await escritor.submit({"id": 0})
+        await asyncio.sleep(0.05)
+        for i in range(1, 1 + escritor.capacidad):
+            await escritor.submit({"id": i})
+        with pytest.raises(ColaLlena):
+            await escritor.submit({"id": -1})
+        assert escritor.reintentando == 1
+        base.caida = False
+        await escritor.stop()
+        return escritor
+
+    escritor = asyncio.run(correr())
+    assert [r["id"] for r in base.filas] == list(range(9))
+    assert escritor.rechazados == 1
+
+
+def test_lo_pendiente_al_cerrar_se_escribe_al_arrancar(tmp_path):
+    base = BaseFalsa()
+    base.caida = True
+
+    async def correr(escritor, n):
+        escritor.start()
+        for i in range(n):
+            await escritor.submit({"id": i})
+        await escritor.stop()
+
+    primero = _escritor(base, tmp_path)
+    asyncio.run(correr(primero, 6))
+    archivo = tmp_path / "pendiente.jsonl"
+    assert primero.guardados == 6
+    assert [json.loads(linea)["id"] for linea in archivo.read_text().splitlines()] == list(range(6))
+
+    base.caida = False
+    segundo = _escritor(base, tmp_path)
+    asyncio.run(correr(segundo, 0))
+    assert segundo.recuperados == 6
+    assert [r["id"] for r in base.filas] == list(range(6))
+    assert not archivo.exists()
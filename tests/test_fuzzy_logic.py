@@ -0,0 +1,75 @@
+"""Motor difuso: aislamiento de lotes (skfuzzy) y validación de los hechos."""
+import random
+import threading
+
+import pytest
+
+from app.systems.facts import BOOLEANOS, HechosInvalidos
+from app.systems.fuzzy_logic import FuzzyEngine
+
+
+def _pacientes(n, seed):
+    rng = random.Random(seed)
+    return [dict({campo: rng.random() < 0.5 for campo in BOOLEANOS},
+                 fiebre=round(rng.uniform(35.5, 41.0), 1),
+                 intensidad_dolor_cabeza=float(rng.randint(0, 10)),
+                 intensidad_tos=float(rng.randint(0, 10)))
+            for _ in range(n)]
+
+
+def test_lote_no_pisa_la_simulacion_individual():
+    pacientes = _pacientes(40, seed=5)
+    referencia = [FuzzyEngine(backend="skfuzzy", pool_size=1).infer(p, trace=False).confidence
+                  for p in pacientes[:5]]
+
+    engine = FuzzyEngine(backend="skfuzzy", pool_size=1)
+    engine.infer_batch(pacientes[5:], trace=False)
+    despues = [engine.infer(p, trace=False).confidence for p in pacientes[:5]]
+
+    assert despues == referencia
+
+
+def test_lote_igual_a_uno_por_uno():
+    pacientes = _pacientes(20, seed=6)
+    engine = FuzzyEngine(backend="skfuzzy", pool_size=1)
+    uno = [engine.infer(p, trace=False) for p in pacientes]
+    lote = engine.infer_batch(pacientes, trace=False)
+    assert [d.label for d in lote] == [d.label for d in uno]
+    assert [round(d.confidence, 9) for d in lote] == [round(d.confidence, 9) for d in uno]
+
+
+def test_lotes_concurrentes_con_diagnosticos_de_a_uno():
+    pacientes = _pacientes(30, seed=7)
+    engine = FuzzyEngine(backend="skfuzzy", pool_size=2)
+    referencia = [engine.infer(p, trace=False).confidence for p in pacientes]
+    lote = _pacientes(200, seed=8)
+    errores = []
+
+    def lotes():
+        for _ in range(10):
+            engine.infer_batch(lote, trace=False)
+
+    def de_a_uno():
+        for _ in range(10):
+            obtenidos = [engine.infer(p, trace=False).confidence for p in pacientes]
+            if obtenidos != referencia:
+                errores.append(obtenidos)
+
+    hilos = [threading.Thread(target=lotes), threading.Thread(target=de_a_uno), threading.Thread(target=de_a_uno)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert not errores
+
+
+@pytest.mark.parametrize("backend", ["numpy", "surface", "skfuzzy"])
+def test_hechos_invalidos_se_propagan(backend):
+    engine = FuzzyEngine(backend=backend, pool_size=1)
+    validos = _pacientes(3, seed=9)
+    with pytest.raises(HechosInvalidos):
+        engine.infer(dict(validos[0], fiebre=float("nan")))
+    with pytest.raises(HechosInvalidos):
+        engine.infer_batch(validos + [dict(validos[0], intensidad_tos=11.0)])
+    # Un lote válido no se ve afectado
+    assert all(d.label != "Error Difuso" for d in engine.infer_batch(validos))
@@ -0,0 +1,69 @@
+"""Superficie difusa: nodos NaN de la grilla y grilla de riesgo_epi tras recargar el conocimiento."""
+import json
+from itertools import product
+
+import numpy as np
+import pytest
+
+from app.registry import EngineRegistry
+from app.reload import Recargador
+from app.systems import knowledge
+from app.systems.fuzzy_logic import FuzzyEngine
+from app.systems.fuzzy_surface import SuperficieDifusa
+
+PUNTO = {'fiebre': 38.55, 'dolor_cabeza': 6.5, 'intensidad_tos': 3.0, 'riesgo_epi': 5.0}
+
+
+def _superficie_con_nan():
+    engine = FuzzyEngine(backend="numpy")
+    superficie = SuperficieDifusa(engine.evaluador, cache_dir=None)
+    valores = superficie.valores.copy()
+    # Nodo vecino de PUNTO (fiebre 38.5, dolor_cabeza 6, intensidad_tos 3, riesgo_epi 5)
+    nodo = dict(PUNTO, fiebre=38.5, dolor_cabeza=6.0)
+    valores[tuple(int(np.argmin(np.abs(eje - nodo[v])))
+                  for v, eje in zip(superficie.evaluador.variables, superficie.ejes))] = np.nan
+    superficie.valores = valores
+    return superficie
+
+
+def test_evaluar_usa_el_directo_junto_a_un_nodo_nan():
+    superficie = _superficie_con_nan()
+    esperado = superficie.evaluador.evaluar_uno(PUNTO)
+    lote = superficie.evaluar({v: np.array([x, x]) for v, x in PUNTO.items()})
+    assert np.isfinite(lote).all()
+    assert np.allclose(lote, esperado)
+
+
+def test_evaluar_uno_usa_el_directo_junto_a_un_nodo_nan():
+    superficie = _superficie_con_nan()
+    assert superficie.evaluar_uno(PUNTO) == superficie.evaluador.evaluar_uno(PUNTO)
+
+
+def test_nodos_lejanos_siguen_interpolando():
+    superficie = _superficie_con_nan()
+    lejos = dict(PUNTO, fiebre=36.05)
+    limpia = SuperficieDifusa(superficie.evaluador, cache_dir=None)
+    assert superficie.evaluar_uno(lejos) == limpia.evaluar_uno(lejos)
+
+
+def test_recarga_con_otro_puntaje_epi(tmp_path, monkeypatch):
+    monkeypatch.setenv("FUZZY_BACKEND", "surface")
+    monkeypatch.chdir(tmp_path)
+    engines = EngineRegistry(habilitados=["difuso"])
+    engines["difuso"]
+
+    datos = knowledge.leer("difuso")
+    datos["version"] = "2"
+    datos["puntaje_epi"] = {"viaje_brasil": 3, "contacto_dengue": 4}
+    (tmp_path / "difuso.json").write_text(json.dumps(datos), encoding="utf-8")
+    assert Recargador(engines, intervalo=0, directorio=str(tmp_path)).revisar() == ["difuso"]
+
+    motor = engines["difuso"]
+    eje = motor.superficie.ejes[motor.evaluador.variables.index("riesgo_epi")]
+    assert list(eje) == [0.0, 3.0, 4.0, 7.0]
+    directo = FuzzyEngine(backend="numpy", conocimiento=datos)
+    for viaje, contacto, fiebre in product((False, True), (False, True), (36.5, 38.0, 39.5)):
+        facts = dict(fiebre=fiebre, tos=True, dolor_garganta=False, viaje_brasil=viaje,
+                     contacto_dengue=contacto, vive_corrientes=False, verano=False,
+                     dolor_cabeza=True, intensidad_dolor_cabeza=6, intensidad_tos=3)
+        assert motor.infer(facts).confidence == pytest.approx(directo.infer(facts).confidence)
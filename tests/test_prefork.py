@@ -0,0 +1,45 @@
+"""Servidor prefork: espera antes de reemplazar workers y perfilador tras el fork."""
+import json
+import os
+import time
+
+from app import prefork
+from app.metrics import Perfilador
+
+
+def test_espera_crece_con_las_fallas_seguidas():
+    esperas, espera = [], 0.0
+    for _ in range(10):
+        espera = prefork.espera_reemplazo(0.1, espera)
+        esperas.append(espera)
+    assert esperas[0] == prefork.ESPERA_MIN
+    assert esperas == sorted(esperas)
+    assert esperas[-1] == prefork.ESPERA_MAX
+
+
+def test_worker_que_vivio_se_reemplaza_enseguida():
+    assert prefork.espera_reemplazo(prefork.VIDA_MINIMA, prefork.ESPERA_MAX) == 0.0
+
+
+def test_perfilador_arranca_su_hilo_en_el_hijo():
+    perfilador = Perfilador(umbral=0.0, intervalo=0.001)
+    # En el maestro no hay hilo hasta el primer pedido
+    assert perfilador._hilo is None
+    lectura, escritura = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        resultado = {}
+        try:
+            perfilador.empezar(1)
+            time.sleep(0.05)
+            perfilador.terminar(1, 1.0, {"ruta": "/diagnose"})
+            resultado = {"hilo": perfilador._hilo.is_alive(), "muestras": perfilador.lentos[-1]["muestras"]}
+        finally:
+            os.write(escritura, json.dumps(resultado).encode())
+            os._exit(0)
+    os.close(escritura)
+    with os.fdopen(lectura) as f:
+        resultado = json.loads(f.read())
+    os.waitpid(pid, 0)
+    assert resultado["hilo"] and resultado["muestras"] > 0
+    assert perfilador._hilo is None
@@ -0,0 +1,80 @@
+"""Motor bayesiano: la tabla compilada de 32 posteriores tiene que coincidir con
+VariableElimination y rehacerse cada vez que cambian las CPDs."""
+import json
+
+import numpy as np
+import pytest
+from pgmpy.factors.discrete import TabularCPD
+from pgmpy.inference import VariableElimination
+
+from app.database import get_db
+from app.learning import AprendizajeBayesiano
+from app.systems.decision_table import _hechos
+from app.systems.facts import MAX_MASCARA
+from app.systems.probabilistic import EVIDENCIA, BayesianEngine, clave_evidencia
+
+
+def _evidencia(clave):
+    return {nodo: (clave >> (len(EVIDENCIA) - 1 - i)) & 1 for i, nodo in enumerate(EVIDENCIA)}
+
+
+def _posteriores(model):
+    """P(Dengue=1 | evidencia) por clave, consultando VariableElimination."""
+    inference = VariableElimination(model)
+    return np.array([inference.query(['Dengue'], evidence=_evidencia(clave), show_progress=False).values[1]
+                     for clave in range(2 ** len(EVIDENCIA))])
+
+
+def _assert_tabla_al_dia(engine):
+    estado = engine.estado()
+    tabla = engine._tabla_posterior(estado)
+    assert tabla.shape == (2 ** len(EVIDENCIA),)
+    np.testing.assert_allclose(tabla, _posteriores(estado.model), rtol=0, atol=1e-12)
+    return tabla
+
+
+def test_clave_recorre_las_32_evidencias():
+    assert sorted(clave_evidencia(_evidencia(c)) for c in range(32)) == list(range(32))
+
+
+def test_tabla_igual_a_variable_elimination():
+    _assert_tabla_al_dia(BayesianEngine())
+
+
+def test_infer_compilado_igual_al_de_consultas():
+    compilado, consultas = BayesianEngine(), BayesianEngine(compiled=False)
+    for mascara in range(MAX_MASCARA + 1):
+        for fiebre in (36.5, 39.0):
+            facts = _hechos(mascara, fiebre)
+            assert compilado.infer(facts).confidence == pytest.approx(consultas.infer(facts).confidence,
+                                                                     abs=1e-12), facts
+
+
+def test_tabla_se_rehace_con_update_cpds():
+    engine = BayesianEngine()
+    anterior = _assert_tabla_al_dia(engine)
+    version = engine.model_version
+    engine.update_cpds(TabularCPD('Dengue', 2, [[0.6, 0.99], [0.4, 0.01]], evidence=['Nexo'], evidence_card=[2]))
+    assert engine.model_version == version + 1
+    tabla = _assert_tabla_al_dia(engine)
+    assert not np.allclose(tabla, anterior)
+
+
+def test_tabla_se_rehace_al_aprender(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = get_db()
+    paciente = dict(fiebre=39.0, tos=False, dolor_garganta=False, viaje_brasil=True, contacto_dengue=False,
+                    vive_corrientes=False, verano=False, dolor_cabeza=True,
+                    intensidad_dolor_cabeza=7, intensidad_tos=0)
+    db.t.learning_logs.insert_all([
+        dict(timestamp="t", system_used="probabilistico", inputs=json.dumps(paciente),
+             diagnosis="ALTA PROBABILIDAD DENGUE", user_feedback=None, corrected=i % 4 == 0)
+        for i in range(200)])
+
+    engine = BayesianEngine()
+    anterior = _assert_tabla_al_dia(engine)
+    aprendizaje = AprendizajeBayesiano(engine, checkpoint=str(tmp_path / "conteos.json"), intervalo=0)
+    assert aprendizaje.actualizar() == 200
+    assert aprendizaje.observaciones == 200
+    tabla = _assert_tabla_al_dia(engine)
+    assert not np.allclose(tabla, anterior)
@@ -0,0 +1,154 @@
+"""Protocolo de los workers de motores: codificación, tramas y reinicio de un worker trabado."""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturoVencido
+from types import SimpleNamespace
+
+import pytest
+
+from app import rpc
+from app.systems.base import SIN_TRAZA, Diagnosis
+from app.systems.decision_table import _hechos
+from app.systems.facts import PatientFacts
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker que responde los pings pero nunca una inferencia
+WORKER_TRABADO = """
+import os, socket, sys, threading
+from app import rpc
+ruta = sys.argv[2]
+if os.path.exists(ruta):
+    os.remove(ruta)
+servidor = socket.socket(socket.AF_UNIX)
+servidor.bind(ruta)
+servidor.listen(8)
+
+def atender(conexion):
+    lector = conexion.makefile("rb")
+    while True:
+        ident, op, datos = rpc._leer_trama(lector)
+        if op == rpc.PING:
+            conexion.sendall(rpc._trama(ident, rpc.OK, b"1/0"))
+
+while True:
+    conexion, _ = servidor.accept()
+    threading.Thread(target=atender, args=(conexion,), daemon=True).start()
+"""
+
+
+def test_pedido_ida_y_vuelta():
+    pacientes = [PatientFacts(fiebre, idc, itos, mascara)
+                 for mascara, fiebre, idc, itos in ((0, 36.5, 0, 0), (5, 38.1, 7, 2.5), (127, 41.9, 10, 10))]
+    for trace in (True, False):
+        traza, decodificados = rpc.decodificar_pedido(rpc.codificar_pedido(pacientes, trace))
+        assert traza is trace
+        assert decodificados == pacientes
+
+
+def test_diagnosticos_ida_y_vuelta():
+    engine = SimpleNamespace(probabilidad_dengue=lambda d: 0.25 if d.label.startswith("Dengue") else None)
+    diags = [Diagnosis("Dengue probable ñ", 0.75, ["línea 1", "línea 2"], "2/3"),
+             Diagnosis("Sin diagnóstico", 0.0, [], "2/3")]
+    con_traza = rpc.decodificar_diagnosticos(rpc.codificar_diagnosticos(engine, diags, True))
+    assert [(d.label, d.confidence, list(d.reasoning), d.model_version, d.probabilidad)
+            for d in con_traza] == [("Dengue probable ñ", 0.75, ["línea 1", "línea 2"], "2/3", 0.25),
+                                    ("Sin diagnóstico", 0.0, [], "2/3", None)]
+    sin_traza = rpc.decodificar_diagnosticos(rpc.codificar_diagnosticos(engine, diags, False))
+    assert all(d.reasoning is SIN_TRAZA for d in sin_traza)
+
+
+def test_tramas_en_tuberia_y_en_pedazos():
+    tramas = [rpc._trama(i, rpc.INFER, bytes([i]) * (i * 1000)) for i in range(1, 6)]
+    flujo = b"".join(tramas)
+    a, b = socket.socketpair()
+
+    def mandar_en_pedazos():
+        # Cortes que caen dentro de cabeceras y de datos
+        for i in range(0, len(flujo), 7):
+            a.sendall(flujo[i:i + 7])
+        a.close()
+
+    hilo = threading.Thread(target=mandar_en_pedazos)
+    hilo.start()
+    lector = b.makefile("rb")
+    leidas = [rpc._leer_trama(lector) for _ in tramas]
+    assert leidas == [(i, rpc.INFER, bytes([i]) * (i * 1000)) for i in range(1, 6)]
+    with pytest.raises(ConnectionError):
+        rpc._leer_trama(lector)
+    hilo.join()
+    b.close()
+
+
+def test_trama_cortada():
+    a, b = socket.socketpair()
+    a.sendall(rpc._trama(1, rpc.OK, b"x" * 100)[:50])
+    a.close()
+    with pytest.raises(ConnectionError):
+        rpc._leer_trama(b.makefile("rb"))
+    b.close()
+
+
+def test_respuestas_fuera_de_orden_se_emparejan_por_id(tmp_path):
+    ruta = str(tmp_path / "eco.sock")
+    servidor = socket.socket(socket.AF_UNIX)
+    servidor.bind(ruta)
+    servidor.listen(1)
+
+    def eco_al_reves():
+        conexion, _ = servidor.accept()
+        lector = conexion.makefile("rb")
+        pedidos = [rpc._leer_trama(lector) for _ in range(3)]
+        for ident, _, datos in reversed(pedidos):
+            conexion.sendall(rpc._trama(ident, rpc.OK, datos))
+        conexion.close()
+
+    hilo = threading.Thread(target=eco_al_reves)
+    hilo.start()
+    conexion = rpc._Conexion(ruta)
+    futuros = [conexion.enviar(rpc.INFER, f"pedido {i}".encode()) for i in range(3)]
+    assert [f.result(5) for f in futuros] == [b"pedido 0", b"pedido 1", b"pedido 2"]
+    hilo.join()
+    conexion.cerrar()
+    servidor.close()
+
+
+@pytest.fixture
+def cliente_trabado(monkeypatch):
+    monkeypatch.setenv("ENGINE_STALL_TIMEOUT", "1")
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+
+    def lanzar(self):
+        self.popen = subprocess.Popen([sys.executable, "-c", WORKER_TRABADO, self.nombre, self.ruta],
+                                      env=entorno)
+        self._inicio = time.perf_counter()
+
+    monkeypatch.setattr(rpc._Proceso, "lanzar", lanzar)
+    cliente = rpc.ClienteMotores(["difuso"], intervalo=0.2, timeout=0.5)
+    yield cliente
+    cliente.cerrar()
+
+
+def test_worker_trabado_da_timeout_y_se_reinicia(cliente_trabado):
+    motor = cliente_trabado.representante("difuso")
+    proceso = cliente_trabado._procesos["difuso"][0]
+    pid = proceso.popen.pid
+
+    inicio = time.monotonic()
+    with pytest.raises(FuturoVencido):
+        motor.infer(_hechos(0, 39.0))
+    assert time.monotonic() - inicio < 2
+
+    # El pedido sigue pendiente hasta que el supervisor reinicia el worker
+    pendiente = cliente_trabado.enviar("difuso", _hechos(0, 39.0), False, True)
+    with pytest.raises(rpc.MotorCaido):
+        pendiente.result(10)
+    limite = time.monotonic() + 10
+    while proceso.popen.pid == pid or proceso.ping(1) != "1/0":
+        assert time.monotonic() < limite, "el worker no se reinició"
+        time.sleep(0.05)
+    assert proceso.reinicios >= 1
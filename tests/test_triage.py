@@ -0,0 +1,62 @@
+"""Triage masivo: una corrida cortada y reanudada escribe lo mismo que una entera."""
+import csv
+
+import pytest
+
+from app import triage
+
+
+def _entrada(ruta, n=95):
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["paciente", "fiebre", "tos", "viaje_brasil", "intensidad_tos"])
+        for i in range(n):
+            # Cada tanto una fila ilegible: sale como error de datos
+            fiebre = "caliente" if i % 17 == 5 else f"{36 + (i % 50) / 10:.1f}".replace(".", ",")
+            escritor.writerow([f"p{i}", fiebre, "si" if i % 2 else "no", "x" if i % 3 == 0 else "", i % 11])
+
+
+@pytest.mark.parametrize("formato", ["jsonl", "csv"])
+def test_reanudar_tras_un_corte(tmp_path, monkeypatch, formato):
+    entrada = tmp_path / "pacientes.csv"
+    _entrada(entrada)
+    opciones = dict(motor="difuso", formato_salida=formato, trace=True, bloque=10, procesos=0,
+                    columna_id="paciente", progreso=0)
+    completo = tmp_path / f"completo.{formato}"
+    resumen = triage.triar(str(entrada), salida=str(completo), **opciones)
+    assert (resumen["filas"], resumen["errores_datos"]) == (95, 6)
+
+    salida, checkpoint = tmp_path / f"cortada.{formato}", str(tmp_path / "checkpoint.json")
+    original = triage._diagnosticar
+    llamadas = []
+
+    def cortar(facts_list, trace):
+        llamadas.append(len(facts_list))
+        if len(llamadas) == 5:
+            raise KeyboardInterrupt
+        return original(facts_list, trace)
+
+    monkeypatch.setattr(triage, "_diagnosticar", cortar)
+    with pytest.raises(KeyboardInterrupt):
+        triage.triar(str(entrada), salida=str(salida), checkpoint=checkpoint, **opciones)
+    monkeypatch.setattr(triage, "_diagnosticar", original)
+    filas = triage._leer_checkpoint(checkpoint)["filas"]
+    assert 0 < filas < 95
+    # Lo escrito después del checkpoint (un bloque a medias) se descarta
+    with open(salida, "a", encoding="utf-8") as f:
+        f.write("basura sin terminar")
+
+    resumen = triage.triar(str(entrada), salida=str(salida), checkpoint=checkpoint, reanudar=True, **opciones)
+    assert (resumen["filas"], resumen["nuevas"]) == (95, 95 - filas)
+    assert salida.read_text(encoding="utf-8") == completo.read_text(encoding="utf-8")
+
+
+def test_reanudar_con_otra_configuracion(tmp_path):
+    entrada = tmp_path / "pacientes.csv"
+    _entrada(entrada, 20)
+    salida, checkpoint = str(tmp_path / "salida.jsonl"), str(tmp_path / "checkpoint.json")
+    triage.triar(str(entrada), "difuso", salida=salida, bloque=10, procesos=0, checkpoint=checkpoint,
+                 progreso=0)
+    with pytest.raises(ValueError, match="motor"):
+        triage.triar(str(entrada), "probabilistico", salida=salida, bloque=10, procesos=0,
+                     checkpoint=checkpoint, reanudar=True, progreso=0)